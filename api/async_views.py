@@ -0,0 +1,67 @@
+"""
+Async versions of the public read endpoints.
+
+Django 3.2 runs every sync view of an ASGI worker on one shared thread, so on the
+ASGI profile (core.asgi on uvicorn workers, see gunicorn-cfg.py) these GETs run
+their queries in the thread pool instead (sync_to_async with thread_sensitive=False):
+a slow client or query no longer holds the worker, and many of them overlap in one
+process. Under WSGI the request thread is blocked on the view anyway, so the work
+stays on it. Payloads come from the same code as the DRF views and go through the
+same renderer. Any other method (the admin writes on publications and web-config)
+is handed to the DRF viewset unchanged.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import HttpResponse
+
+from api.renderers import FastJSONRenderer
+
+_renderer = FastJSONRenderer()
+
+
+def _read_in_pool(builder, request):
+    try:
+        return builder(request)
+    finally:
+        # Pool threads are not request threads: nothing else closes their connections
+        connections.close_all()
+
+
+def async_read_view(builder, fallback):
+    """Async view serving GET with builder(request) -> data, other methods with fallback."""
+
+    async def view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await sync_to_async(fallback)(request, *args, **kwargs)
+        if isinstance(request, ASGIRequest):
+            data = await sync_to_async(_read_in_pool, thread_sensitive=False)(builder, request)
+        else:
+            data = await sync_to_async(builder)(request)
+        return HttpResponse(_renderer.render(data), content_type='application/json')
+
+    view.csrf_exempt = True  # the DRF fallback does its own authentication and CSRF checks
+    return view
+
+
+def open_courses(request):
+    from api.school.views import open_courses_data
+    return open_courses_data()
+
+
+def available_projects(request):
+    from api.school.views import available_projects_data
+    return available_projects_data(request.GET.get('course_id'))
+
+
+def publications(request):
+    from api.publications.models import Publication
+    from api.publications.serializers import PublicationSerializer
+    return PublicationSerializer(Publication.objects.all(), many=True, context={'request': request}).data
+
+
+def web_config(request):
+    from api.web_config.models import SocialMediaLink
+    from api.web_config.serializers import SocialMediaSerializer
+    instance, _ = SocialMediaLink.objects.get_or_create(pk=1)
+    return SocialMediaSerializer(instance, context={'request': request}).data
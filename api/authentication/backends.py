@@ -2,9 +2,11 @@ import jwt
 
 from rest_framework import authentication, exceptions
 from django.conf import settings
+from django.db import router
 
 from api.user.models import User
 from api.authentication.models import ActiveSession
+from api.authentication.revocation import revocations
 
 
 class ActiveSessionAuthentication(authentication.BaseAuthentication):
@@ -37,10 +39,14 @@ class ActiveSessionAuthentication(authentication.BaseAuthentication):
     def _authenticate_credentials(self, token):
 
         try:
-            jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
         except:
             raise exceptions.AuthenticationFailed(self.auth_error_message)
 
+        # Tokens issued before the sid claim existed still go through ActiveSession
+        if settings.JWT_STATELESS and payload.get("sid") and payload.get("role"):
+            return self._authenticate_stateless(payload, token)
+
         try:
             active_session = ActiveSession.objects.get(token=token)
         except:
@@ -57,3 +63,16 @@ class ActiveSessionAuthentication(authentication.BaseAuthentication):
             raise exceptions.AuthenticationFailed(msg)
 
         return (user, token)
+
+    def _authenticate_stateless(self, payload, token):
+        if revocations.is_revoked(payload):
+            raise exceptions.AuthenticationFailed(self.auth_error_message)
+
+        # Only id/role/is_active are loaded; any other field is fetched lazily
+        # (Django deferred fields) by the few views that need it.
+        user = User.from_db(
+            router.db_for_read(User),
+            ["id", "role", "is_active"],
+            [payload["id"], payload["role"], True],
+        )
+        return (user, token)
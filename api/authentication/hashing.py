@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide pool for bulk password hashing (PBKDF2 releases the GIL)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix="password-hash",
+                )
+    return _executor
+
+
+def verify_password(user, raw_password):
+    """
+    user.check_password() (which also rehashes on a hasher upgrade), run on the
+    request thread. The hash is CPU-bound and the caller waits for it either way,
+    so concurrent hashes are capped by the number of request threads (gunicorn
+    workers x threads), not by a pool.
+    """
+    return user.check_password(raw_password)
+
+
+def make_passwords(raw_passwords):
+    """make_password() for many passwords at once, hashed in parallel on the pool."""
+    return list(get_executor().map(hashers.make_password, raw_passwords))
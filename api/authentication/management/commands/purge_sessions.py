@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from api.authentication.models import ActiveSession, RevokedToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired ActiveSession and RevokedToken rows in batches and reports live session counts. "
+        "Meant to run periodically (cron / scheduled job), e.g. hourly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--stats', action='store_true', help="Only print session counts, delete nothing.")
+
+    def handle(self, *args, **options):
+        self.print_stats()
+        if options['stats']:
+            return
+
+        start = time.perf_counter()
+        now = timezone.now()
+        sessions = self.purge(ActiveSession.objects.filter(expires_at__lte=now), options['batch_size'])
+        revocations = self.purge(RevokedToken.objects.filter(expires_at__lte=now), options['batch_size'])
+        self.stdout.write(
+            f"purged {sessions} expired sessions and {revocations} expired revocations "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+    @staticmethod
+    def purge(queryset, batch_size):
+        """Deletes in primary-key batches so each statement holds locks briefly."""
+        deleted = 0
+        while True:
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += queryset.model.objects.filter(pk__in=ids).delete()[0]
+
+    def print_stats(self):
+        live = ActiveSession.objects.live()
+        counts = live.aggregate(sessions=Count('id'), users=Count('user', distinct=True))
+        self.stdout.write(
+            f"live sessions: {counts['sessions']} ({counts['users']} users), "
+            f"expired: {ActiveSession.objects.expired().count()}, "
+            f"without expiry: {ActiveSession.objects.filter(expires_at__isnull=True).count()}"
+        )
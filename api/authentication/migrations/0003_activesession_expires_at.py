@@ -0,0 +1,45 @@
+# Generated by Django 3.2.13 on 2026-10-19 18:26
+
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_expires_at(apps, schema_editor):
+    ActiveSession = apps.get_model('api_authentication', 'ActiveSession')
+    batch = []
+    for session in ActiveSession.objects.filter(expires_at__isnull=True).iterator():
+        try:
+            exp = jwt.decode(session.token, options={'verify_signature': False})['exp']
+            session.expires_at = datetime.fromtimestamp(exp, tz=timezone.utc)
+        except (jwt.InvalidTokenError, KeyError):
+            session.expires_at = session.date + timedelta(days=settings.JWT_TOKEN_LIFETIME_DAYS)
+        batch.append(session)
+        if len(batch) >= 1000:
+            ActiveSession.objects.bulk_update(batch, ['expires_at'])
+            batch = []
+    if batch:
+        ActiveSession.objects.bulk_update(batch, ['expires_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_authentication', '0002_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activesession',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='activesession',
+            name='token',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+    ]
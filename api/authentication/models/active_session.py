@@ -1,7 +1,20 @@
 from django.db import models
+from django.utils import timezone
+
+
+class ActiveSessionQuerySet(models.QuerySet):
+    def live(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
 
 
 class ActiveSession(models.Model):
     user = models.ForeignKey("api_user.User", on_delete=models.CASCADE)
-    token = models.CharField(max_length=255)
+    token = models.CharField(max_length=255, db_index=True)
     date = models.DateTimeField(auto_now_add=True)
+    # Copy of the token's exp claim so expired rows can be purged with an index range scan
+    expires_at = models.DateTimeField(null=True, db_index=True)
+
+    objects = ActiveSessionQuerySet.as_manager()
@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class RevokedToken(models.Model):
+    """
+    Revocation entry for stateless JWT mode.
+    Either one session (sid) or every token of a user issued before revoked_at (user_id, sid empty).
+    Rows are only needed until expires_at, when the revoked tokens expire anyway.
+    """
+    sid = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    user_id = models.BigIntegerField(blank=True, null=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
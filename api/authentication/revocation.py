@@ -0,0 +1,97 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.authentication.models import ActiveSession, RevokedToken
+
+VERSION_CACHE_KEY = "jwt-revocations-version"
+
+
+class RevocationList:
+    """
+    In-memory revocation set for stateless JWT mode.
+
+    Holds revoked session ids and per-user "revoked before" timestamps, loaded from
+    RevokedToken. It is reloaded when another worker bumps the version kept in the
+    cache, or every JWT_REVOCATION_REFRESH_SECONDS, so checking a token normally
+    costs one cache read and no DB query. With a per-process cache (the default
+    locmem CACHE_URL) workers do not see each other's version bumps, so a revocation
+    reaches the other workers only at their next refresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._sids = {}   # sid -> expiry timestamp
+        self._users = {}  # user_id -> revoked_at timestamp
+        self._version = None
+        self._loaded_at = None
+
+    def _stale(self, version):
+        if self._loaded_at is None or version != self._version:
+            return True
+        return time.monotonic() - self._loaded_at > settings.JWT_REVOCATION_REFRESH_SECONDS
+
+    def reload(self, version=None):
+        now = timezone.now()
+        sids = {}
+        users = {}
+        rows = RevokedToken.objects.filter(expires_at__gt=now).values_list("sid", "user_id", "revoked_at", "expires_at")
+        for sid, user_id, revoked_at, expires_at in rows:
+            if sid:
+                sids[sid] = expires_at.timestamp()
+            elif user_id is not None:
+                users[user_id] = max(users.get(user_id, 0), revoked_at.timestamp())
+        with self._lock:
+            self._sids = sids
+            self._users = users
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+    def is_revoked(self, payload):
+        version = cache.get(VERSION_CACHE_KEY)
+        if self._stale(version):
+            self.reload(version)
+
+        if payload.get("sid") in self._sids:
+            return True
+        # iat carries microseconds (see _generate_jwt_token), like revoked_at
+        revoked_at = self._users.get(payload.get("id"))
+        return revoked_at is not None and payload.get("iat", 0) < revoked_at
+
+    def revoke_session(self, sid, exp):
+        """Revokes one token by its sid claim until its exp (unix timestamp)."""
+        expires_at = datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+        RevokedToken.objects.create(sid=sid, expires_at=expires_at)
+        with self._lock:
+            self._sids[sid] = exp
+        self._bump()
+
+    def revoke_user(self, user_id):
+        """Revokes every token issued to a user so far (deactivation, role change, deletion)."""
+        # Login hands back a stored session token while it decodes; drop them so the next login issues a fresh one
+        ActiveSession.objects.filter(user_id=user_id).delete()
+        token = RevokedToken.objects.create(
+            user_id=user_id,
+            expires_at=timezone.now() + timedelta(days=settings.JWT_TOKEN_LIFETIME_DAYS),
+        )
+        with self._lock:
+            self._users[user_id] = token.revoked_at.timestamp()
+        self._bump()
+
+    def _bump(self):
+        version = uuid.uuid4().hex
+        cache.set(VERSION_CACHE_KEY, version, None)
+        # Our own copy is already up to date
+        with self._lock:
+            self._version = version
+
+
+revocations = RevocationList()
@@ -1,17 +1,30 @@
 import jwt
+import uuid
 from rest_framework import serializers, exceptions
 from django.contrib.auth import authenticate
-from datetime import datetime, timedelta
+from datetime import timedelta
 from django.conf import settings
+from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Case, IntegerField, Q, Value, When
 
+from api.authentication.hashing import verify_password
 from api.authentication.models import ActiveSession
+from api.authentication.revocation import revocations
 
 
 
-def _generate_jwt_token(user):
+def _generate_jwt_token(user, expires_at):
+    # role and sid (session id) let the token authenticate on its own in JWT_STATELESS mode
     token = jwt.encode(
-        {"id": user.pk, "exp": datetime.utcnow() + timedelta(days=settings.JWT_TOKEN_LIFETIME_DAYS)},
+        {
+            "id": user.pk,
+            "role": user.role,
+            "sid": uuid.uuid4().hex,
+            # Sub-second iat: a token issued right after a revoke_user() in the same second stays valid
+            "iat": timezone.now().timestamp(),
+            "exp": expires_at,
+        },
         settings.SECRET_KEY,
         algorithm="HS256"
     )
@@ -43,16 +56,15 @@ class LoginSerializer(serializers.Serializer):
         from django.contrib.auth import get_user_model
         User = get_user_model()
         
-        user = None
-        # Try email
-        user = User.objects.filter(email=login_input).first()
-        
-        # If not found, try CI
-        if not user:
-            user = User.objects.filter(ci_number=login_input).first()
+        # One lookup for email OR CI; an email match wins over a CI match
+        user = User.objects.filter(
+            Q(email=login_input) | Q(ci_number=login_input)
+        ).annotate(
+            email_match=Case(When(email=login_input, then=Value(0)), default=Value(1), output_field=IntegerField())
+        ).order_by('email_match', 'pk').first()
             
-        # Verify password
-        if user is None or not user.check_password(password):
+        # Verify password (rehashed on a hasher upgrade)
+        if user is None or not verify_password(user, password):
              # Check for special student login (CI as password)
              is_special_login = False
              if user and user.role == 'STUDENT' and user.ci_number == password:
@@ -72,22 +84,24 @@ class LoginSerializer(serializers.Serializer):
 
         try:
             # Use filter().first() to avoid MultipleObjectsReturned crash
-            session = ActiveSession.objects.filter(user=user).first()
+            session = ActiveSession.objects.live().filter(user=user).first()
             if not session:
                 raise ObjectDoesNotExist
 
             if not session.token:
                 raise ValueError
 
-            jwt.decode(session.token, settings.SECRET_KEY, algorithms=["HS256"])
+            payload = jwt.decode(session.token, settings.SECRET_KEY, algorithms=["HS256"])
+            if revocations.is_revoked(payload):
+                raise ValueError
 
         except (ObjectDoesNotExist, ValueError, jwt.ExpiredSignatureError, jwt.InvalidTokenError, jwt.DecodeError):
-            # If session exists (but invalid), delete it to avoid duplicates if we were using create
-            if session:
-                session.delete()
-            
+            # Drop every stale session of this user so rows don't pile up
+            ActiveSession.objects.filter(user=user).delete()
+
+            expires_at = timezone.now() + timedelta(days=settings.JWT_TOKEN_LIFETIME_DAYS)
             session = ActiveSession.objects.create(
-                user=user, token=_generate_jwt_token(user)
+                user=user, token=_generate_jwt_token(user, expires_at), expires_at=expires_at
             )
 
         return {
@@ -102,6 +116,6 @@ class LoginSerializer(serializers.Serializer):
                 "maternal_surname": user.maternal_surname,
                 "ci_number": user.ci_number,
                 "role": user.role,
-                "active_course": user.active_course.id if user.active_course else None
+                "active_course": user.active_course_id
             },
         }
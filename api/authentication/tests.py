@@ -1,7 +1,10 @@
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 
+from api.authentication.revocation import revocations
+
 
 class AuthenticationTest(APITestCase):
     base_url_register = reverse("api:register-list")
@@ -60,3 +63,135 @@ class AuthenticationTest(APITestCase):
 
         response_data = response.json()
         self.assertEqual(response_data["success"], True)
+
+
+class LoginLookupTest(APITestCase):
+    base_url_login = reverse("api:login-list")
+
+    def setUp(self):
+        from api.user.models import User
+
+        self.by_ci = User.objects.create_user(
+            email="ci-owner@appseed.us", password="ci-pass", ci_number="7654321", role="STUDENT"
+        )
+        # Another account whose email equals the first one's CI: the email match wins
+        self.by_email = User.objects.create_user(email="7654321", password="email-pass")
+
+    def test_login_by_ci(self):
+        self.by_email.delete()
+        response = self.client.post(self.base_url_login, data={"email": "7654321", "password": "ci-pass"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["user"]["_id"], self.by_ci.pk)
+        self.assertIsNone(response.json()["user"]["active_course"])
+
+    def test_email_match_wins_over_ci(self):
+        response = self.client.post(self.base_url_login, data={"email": "7654321", "password": "email-pass"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["user"]["_id"], self.by_email.pk)
+
+    def test_wrong_password(self):
+        response = self.client.post(self.base_url_login, data={"email": "7654321", "password": "ci-pass"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(JWT_STATELESS=True)
+class StatelessSessionTest(APITestCase):
+    base_url_login = reverse("api:login-list")
+    base_url_logout = reverse("api:logout-list")
+    base_url_check_session = reverse("api:check-session-list")
+
+    def setUp(self):
+        from api.user.models import User
+
+        revocations.reset()
+        self.user = User.objects.create_user(email="stateless@appseed.us", password="12345678", role="TEACHER")
+        response = self.client.post(self.base_url_login, data={"email": "stateless@appseed.us", "password": "12345678"})
+        self.token = response.json()["token"]
+        self.client.credentials(HTTP_AUTHORIZATION=self.token)
+
+    def test_check_session_without_queries(self):
+        self.client.post(self.base_url_check_session)  # first request loads the revocation list
+        with self.assertNumQueries(0):
+            response = self.client.post(self.base_url_check_session)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_logout_revokes_token(self):
+        response = self.client.post(self.base_url_logout)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(self.base_url_check_session)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        # Another worker rebuilding its list from the DB sees the revocation too
+        revocations.reset()
+        response = self.client.post(self.base_url_check_session)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deactivation_revokes_token(self):
+        from api.user.serializers import ManageUserSerializer
+
+        serializer = ManageUserSerializer(self.user, data={"is_active": False}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        response = self.client.post(self.base_url_check_session)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_login_after_revocation_issues_new_token(self):
+        revocations.revoke_user(self.user.pk)
+
+        response = self.client.post(self.base_url_login, data={"email": "stateless@appseed.us", "password": "12345678"})
+        token = response.json()["token"]
+        self.assertNotEqual(token, self.token)
+
+        # Issued within the same second as the revocation, and still accepted
+        self.client.credentials(HTTP_AUTHORIZATION=token)
+        response = self.client.post(self.base_url_check_session)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_other_worker_sees_revocation_after_refresh(self):
+        import jwt
+        from django.conf import settings
+        from django.core.cache import cache
+        from api.authentication.revocation import RevocationList, VERSION_CACHE_KEY
+
+        payload = jwt.decode(self.token, settings.SECRET_KEY, algorithms=["HS256"])
+        other_worker = RevocationList()
+        self.assertFalse(other_worker.is_revoked(payload))
+
+        # With a per-process cache the other worker never sees this version bump...
+        revocations.revoke_user(self.user.pk)
+        cache.set(VERSION_CACHE_KEY, other_worker._version, None)
+        self.assertFalse(other_worker.is_revoked(payload))
+
+        # ...and picks the revocation up once its refresh interval has passed
+        with override_settings(JWT_REVOCATION_REFRESH_SECONDS=0):
+            self.assertTrue(other_worker.is_revoked(payload))
+
+
+class PurgeSessionsTest(APITestCase):
+    base_url_login = reverse("api:login-list")
+
+    def test_purge_deletes_only_expired_sessions(self):
+        from datetime import timedelta
+        from io import StringIO
+
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        from api.authentication.models import ActiveSession
+        from api.user.models import User
+
+        user = User.objects.create_user(email="purge@appseed.us", password="12345678")
+        self.client.post(self.base_url_login, data={"email": "purge@appseed.us", "password": "12345678"})
+        live = ActiveSession.objects.get(user=user)
+        self.assertIsNotNone(live.expires_at)
+
+        past = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            ActiveSession.objects.create(user=user, token=f"expired-{i}", expires_at=past)
+
+        out = StringIO()
+        call_command("purge_sessions", batch_size=2, stdout=out)
+        self.assertIn("purged 5 expired sessions", out.getvalue())
+        self.assertEqual(list(ActiveSession.objects.all()), [live])
@@ -2,8 +2,11 @@ from rest_framework import viewsets, mixins
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+import jwt
 
 from api.authentication.models import ActiveSession
+from api.authentication.revocation import revocations
 
 
 class LogoutViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin):
@@ -12,8 +15,13 @@ class LogoutViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin):
     def create(self, request, *args, **kwargs):
         user = request.user
 
-        session = ActiveSession.objects.get(user=user)
-        session.delete()
+        if settings.JWT_STATELESS:
+            payload = jwt.decode(request.auth, settings.SECRET_KEY, algorithms=["HS256"])
+            if payload.get("sid"):
+                revocations.revoke_session(payload["sid"], payload["exp"])
+
+        # filter() rather than get(): tolerate missing or duplicate rows
+        ActiveSession.objects.filter(user=user).delete()
 
         return Response(
             {"success": True, "msg": "Token revoked"}, status=status.HTTP_200_OK
@@ -0,0 +1,117 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# name -> bounding box; images are shrunk to fit, never upscaled or cropped
+RENDITION_SIZES = {
+    'thumbnail': (320, 320),
+    'card': (960, 540),
+}
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+RENDITION_DIR = 'renditions'
+
+
+def rendition_name(name, size, fmt):
+    """course_images/<hash>.jpg -> course_images/renditions/<hash>_thumbnail.webp"""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    ext = 'jpg' if fmt == 'jpeg' else fmt
+    return os.path.join(directory, RENDITION_DIR, f"{stem}_{size}.{ext}")
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()[:32]
+
+
+@deconstructible
+class ImageRenditionStorage(FileSystemStorage):
+    """
+    Content-addressed storage for uploaded images.
+    Files are stored as <upload_to>/<sha256 prefix><ext>, so re-uploading the same
+    bytes reuses the existing file instead of writing another suffixed copy, and
+    sized WebP/JPEG renditions are produced once, at upload time.
+    """
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, content_hash(content) + ext)
+        if self.exists(name):
+            return name
+        name = super()._save(name, content)
+        self.build_renditions(name)
+        return name
+
+    def build_renditions(self, name):
+        """
+        Writes every size/format rendition of a stored image next to it.
+        Non-image uploads (Course.image is a FileField) are skipped silently.
+        Returns the number of files written.
+        """
+        from PIL import Image, ImageOps
+
+        try:
+            with self.open(name, 'rb') as f:
+                source = Image.open(f)
+                source = ImageOps.exif_transpose(source)
+                source.load()
+        except (OSError, Image.DecompressionBombError):
+            return 0
+
+        written = 0
+        for size, box in RENDITION_SIZES.items():
+            img = source.copy()
+            img.thumbnail(box, Image.LANCZOS)
+            for fmt, (pil_format, options) in RENDITION_FORMATS.items():
+                target = rendition_name(name, size, fmt)
+                if self.exists(target):
+                    continue
+                out = img
+                if pil_format == 'JPEG' and out.mode not in ('RGB', 'L'):
+                    out = out.convert('RGB')
+                elif out.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                    out = out.convert('RGBA')
+                buffer = BytesIO()
+                out.save(buffer, pil_format, **options)
+                # Renditions keep their derived name, bypassing the content-hash naming
+                super()._save(target, ContentFile(buffer.getvalue()))
+                written += 1
+        return written
+
+
+image_storage = ImageRenditionStorage()
+
+
+def rendition_urls(field_file, request=None):
+    """
+    {'thumbnail': {'webp': url, 'jpeg': url}, 'card': {...}} for an image field,
+    or None when there is no image or it has no renditions (non-image or legacy upload).
+    """
+    if not field_file:
+        return None
+    storage = field_file.storage
+    name = field_file.name
+    if not storage.exists(rendition_name(name, 'thumbnail', 'webp')):
+        return None
+
+    def absolute(url):
+        return request.build_absolute_uri(url) if request else url
+
+    return {
+        size: {fmt: absolute(storage.url(rendition_name(name, size, fmt))) for fmt in RENDITION_FORMATS}
+        for size in RENDITION_SIZES
+    }
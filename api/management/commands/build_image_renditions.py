@@ -0,0 +1,51 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from api.images import ImageRenditionStorage
+from api.publications.models import Publication
+from api.school.models import Course
+from api.web_config.models import LandingPageConfig
+
+IMAGE_FIELDS = [
+    (Course, 'image'),
+    (Publication, 'image'),
+    (LandingPageConfig, 'landing_image'),
+]
+
+
+class Command(BaseCommand):
+    help = "Builds thumbnail/card renditions for images uploaded before the rendition pipeline existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dedupe', action='store_true',
+            help="Also move legacy uploads to content-hashed names so identical files share one copy.",
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name in IMAGE_FIELDS:
+            storage = model._meta.get_field(field_name).storage
+            if not isinstance(storage, ImageRenditionStorage):
+                continue
+
+            built = renamed = missing = 0
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f"{field_name}__isnull": True})
+            for pk, name in rows.values_list('pk', field_name):
+                if not storage.exists(name):
+                    missing += 1
+                    continue
+
+                if options['dedupe']:
+                    with storage.open(name, 'rb') as f:
+                        hashed = storage.save(name, File(f))
+                    if hashed != name:
+                        model.objects.filter(pk=pk).update(**{field_name: hashed})
+                        renamed += 1
+                        name = hashed
+
+                built += storage.build_renditions(name)
+
+            self.stdout.write(
+                f"{model.__name__}.{field_name}: {built} renditions written, "
+                f"{renamed} renamed to content hash, {missing} missing files"
+            )
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.13 on 2026-10-19 18:23
+
+import api.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='publication',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=api.images.ImageRenditionStorage(), upload_to='publications/', verbose_name='Imagen'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 
+from api.images import image_storage
+
 class Publication(models.Model):
     """
     Model for managing publications (books, documents, etc.)
@@ -10,7 +12,7 @@ class Publication(models.Model):
     pages = models.IntegerField(verbose_name="Páginas")
     dl = models.CharField(max_length=100, verbose_name="Depósito Legal", blank=True, null=True)
     summary = models.TextField(verbose_name="Resumen")
-    image = models.ImageField(upload_to='publications/', verbose_name="Imagen", blank=True, null=True)
+    image = models.ImageField(upload_to='publications/', storage=image_storage, verbose_name="Imagen", blank=True, null=True)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
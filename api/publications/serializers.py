@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from api.images import rendition_urls
 from .models import Publication
 
 class PublicationSerializer(serializers.ModelSerializer):
@@ -6,11 +7,12 @@ class PublicationSerializer(serializers.ModelSerializer):
     Serializer for Publication model
     """
     image_url = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Publication
-        fields = ['id', 'title', 'author', 'stock', 'pages', 'dl', 'summary', 'image', 'image_url', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at', 'image_url']
+        fields = ['id', 'title', 'author', 'stock', 'pages', 'dl', 'summary', 'image', 'image_url', 'image_renditions', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'image_url', 'image_renditions']
 
     def get_image_url(self, obj):
         """Return the full image URL"""
@@ -20,3 +22,7 @@ class PublicationSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
             return obj.image.url
         return None
+
+    def get_image_renditions(self, obj):
+        """Thumbnail/card WebP and JPEG URLs, None when not available"""
+        return rendition_urls(obj.image, self.context.get('request'))
@@ -0,0 +1,32 @@
+from django.core.cache import cache
+
+
+def client_ip(request):
+    """
+    Address of the client. Behind nginx the real peer is the last X-Forwarded-For
+    entry (nginx appends $remote_addr); earlier entries are client-controlled.
+    """
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if forwarded:
+        return forwarded.split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def hit(key, limit, window):
+    """
+    Counts one hit on key in a fixed window of `window` seconds.
+    Returns False once more than `limit` hits were made in the current window.
+    Uses cache.add + cache.incr, which are atomic on memcached/redis. Counters live
+    in CACHES: with the default per-process cache each worker counts on its own, so
+    the effective limit is `limit` times the number of workers.
+    """
+    cache_key = f"ratelimit:{key}"
+    if cache.add(cache_key, 1, window):
+        return True
+    try:
+        count = cache.incr(cache_key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(cache_key, 1, window)
+        return True
+    return count <= limit
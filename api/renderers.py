@@ -0,0 +1,25 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # optional dependency, falls back to the stock renderer
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer backed by orjson when it is installed.
+    Types orjson does not know (Decimal, lazy strings, querysets...) go through
+    DRF's own encoder, so the output matches the stock renderer (Decimal -> float).
+    Indented output (browsable/pretty requests) still uses the stock renderer.
+    """
+    _encoder = encoders.JSONEncoder()
+    _options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=self._encoder.default, option=self._options)
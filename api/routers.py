@@ -47,11 +47,32 @@ router.register(r"course-special-criteria", school_views.CourseSpecialCriterionV
 router.register(r"criterion-scores", school_views.CriterionScoreViewSet, basename="criterion-scores")
 router.register(r"course-tasks", school_views.CourseTaskViewSet, basename="course-tasks")
 router.register(r"task-scores", school_views.TaskScoreViewSet, basename="task-scores")
+router.register(r"score-changes", school_views.ScoreChangeViewSet, basename="score-changes")
 router.register(r"projects", school_views.ProjectViewSet, basename="projects")
 router.register(r"project-registration", school_views.StudentProjectRegistrationViewSet, basename="project-registration")
 router.register(r"student-course-registration", school_views.StudentCourseRegistrationViewSet, basename="student-course-registration")
 router.register(r"registration-requests", school_views.RegistrationRequestViewSet, basename="registration-requests")
 
+# Public reads served by async views (api.async_views); they shadow the router's GET
+from django.urls import path
+from api import async_views
+
+async_urlpatterns = [
+    path("student-course-registration/open_courses/", async_views.async_read_view(
+        async_views.open_courses, school_views.StudentCourseRegistrationViewSet.as_view({"get": "open_courses"})
+    )),
+    path("project-registration/available_projects/", async_views.async_read_view(
+        async_views.available_projects, school_views.StudentProjectRegistrationViewSet.as_view({"get": "available_projects"})
+    )),
+    path("publications/", async_views.async_read_view(
+        async_views.publications, PublicationViewSet.as_view({"get": "list", "post": "create"})
+    )),
+    path("web-config/", async_views.async_read_view(
+        async_views.web_config, SocialMediaViewSet.as_view({"get": "list", "post": "create"})
+    )),
+]
+
 urlpatterns = [
+    *async_urlpatterns,
     *router.urls,
 ]
@@ -0,0 +1,80 @@
+"""
+Score change log for the bulk-save endpoints.
+
+A request snapshots the current values of the cells it is about to write (one query
+per score model), records the values it writes, and appends the ones that actually
+changed to ScoreChange with a single bulk_create.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+
+from . import models
+
+CENT = Decimal('0.01')
+
+# kind -> (score model, column field, value field)
+SCORE_MODELS = {
+    models.ScoreChange.SCORE: (models.Score, 'sub_evaluation_id', 'value'),
+    models.ScoreChange.CRITERION: (models.CriterionScore, 'sub_criterion_id', 'score'),
+    models.ScoreChange.SPECIAL: (models.SpecialCriterionScore, 'special_criterion_id', 'score'),
+    models.ScoreChange.TASK: (models.TaskScore, 'task_id', 'score'),
+}
+
+
+def _cell(kind, enrollment_id, column_id):
+    try:
+        return kind, int(enrollment_id), int(column_id)
+    except (TypeError, ValueError):
+        return None  # the write itself reports the bad id
+
+
+def _value(value):
+    try:
+        return Decimal(str(value)).quantize(CENT)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+class ScoreChangeLog:
+    def __init__(self, user=None):
+        self.user_id = user.pk if user is not None and user.is_authenticated else None
+        self._old = {}
+        self._new = {}
+
+    def snapshot(self, kind, cells):
+        """Loads the stored values of (enrollment_id, column_id) cells of one kind."""
+        keys = {key for key in (_cell(kind, e, c) for e, c in cells) if key}
+        if not keys:
+            return
+        model, column, field = SCORE_MODELS[kind]
+        for key in keys:
+            self._old.setdefault(key, None)
+        rows = model.objects.filter(
+            enrollment_id__in={e for _, e, _ in keys}, **{f'{column}__in': {c for _, _, c in keys}}
+        ).values_list('enrollment_id', column, field)
+        for enrollment_id, column_id, value in rows:
+            key = (kind, enrollment_id, column_id)
+            if key in keys:
+                self._old[key] = value
+
+    def record(self, kind, enrollment_id, column_id, value):
+        key = _cell(kind, enrollment_id, column_id)
+        if key:
+            self._new[key] = _value(value)
+
+    def save(self):
+        """Appends every recorded value that differs from its snapshot. Returns the row count."""
+        now = timezone.now()
+        changes = [
+            models.ScoreChange(
+                kind=kind, enrollment_id=enrollment_id, column_id=column_id,
+                old_score=self._old.get((kind, enrollment_id, column_id)), new_score=new,
+                changed_by_id=self.user_id, changed_at=now,
+            )
+            for (kind, enrollment_id, column_id), new in self._new.items()
+            if self._old.get((kind, enrollment_id, column_id)) != new
+        ]
+        models.ScoreChange.objects.bulk_create(changes, batch_size=500)
+        self._new.clear()
+        return len(changes)
@@ -0,0 +1,190 @@
+"""
+Gradesheet change events.
+
+views.update_final_grades calls publish_enrollment_changes() after every recalculation,
+once its transaction commits; the few score writes that recompute no final grade
+call it directly.
+Every process keeps a GradesheetBroker holding the gradesheet streams open in it
+(asyncio queues of the SSE connections, see streams.py). When one of those streams
+follows a changed course, the broker builds the delta once and hands it to all of
+them: the full gradesheet row and final grade of each changed enrollment.
+
+GRADESHEET_EVENTS_BACKEND picks how a change reaches the brokers:
+'local' delivers to the publishing process only (single worker / development), and
+'postgres' sends the changed ids through NOTIFY so that every worker's broker hears
+it from a LISTEN thread.
+"""
+import asyncio
+import json
+import select
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from . import models
+
+NOTIFY_CHANNEL = 'gradesheet_changes'
+NOTIFY_MAX_IDS = 500  # keeps each payload well under the 8000 byte NOTIFY limit
+QUEUE_SIZE = 100
+
+
+def latest_cursor():
+    """Id of the newest ScoreChange: clients resume a stream or poll from it."""
+    return models.ScoreChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def gradesheet_delta(course_id, enrollment_ids, cursor=None):
+    """Gradesheet rows (cells and final grade) of the given enrollments of a course."""
+    from .views import gradesheet_grades, gradesheet_structure
+
+    enrollment_ids = list(enrollment_ids)
+    final_grades = dict(models.Enrollment.objects.filter(
+        course_id=course_id, id__in=enrollment_ids
+    ).values_list('id', 'final_grade'))
+    grades = gradesheet_grades(course_id, gradesheet_structure(course_id), list(final_grades)) if final_grades else {}
+    return {
+        'course_id': course_id,
+        'cursor': latest_cursor() if cursor is None else cursor,
+        'rows': [
+            {'enrollment_id': e, 'grades': grades[e], 'final_grade': final_grades[e]}
+            for e in sorted(final_grades)
+        ],
+    }
+
+
+def changes_since(course_id, cursor):
+    """Delta of every enrollment of the course with a ScoreChange newer than cursor."""
+    latest = latest_cursor()
+    changed = set(models.ScoreChange.objects.filter(
+        id__gt=cursor, id__lte=latest, enrollment__course_id=course_id
+    ).values_list('enrollment_id', flat=True))
+    return gradesheet_delta(course_id, changed, cursor=latest)
+
+
+class GradesheetBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = {}  # course_id -> {queue: event loop}
+
+    def subscribe(self, course_id):
+        """Queue of deltas for one course; must be called from the stream's event loop."""
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._streams.setdefault(course_id, {})[queue] = asyncio.get_running_loop()
+        _backend().listen()
+        return queue
+
+    def unsubscribe(self, course_id, queue):
+        with self._lock:
+            streams = self._streams.get(course_id, {})
+            streams.pop(queue, None)
+            if not streams:
+                self._streams.pop(course_id, None)
+
+    def has_streams(self, course_id=None):
+        with self._lock:
+            return bool(self._streams) if course_id is None else course_id in self._streams
+
+    def deliver(self, course_id, enrollment_ids):
+        with self._lock:
+            targets = list(self._streams.get(course_id, {}).items())
+        if not targets:
+            return
+        delta = gradesheet_delta(course_id, enrollment_ids)
+        for queue, loop in targets:
+            loop.call_soon_threadsafe(_offer, queue, delta)
+
+
+def _offer(queue, delta):
+    try:
+        queue.put_nowait(delta)
+    except asyncio.QueueFull:
+        # A stalled client: drop what it has not read and tell it to reload once
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({'course_id': delta['course_id'], 'cursor': delta['cursor'], 'reset': True})
+
+
+broker = GradesheetBroker()
+
+
+class LocalBackend:
+    def listen(self):
+        pass
+
+    def publish(self, course_id, enrollment_ids):
+        broker.deliver(course_id, enrollment_ids)
+
+
+class PostgresBackend:
+    def __init__(self):
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, course_id, enrollment_ids):
+        with connection.cursor() as cursor:
+            for i in range(0, len(enrollment_ids), NOTIFY_MAX_IDS):
+                payload = json.dumps({'c': course_id, 'e': enrollment_ids[i:i + NOTIFY_MAX_IDS]})
+                cursor.execute("SELECT pg_notify(%s, %s)", [NOTIFY_CHANNEL, payload])
+
+    def listen(self):
+        """Starts this process's LISTEN thread on first use."""
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._run, name='gradesheet-listen', daemon=True)
+                self._listener.start()
+
+    def _run(self):
+        import psycopg2
+
+        db = settings.DATABASES['default']
+        conn = psycopg2.connect(
+            dbname=db['NAME'], user=db['USER'], password=db['PASSWORD'], host=db['HOST'], port=db['PORT'] or None
+        )
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        conn.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+        while True:
+            if select.select([conn], [], [], 60) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    payload = json.loads(notify.payload)
+                    close_old_connections()
+                    broker.deliver(payload['c'], payload['e'])
+                except Exception as e:
+                    print(f"Could not deliver gradesheet change {notify.payload}: {e}")
+
+
+_backends = {}
+
+
+def _backend():
+    name = settings.GRADESHEET_EVENTS_BACKEND
+    if name not in _backends:
+        _backends[name] = PostgresBackend() if name == 'postgres' else LocalBackend()
+    return _backends[name]
+
+
+def publish_enrollment_changes(enrollment_ids):
+    """Announces that the gradesheet rows of these enrollments changed (call after the writes)."""
+    backend = _backend()
+    if isinstance(backend, LocalBackend) and not broker.has_streams():
+        return  # nobody in this process is listening
+    ids = set()
+    for e in enrollment_ids:
+        try:
+            ids.add(int(e))
+        except (TypeError, ValueError):
+            continue
+    by_course = {}
+    for enrollment_id, course_id in models.Enrollment.objects.filter(id__in=ids).values_list('id', 'course_id'):
+        by_course.setdefault(course_id, []).append(enrollment_id)
+    for course_id, course_enrollments in by_course.items():
+        try:
+            backend.publish(course_id, sorted(course_enrollments))
+        except Exception as e:
+            # Live updates are best effort; the save itself already succeeded
+            print(f"Could not publish gradesheet change for course {course_id}: {e}")
@@ -0,0 +1,329 @@
+"""
+Whole-course grade computation on NumPy int64 matrices of exact hundredths.
+
+Every score, weight and percentage in the grading tables is a decimal with two
+places, so the math runs on integer hundredths ("cents"): no per-student ORM
+objects, no Decimal/float mixing. CourseGradeData loads a course into
+enrollment x column cent matrices with a fixed number of queries, and
+compute_grades derives every weighted average, per-criterion cap and final grade
+with whole-matrix operations (one pass per step, no per-student Python loop).
+The live request path (update_final_grades in views) uses stored_final_grades
+with the same cent arithmetic, so both agree to the cent.
+
+NumPy is imported on first use, so importing this module (views does) adds
+nothing to worker boot.
+
+Rules (the same ones recalculate_sub_criterion_scores and update_final_grade apply):
+
+* A sub-criterion with tasks whose weights add up to more than 0 is worth
+      Sum(task score * task weight) / Sum(task weights) * percentage
+  with missing task scores counted as 0. It is computed exactly and rounded once
+  to 2 decimals, half to even, which is what the DecimalField columns do on save.
+* Any other sub-criterion (project or manual) counts its stored CriterionScore.
+* Special criteria count their stored SpecialCriterionScore.
+* Final grade = Sum over the template's criteria of
+      min(sub-criterion points + special points under it, criterion weight)
+  A course without an evaluation template sums every score, uncapped.
+"""
+from decimal import Decimal
+
+from . import models
+
+CENT = Decimal('0.01')
+
+
+def to_cents(value):
+    """Decimal/float/int with at most 2 decimals -> int hundredths."""
+    return int((Decimal(str(value)) * 100).to_integral_value())
+
+
+def from_cents(cents):
+    return (Decimal(int(cents)) * CENT).quantize(CENT)
+
+
+def div_round_half_even(numerator, denominator):
+    """
+    numerator / denominator rounded to the nearest integer, ties to even.
+    Works element-wise on int64 arrays (denominator > 0) as well as on ints.
+    """
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def task_average_points(weighted, total_weight, percentage):
+    """
+    Decimal points of one task-graded criterion, weighted / total_weight * percentage
+    (weighted = Sum(score * task weight)), rounded to hundredths like compute_grades.
+    """
+    return from_cents(div_round_half_even(to_cents(weighted) * to_cents(percentage), int(total_weight) * 100))
+
+
+def capped_total(totals, caps):
+    """Final grade in cents: Sum of min(criterion total, criterion weight)."""
+    return sum(min(total, cap) for total, cap in zip(totals, caps))
+
+
+def _index(ids):
+    return {pk: i for i, pk in enumerate(ids)}
+
+
+class CourseGradeData:
+    """
+    One course's grading structure and scores, loaded with a fixed number of
+    queries (independent of the number of students) into int64 cent matrices
+    with one row per enrollment.
+    """
+
+    def __init__(self, course_id):
+        import numpy as np
+
+        course = models.Course.objects.select_related('subject').get(pk=course_id)
+        template_id = course.subject.evaluation_template_id if course.subject else None
+        self.course_id = course_id
+        self.has_template = template_id is not None
+
+        enrollments = list(
+            models.Enrollment.objects.filter(course_id=course_id).order_by('id').values_list('id', 'final_grade')
+        )
+        self.enrollment_ids = [e for e, _ in enrollments]
+        self.stored_final = [grade for _, grade in enrollments]
+        enrollment_index = _index(self.enrollment_ids)
+
+        # Parent criteria (only those of the template count towards the final grade)
+        criteria = list(models.EvaluationCriterion.objects.filter(
+            evaluation_template_id=template_id
+        ).order_by('id').values_list('id', 'weight')) if template_id else []
+        self.criterion_ids = [c for c, _ in criteria]
+        self.criterion_weight = np.array([to_cents(w) for _, w in criteria], dtype=np.int64)
+        parent_index = _index(self.criterion_ids)
+
+        # Sub-criteria columns; parent -1 = not under a template criterion
+        subs = list(models.CourseSubCriterion.objects.filter(course_id=course_id).order_by('id').values_list(
+            'id', 'parent_criterion_id', 'percentage'
+        ))
+        self.sub_ids = [s for s, _, _ in subs]
+        sub_index = _index(self.sub_ids)
+        self.sub_parent = np.array([parent_index.get(p, -1) for _, p, _ in subs], dtype=np.int64)
+        self.sub_percentage = np.array([to_cents(pct) for _, _, pct in subs], dtype=np.int64)
+
+        specials = list(models.CourseSpecialCriterion.objects.filter(course_id=course_id).order_by('id').values_list(
+            'id', 'parent_criterion_id'
+        ))
+        self.special_ids = [s for s, _ in specials]
+        special_index = _index(self.special_ids)
+        self.special_parent = np.array([parent_index.get(p, -1) for _, p in specials], dtype=np.int64)
+
+        # Tasks of sub-criteria: owning column and weight; total weight per column
+        tasks = list(models.CourseTask.objects.filter(
+            sub_criterion__course_id=course_id
+        ).order_by('id').values_list('id', 'sub_criterion_id', 'weight'))
+        task_index = _index(t for t, _, _ in tasks)
+        task_sub = np.array([sub_index[s] for _, s, _ in tasks], dtype=np.int64)
+        task_weight = np.array([w for _, _, w in tasks], dtype=np.int64)
+        self.sub_total_weight = np.bincount(task_sub, weights=task_weight, minlength=len(self.sub_ids)).astype(np.int64)
+
+        shape = (len(self.enrollment_ids), len(self.sub_ids))
+
+        # Sum(score cents * weight) per (enrollment, sub-criterion)
+        scores = list(models.TaskScore.objects.filter(
+            enrollment__course_id=course_id, task_id__in=list(task_index)
+        ).values_list('enrollment_id', 'task_id', 'score'))
+        rows = np.array([enrollment_index[e] for e, _, _ in scores], dtype=np.int64)
+        task_rows = np.array([task_index[t] for _, t, _ in scores], dtype=np.int64)
+        cents = np.array([to_cents(score) for _, _, score in scores], dtype=np.int64)
+        self.weighted = np.zeros(shape, dtype=np.int64)
+        np.add.at(self.weighted, (rows, task_sub[task_rows]), cents * task_weight[task_rows])
+
+        # Stored direct scores (cents)
+        self.stored_sub = self._matrix(shape, models.CriterionScore.objects.filter(
+            enrollment__course_id=course_id, sub_criterion__course_id=course_id
+        ).values_list('enrollment_id', 'sub_criterion_id', 'score'), enrollment_index, sub_index)
+        self.stored_special = self._matrix((len(self.enrollment_ids), len(self.special_ids)),
+                                           models.SpecialCriterionScore.objects.filter(
+            enrollment__course_id=course_id, special_criterion__course_id=course_id
+        ).values_list('enrollment_id', 'special_criterion_id', 'score'), enrollment_index, special_index)
+
+    @staticmethod
+    def _matrix(shape, cells, row_index, column_index):
+        import numpy as np
+
+        cells = list(cells)
+        matrix = np.zeros(shape, dtype=np.int64)
+        matrix[
+            np.array([row_index[r] for r, _, _ in cells], dtype=np.int64),
+            np.array([column_index[c] for _, c, _ in cells], dtype=np.int64),
+        ] = [to_cents(score) for _, _, score in cells]
+        return matrix
+
+    def compute(self):
+        return compute_grades(self)
+
+
+class GradeResult:
+    """Computed grades in cents: sub_points[enrollment, sub-criterion] and final[enrollment]."""
+
+    def __init__(self, data, sub_points, task_graded, final):
+        self.enrollment_ids = data.enrollment_ids
+        self.sub_ids = data.sub_ids
+        self.sub_points = sub_points
+        self.task_graded = task_graded
+        self.final = final
+
+    def final_grades(self):
+        """{enrollment_id: Decimal final grade}"""
+        return {e: from_cents(cents) for e, cents in zip(self.enrollment_ids, self.final.tolist())}
+
+    def criterion_scores(self):
+        """{(enrollment_id, sub_criterion_id): Decimal} for the task-graded sub-criteria."""
+        graded = [(j, s) for j, s in enumerate(self.sub_ids) if self.task_graded[j]]
+        points = self.sub_points.tolist()
+        return {
+            (e, s): from_cents(points[i][j])
+            for i, e in enumerate(self.enrollment_ids)
+            for j, s in graded
+        }
+
+
+def _parent_matrix(parents, n_criteria):
+    """columns x criteria 0/1 matrix: column j counts towards criterion parents[j]."""
+    import numpy as np
+
+    matrix = np.zeros((len(parents), n_criteria), dtype=np.int64)
+    under = parents >= 0
+    matrix[np.flatnonzero(under), parents[under]] = 1
+    return matrix
+
+
+def compute_grades(data):
+    import numpy as np
+
+    # Task-graded columns: weighted cents * percentage cents / (total weight * 100)
+    task_graded = data.sub_total_weight > 0
+    divisors = np.where(task_graded, data.sub_total_weight * 100, 1)
+    averaged = div_round_half_even(data.weighted * data.sub_percentage, divisors)
+    sub_points = np.where(task_graded, averaged, data.stored_sub)
+
+    if not data.has_template:
+        final = sub_points.sum(axis=1) + data.stored_special.sum(axis=1)
+    else:
+        n_criteria = len(data.criterion_ids)
+        totals = (sub_points @ _parent_matrix(data.sub_parent, n_criteria)
+                  + data.stored_special @ _parent_matrix(data.special_parent, n_criteria))
+        final = np.minimum(totals, data.criterion_weight).sum(axis=1)
+
+    return GradeResult(data, sub_points, task_graded, final)
+
+
+def compute_course_grades(course_id):
+    """Loads one course and computes every enrollment's grades."""
+    return CourseGradeData(course_id).compute()
+
+
+def stored_final_grades(enrollment_ids):
+    """
+    {enrollment_id: Decimal final grade} from the stored CriterionScores and
+    SpecialCriterionScores, for enrollments of any courses: two grouped sums, then
+    the same cent arithmetic and caps as compute_grades. Enrollments of closed
+    periods are left out, their grades are frozen.
+    """
+    from django.db.models import Sum
+
+    enrollments = dict(models.Enrollment.objects.filter(
+        id__in=set(enrollment_ids), course__period__closed_at__isnull=True
+    ).values_list(
+        'id', 'course__subject__evaluation_template_id'
+    ))
+    if not enrollments:
+        return {}
+
+    caps = {}  # template id -> [(criterion id, weight cents)]
+    for criterion_id, template_id, weight in models.EvaluationCriterion.objects.filter(
+        evaluation_template_id__in={t for t in enrollments.values() if t}
+    ).order_by('id').values_list('id', 'evaluation_template_id', 'weight'):
+        caps.setdefault(template_id, []).append((criterion_id, to_cents(weight)))
+
+    # (enrollment_id, parent_criterion_id) -> summed points in cents
+    totals = {}
+    ids = list(enrollments)
+    grouped = [
+        models.CriterionScore.objects.filter(enrollment_id__in=ids)
+        .values_list('enrollment_id', 'sub_criterion__parent_criterion_id').annotate(t=Sum('score')),
+        models.SpecialCriterionScore.objects.filter(enrollment_id__in=ids)
+        .values_list('enrollment_id', 'special_criterion__parent_criterion_id').annotate(t=Sum('score')),
+    ]
+    for rows in grouped:
+        for enrollment_id, criterion_id, total in rows:
+            key = (enrollment_id, criterion_id)
+            totals[key] = totals.get(key, 0) + to_cents(total or 0)
+
+    grades = {}
+    for enrollment_id, template_id in enrollments.items():
+        if template_id:
+            criteria = caps.get(template_id, [])
+            cents = capped_total((totals.get((enrollment_id, c), 0) for c, _ in criteria), (w for _, w in criteria))
+        else:
+            cents = sum(v for (e, _), v in totals.items() if e == enrollment_id)
+        grades[enrollment_id] = from_cents(cents)
+    return grades
+
+
+def recompute_course(course_id, dry_run=False, batch_size=500):
+    """
+    Recomputes a course and writes only what differs: task-graded CriterionScores
+    (bulk_update / bulk_create) and Enrollment.final_grade (bulk_update), in one
+    transaction. Returns a stats dict; with dry_run nothing is written and
+    'changes' lists (kind, enrollment_id, column, old, new) tuples instead.
+    Courses of closed periods are left untouched ('closed': True).
+    """
+    from django.db import transaction
+
+    if models.Course.objects.filter(id=course_id, period__closed_at__isnull=False).exists():
+        return {'course_id': course_id, 'closed': True, 'enrollments': 0, 'criterion_scores': 0,
+                'final_grades': 0, 'changes': []}
+
+    data = CourseGradeData(course_id)
+    result = data.compute()
+    computed = result.criterion_scores()
+
+    existing = {
+        (row.enrollment_id, row.sub_criterion_id): row
+        for row in models.CriterionScore.objects.filter(
+            enrollment__course_id=course_id,
+            sub_criterion_id__in=[s for s, graded in zip(result.sub_ids, result.task_graded) if graded],
+        )
+    }
+    changes = []
+    to_update = []
+    to_create = []
+    for (enrollment_id, sub_id), points in computed.items():
+        row = existing.get((enrollment_id, sub_id))
+        if row is None:
+            to_create.append(models.CriterionScore(enrollment_id=enrollment_id, sub_criterion_id=sub_id, score=points))
+            changes.append(('criterion', enrollment_id, sub_id, None, points))
+        elif row.score != points:
+            changes.append(('criterion', enrollment_id, sub_id, row.score, points))
+            row.score = points
+            to_update.append(row)
+
+    enrollments = []
+    for enrollment_id, old, new in zip(result.enrollment_ids, data.stored_final, result.final_grades().values()):
+        if old is None or Decimal(old).quantize(CENT) != new:
+            changes.append(('final', enrollment_id, None, old, new))
+            enrollments.append(models.Enrollment(id=enrollment_id, final_grade=new))
+
+    if not dry_run:
+        with transaction.atomic():
+            models.CriterionScore.objects.bulk_update(to_update, ['score'], batch_size=batch_size)
+            models.CriterionScore.objects.bulk_create(to_create, batch_size=batch_size)
+            models.Enrollment.objects.bulk_update(enrollments, ['final_grade'], batch_size=batch_size)
+
+    return {
+        'course_id': course_id,
+        'enrollments': len(result.enrollment_ids),
+        'criterion_scores': len(to_update) + len(to_create),
+        'final_grades': len(enrollments),
+        'closed': False,
+        'changes': changes if dry_run else [],
+    }
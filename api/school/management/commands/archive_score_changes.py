@@ -0,0 +1,69 @@
+import gzip
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.school.models import ScoreChange
+
+FIELDS = ('id', 'kind', 'enrollment_id', 'column_id', 'old_score', 'new_score', 'changed_by_id', 'changed_at')
+
+
+def month_start(year, month):
+    return timezone.make_aware(datetime(year, month, 1))
+
+
+def next_month(start):
+    return month_start(start.year + start.month // 12, start.month % 12 + 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves ScoreChange rows older than --keep-months out of the database, "
+        "one gzipped JSON-lines file per calendar month (score_changes-YYYY-MM.jsonl.gz)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, default=12,
+                            help="Whole months kept in the table besides the current one.")
+        parser.add_argument('--output-dir', default=os.path.join(settings.BASE_DIR, 'score_change_archive'))
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be archived.")
+
+    def handle(self, *args, **options):
+        now = timezone.localtime()
+        months_back = now.year * 12 + now.month - 1 - options['keep_months']
+        cutoff = month_start(months_back // 12, months_back % 12 + 1)
+
+        oldest = ScoreChange.objects.filter(changed_at__lt=cutoff).order_by('changed_at').values_list('changed_at', flat=True).first()
+        if oldest is None:
+            self.stdout.write(f"Nothing older than {cutoff:%Y-%m}.")
+            return
+
+        os.makedirs(options['output_dir'], exist_ok=True)
+        oldest = timezone.localtime(oldest)
+        start = month_start(oldest.year, oldest.month)
+        while start < cutoff:
+            end = next_month(start)
+            rows = ScoreChange.objects.filter(changed_at__gte=start, changed_at__lt=end)
+            count = rows.count()
+            if count and not options['dry_run']:
+                self.archive(rows, os.path.join(options['output_dir'], f"score_changes-{start:%Y-%m}.jsonl.gz"))
+            if count:
+                self.stdout.write(f"{start:%Y-%m}: {count} changes {'to archive' if options['dry_run'] else 'archived'}")
+            start = end
+
+    def archive(self, rows, path):
+        """Appends the month to its file, then deletes the rows that were written."""
+        encoder = JSONEncoder()
+        ids = []
+        with gzip.open(path, 'at', encoding='utf-8') as f:
+            for row in rows.order_by('id').values(*FIELDS).iterator(chunk_size=2000):
+                f.write(encoder.encode(row) + '\n')
+                ids.append(row['id'])
+        with transaction.atomic():
+            for i in range(0, len(ids), 2000):
+                ScoreChange.objects.filter(id__in=ids[i:i + 2000]).delete()
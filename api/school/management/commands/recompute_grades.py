@@ -0,0 +1,102 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.school import models
+from api.school.grading import recompute_course
+
+
+def _init_worker():
+    """Each worker process opens its own DB connection on first use."""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:  # spawn start method: fresh interpreter
+        django.setup()
+    connections.close_all()
+
+
+def _recompute(course_id, dry_run, batch_size):
+    try:
+        return recompute_course(course_id, dry_run=dry_run, batch_size=batch_size)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds task-graded CriterionScores and final grades from the current templates, "
+        "weights and task scores, one course per worker process, writing only what changed. "
+        "Courses of closed periods keep their frozen grades and are skipped."
+    )
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--period', type=int, help="Every course of this academic period.")
+        scope.add_argument('--course', type=int, action='append', help="A course id (repeatable).")
+        scope.add_argument('--all', action='store_true', help="Every course.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes (1 = run in this process).")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Report the differences, write nothing.")
+
+    def handle(self, *args, **options):
+        courses = models.Course.objects.order_by('id')
+        if options['period']:
+            courses = courses.filter(period_id=options['period'])
+        elif options['course']:
+            courses = courses.filter(id__in=options['course'])
+        closed = courses.filter(period__closed_at__isnull=False).count()
+        course_ids = list(courses.filter(period__closed_at__isnull=True).values_list('id', flat=True))
+        if closed:
+            self.stdout.write(f"Skipping {closed} course(s) of closed periods.")
+        if not course_ids:
+            raise CommandError("No courses match." if not closed else "Every matching course belongs to a closed period.")
+
+        dry_run = options['dry_run']
+        workers = max(1, min(options['workers'], len(course_ids)))
+        start = time.perf_counter()
+        totals = {'enrollments': 0, 'criterion_scores': 0, 'final_grades': 0}
+
+        for stats in self.run(course_ids, workers, dry_run, options['batch_size']):
+            for key in totals:
+                totals[key] += stats[key]
+            if dry_run:
+                self.report(stats, options['verbosity'])
+
+        elapsed = time.perf_counter() - start
+        verb = "would change" if dry_run else "updated"
+        self.stdout.write(
+            f"{len(course_ids)} courses, {totals['enrollments']} enrollments with {workers} worker(s) "
+            f"in {elapsed:.2f}s ({totals['enrollments'] / elapsed if elapsed else 0:.0f} enrollments/s); "
+            f"{verb} {totals['criterion_scores']} criterion scores and {totals['final_grades']} final grades"
+        )
+
+    def run(self, course_ids, workers, dry_run, batch_size):
+        if workers == 1:
+            for course_id in course_ids:
+                yield recompute_course(course_id, dry_run=dry_run, batch_size=batch_size)
+            return
+
+        # Forked workers must not share the parent's socket
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(_recompute, course_id, dry_run, batch_size) for course_id in course_ids]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def report(self, stats, verbosity):
+        if not stats['changes']:
+            return
+        self.stdout.write(
+            f"course {stats['course_id']}: {stats['criterion_scores']} criterion scores, "
+            f"{stats['final_grades']} final grades differ"
+        )
+        if verbosity < 2:
+            return
+        for kind, enrollment_id, column, old, new in stats['changes']:
+            target = f"sub-criterion {column}" if kind == 'criterion' else "final grade"
+            self.stdout.write(f"  enrollment {enrollment_id} {target}: {old} -> {new}")
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.13 on 2026-10-19 18:23
+
+import api.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0029_course_is_visible'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='image',
+            field=models.FileField(blank=True, null=True, storage=api.images.ImageRenditionStorage(), upload_to='course_images/'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 3.2.13 on 2026-10-19 18:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_sub_criterion(apps, schema_editor):
+    """
+    Copies each project's sub-criterion onto its memberships. Students already in
+    several projects of one sub-criterion keep only their earliest membership
+    tagged; the others stay NULL so the unique constraint can be added without
+    deleting data.
+    """
+    ProjectMembership = apps.get_model('school', 'ProjectMembership')
+    seen = set()
+    batch = []
+    memberships = ProjectMembership.objects.select_related('project').order_by('project_id', 'id')
+    for membership in memberships.iterator():
+        key = (membership.project.sub_criterion_id, membership.enrollment_id)
+        if key in seen:
+            continue
+        seen.add(key)
+        membership.sub_criterion_id = membership.project.sub_criterion_id
+        batch.append(membership)
+    ProjectMembership.objects.bulk_update(batch, ['sub_criterion'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0030_alter_course_image'),
+    ]
+
+    operations = [
+        # Adopt the auto-created school_project_members table as an explicit through model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ProjectMembership',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='school.enrollment')),
+                        ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='school.project')),
+                    ],
+                    options={
+                        'db_table': 'school_project_members',
+                        'unique_together': {('project', 'enrollment')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='project',
+                    name='members',
+                    field=models.ManyToManyField(related_name='projects', through='school.ProjectMembership', to='school.Enrollment'),
+                ),
+            ],
+            database_operations=[],
+        ),
+        migrations.AddField(
+            model_name='projectmembership',
+            name='sub_criterion',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='school.coursesubcriterion'),
+        ),
+        migrations.RunPython(backfill_sub_criterion, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='projectmembership',
+            constraint=models.UniqueConstraint(fields=('sub_criterion', 'enrollment'), name='unique_project_per_sub_criterion'),
+        ),
+    ]
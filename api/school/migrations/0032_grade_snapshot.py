@@ -0,0 +1,31 @@
+# Generated by Django 3.2.13 on 2026-10-19 18:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import rest_framework.utils.encoders
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0031_projectmembership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academicperiod',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='GradeSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('final_grade', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('breakdown', models.JSONField(encoder=rest_framework.utils.encoders.JSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_snapshots', to='school.course')),
+                ('enrollment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='grade_snapshot', to='school.enrollment')),
+            ],
+        ),
+    ]
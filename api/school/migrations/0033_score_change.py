@@ -0,0 +1,33 @@
+# Generated by Django 3.2.13 on 2026-10-19 18:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('school', '0032_grade_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('score', 'Score'), ('criterion', 'CriterionScore'), ('special', 'SpecialCriterionScore'), ('task', 'TaskScore')], max_length=10)),
+                ('column_id', models.BigIntegerField()),
+                ('old_score', models.DecimalField(decimal_places=2, max_digits=5, null=True)),
+                ('new_score', models.DecimalField(decimal_places=2, max_digits=5, null=True)),
+                ('changed_at', models.DateTimeField(db_index=True)),
+                ('changed_by', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('enrollment', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='school.enrollment')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='scorechange',
+            index=models.Index(fields=['enrollment', 'kind', 'column_id', 'changed_at'], name='score_change_cell_idx'),
+        ),
+    ]
@@ -1,7 +1,93 @@
 
 
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Subquery, Sum
 from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.images import image_storage
+
+
+class RoleScopedQuerySet(models.QuerySet):
+    """
+    Adds visible_to(user): the rows a user may see according to their role.
+    Subclasses say how to reach the course (course_path, '' for Course itself) and,
+    for rows owned by one student, the student (student_path).
+    Scoping uses EXISTS / IN subqueries, never joins plus DISTINCT.
+    """
+    course_path = 'course'
+    student_path = None
+
+    def _lookup(self, path, field):
+        return f"{path}__{field}" if path else field
+
+    def visible_to(self, user):
+        role = getattr(user, 'role', None)
+        if role == 'ADMIN' or getattr(user, 'is_superuser', False):
+            return self.all()
+        if role == 'TEACHER':
+            return self.filter(**{self._lookup(self.course_path, 'teacher'): user})
+        if role not in ('STUDENT', 'PARENT'):
+            return self.none()
+
+        children = FamilyRelationship.objects.filter(parent=user).values('student_id')
+        if self.student_path:
+            if role == 'STUDENT':
+                return self.filter(**{self.student_path: user})
+            return self.filter(**{f"{self.student_path}__in": children})
+
+        course_ref = f"{self.course_path}_id" if self.course_path else 'pk'
+        enrolled = Enrollment.objects.filter(course_id=OuterRef(course_ref))
+        if role == 'STUDENT':
+            enrolled = enrolled.filter(student=user)
+        else:
+            enrolled = enrolled.filter(student__in=children)
+        return self.filter(Exists(enrolled))
+
+
+class CourseQuerySet(RoleScopedQuerySet):
+    course_path = ''
+
+
+class EnrollmentQuerySet(RoleScopedQuerySet):
+    student_path = 'student'
+
+
+class EnrollmentOwnedQuerySet(RoleScopedQuerySet):
+    """Per-student rows (scores): students and parents only see their own."""
+    course_path = 'enrollment__course'
+    student_path = 'enrollment__student'
+
+
+# CourseTask foreign key for each kind of task-graded criterion
+TASK_CRITERION_FIELDS = {'sub': 'sub_criterion', 'special': 'special_criterion'}
+
+
+class TaskScoreQuerySet(EnrollmentOwnedQuerySet):
+    def criterion_points(self, kind='sub'):
+        """
+        One grouped row per (enrollment, criterion) with the exact parts of the
+        criterion's weighted task average:
+            weighted = Sum(score * task weight), total_weight = Sum(weight of all the
+            criterion's tasks), percentage
+        The division is left to grading.task_average_points, which rounds it to
+        hundredths like the grading run does (no float division in the database).
+        Students without any task score under a criterion get no row.
+        """
+        fk = TASK_CRITERION_FIELDS[kind]
+        total_weight = CourseTask.objects.filter(**{fk: OuterRef(f'task__{fk}')}).order_by().values(fk).annotate(
+            w=Sum('weight')
+        ).values('w')
+        return self.filter(**{f'task__{fk}__isnull': False}).order_by().values(
+            'enrollment_id', criterion_id=F(f'task__{fk}')
+        ).annotate(
+            weighted=Sum(
+                F('score') * F('task__weight'), output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            ),
+            total_weight=Subquery(total_weight, output_field=models.IntegerField()),
+            percentage=F(f'task__{fk}__percentage'),
+        )
+
 
 class AcademicPeriod(models.Model):
     name = models.CharField(max_length=255)
@@ -9,6 +95,7 @@ class AcademicPeriod(models.Model):
     end_date = models.DateField()
     active = models.BooleanField(default=True)
     parent_period = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='sub_periods')
+    closed_at = models.DateTimeField(null=True, blank=True)  # grades frozen into GradeSnapshot
 
     def __str__(self):
         return self.name
@@ -51,7 +138,9 @@ class Course(models.Model):
     is_registration_open = models.BooleanField(default=False)
     registration_start = models.DateTimeField(null=True, blank=True)
     registration_end = models.DateTimeField(null=True, blank=True)
-    image = models.FileField(upload_to='course_images/', blank=True, null=True)
+    image = models.FileField(upload_to='course_images/', storage=image_storage, blank=True, null=True)
+
+    objects = CourseQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.subject.code} ({self.period.name}) - {self.parallel}"
@@ -62,6 +151,8 @@ class Enrollment(models.Model):
     date_enrolled = models.DateField(auto_now_add=True)
     final_grade = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
 
+    objects = EnrollmentQuerySet.as_manager()
+
     class Meta:
         unique_together = ('student', 'course')
 
@@ -160,6 +251,8 @@ class CriterionScore(models.Model):
     enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='criterion_scores')
     sub_criterion = models.ForeignKey(CourseSubCriterion, on_delete=models.CASCADE, related_name='scores')
     score = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+
+    objects = EnrollmentOwnedQuerySet.as_manager()
     
     class Meta:
         unique_together = ('enrollment', 'sub_criterion')
@@ -178,6 +271,24 @@ class SpecialCriterionScore(models.Model):
     def __str__(self):
         return f"{self.score} - {self.enrollment} - {self.special_criterion}"
 
+class GradeSnapshot(models.Model):
+    """
+    Grades of one enrollment frozen when its period is closed: the gradesheet cells
+    ('grades') and the dashboard breakdown ('criteria'), encoded like the API renders them.
+    """
+    enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name='grade_snapshot')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='grade_snapshots')
+    final_grade = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    breakdown = models.JSONField(encoder=JSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def grades(self):
+        """Gradesheet cells keyed like the live ones (JSON turned sub-criterion ids into strings)."""
+        return {int(key) if key.isdigit() else key: value for key, value in self.breakdown['grades'].items()}
+
+    def __str__(self):
+        return f"{self.final_grade} - {self.enrollment}"
+
 class CourseTask(models.Model):
     sub_criterion = models.ForeignKey(CourseSubCriterion, on_delete=models.CASCADE, related_name='tasks', null=True, blank=True)
     special_criterion = models.ForeignKey(CourseSpecialCriterion, on_delete=models.CASCADE, related_name='tasks', null=True, blank=True)
@@ -202,6 +313,8 @@ class TaskScore(models.Model):
     enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='task_scores')
     task = models.ForeignKey(CourseTask, on_delete=models.CASCADE, related_name='scores')
     score = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+
+    objects = TaskScoreQuerySet.as_manager()
     
     class Meta:
         unique_together = ('enrollment', 'task')
@@ -209,18 +322,90 @@ class TaskScore(models.Model):
     def __str__(self):
         return f"{self.score} - {self.enrollment} - {self.task}"
 
+class ScoreChangeQuerySet(EnrollmentOwnedQuerySet):
+    def for_cell(self, kind, enrollment_id, column_id):
+        return self.filter(kind=kind, enrollment_id=enrollment_id, column_id=column_id)
+
+    def for_enrollment(self, enrollment_id):
+        return self.filter(enrollment_id=enrollment_id)
+
+    def history(self):
+        """Compact rows, newest first."""
+        return self.order_by('-changed_at', '-id').values(
+            'kind', 'enrollment_id', 'column_id', 'old_score', 'new_score', 'changed_by_id', 'changed_at'
+        )
+
+
+class ScoreChange(models.Model):
+    """
+    Append-only history of score cells: one row per changed value, written in batches by
+    the bulk-save endpoints (see audit.ScoreChangeLog). column_id is the sub-evaluation,
+    sub-criterion, special criterion or task id depending on kind. No FK constraints,
+    so history outlives the rows it describes.
+    """
+    SCORE = 'score'
+    CRITERION = 'criterion'
+    SPECIAL = 'special'
+    TASK = 'task'
+    KIND_CHOICES = [
+        (SCORE, 'Score'),
+        (CRITERION, 'CriterionScore'),
+        (SPECIAL, 'SpecialCriterionScore'),
+        (TASK, 'TaskScore'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    column_id = models.BigIntegerField()
+    old_score = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    new_score = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    changed_at = models.DateTimeField(db_index=True)
+
+    objects = ScoreChangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['enrollment', 'kind', 'column_id', 'changed_at'], name='score_change_cell_idx')]
+
+    def __str__(self):
+        return f"{self.kind} {self.enrollment_id}/{self.column_id}: {self.old_score} -> {self.new_score}"
+
 class Project(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='projects')
     sub_criterion = models.ForeignKey(CourseSubCriterion, on_delete=models.CASCADE, related_name='projects')
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     student_in_charge = models.ForeignKey(Enrollment, on_delete=models.SET_NULL, null=True, blank=True, related_name='led_projects')
-    members = models.ManyToManyField(Enrollment, related_name='projects')
+    members = models.ManyToManyField(Enrollment, related_name='projects', through='ProjectMembership')
     score = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+
+    objects = RoleScopedQuerySet.as_manager()
     
     def __str__(self):
         return self.name
 
+    def set_members(self, enrollments):
+        """Replaces the members; always use this (not members.set) so the sub-criterion is recorded."""
+        self.members.set(enrollments, through_defaults={'sub_criterion_id': self.sub_criterion_id})
+
+class ProjectMembership(models.Model):
+    """
+    Project.members through table (keeps the original auto-created table).
+    sub_criterion is copied from the project so the database guarantees a student
+    joins at most one project per sub-criterion, even under concurrent registrations.
+    It is null only for duplicate memberships that predate the constraint.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE)
+    sub_criterion = models.ForeignKey(CourseSubCriterion, on_delete=models.CASCADE, null=True, related_name='+')
+
+    class Meta:
+        db_table = 'school_project_members'
+        unique_together = ('project', 'enrollment')
+        constraints = [
+            models.UniqueConstraint(fields=['sub_criterion', 'enrollment'], name='unique_project_per_sub_criterion'),
+        ]
+
 class RegistrationRequest(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
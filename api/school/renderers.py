@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+from api.renderers import FastJSONRenderer
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """
+    JSON renderer selected with ?format=columnar.
+    Views check wants_columnar(request) to build the compact payload
+    (column ids listed once, dense score matrix) instead of row dicts.
+    """
+    format = 'columnar'
+    columnar = True
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Binary renderer for ?format=msgpack or Accept: application/msgpack.
+    Always paired with the columnar payload. Only offered when msgpack is installed.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    columnar = True
+
+    @staticmethod
+    def _default(obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        raise TypeError(f"Cannot serialize {type(obj).__name__} to MessagePack")
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self._default, use_bin_type=True)
+
+
+def with_columnar(renderer_classes=None):
+    """Default renderer classes plus the compact ones, for use on @action."""
+    if renderer_classes is None:
+        renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    extra = [ColumnarJSONRenderer]
+    if msgpack is not None:
+        extra.append(MessagePackRenderer)
+    return [*renderer_classes, *extra]
+
+
+def wants_columnar(request):
+    renderer = getattr(request, 'accepted_renderer', None)
+    return getattr(renderer, 'columnar', False)
@@ -1,7 +1,11 @@
+import traceback
+
 from rest_framework import serializers
+from django.db.models import Exists, OuterRef
 from . import models
 from api.user.serializers import UserSerializer
 from django.contrib.auth import get_user_model
+from api.images import rendition_urls
 
 User = get_user_model()
 
@@ -9,6 +13,7 @@ class AcademicPeriodSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.AcademicPeriod
         fields = '__all__'
+        read_only_fields = ('closed_at',)
 
 class ProgramSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,10 +21,12 @@ class ProgramSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class EvaluationCriterionSerializer(serializers.ModelSerializer):
+    # Writable so template updates can match existing criteria by id
+    id = serializers.IntegerField(required=False)
+
     class Meta:
         model = models.EvaluationCriterion
         fields = ['id', 'name', 'weight']
-        read_only_fields = ['id']
 
 class EvaluationTemplateSerializer(serializers.ModelSerializer):
     criteria = EvaluationCriterionSerializer(many=True, required=False)
@@ -32,23 +39,80 @@ class EvaluationTemplateSerializer(serializers.ModelSerializer):
         criteria_data = validated_data.pop('criteria', [])
         template = models.EvaluationTemplate.objects.create(**validated_data)
         for criterion_data in criteria_data:
+            criterion_data.pop('id', None)
             models.EvaluationCriterion.objects.create(evaluation_template=template, **criterion_data)
         return template
 
     def update(self, instance, validated_data):
+        from django.db import transaction
+
         criteria_data = validated_data.pop('criteria', None)
-        
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        if criteria_data is not None:
-             instance.criteria.all().delete()
-             for criterion_data in criteria_data:
-                 models.EvaluationCriterion.objects.create(evaluation_template=instance, **criterion_data)
-        
+
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            affected = []
+            if criteria_data is not None:
+                affected = self._sync_criteria(instance, criteria_data)
+
+        if affected:
+            from .views import update_final_grades
+            update_final_grades(affected)
+
         return instance
 
+    def _sync_criteria(self, instance, criteria_data):
+        """
+        Diffs the submitted criteria against the template's: rows with a known id are
+        updated in place, rows without one are created, missing ones are deleted.
+        Deleting a criterion cascades to the course sub-criteria and scores under it,
+        so untouched criteria must keep their ids.
+        Returns the enrollments whose final grade changes: those with scores under a
+        deleted criterion or under one whose weight (the cap) changed.
+        """
+        existing = {c.id: c for c in instance.criteria.all()}
+        changed = []
+        new = []
+        kept = set()
+        weight_changed = set()
+        for data in criteria_data:
+            criterion = existing.get(data.get('id'))
+            if criterion is None or criterion.id in kept:
+                data.pop('id', None)
+                new.append(models.EvaluationCriterion(evaluation_template=instance, **data))
+                continue
+            kept.add(criterion.id)
+            dirty = False
+            for field in ('name', 'weight'):
+                if field in data and getattr(criterion, field) != data[field]:
+                    setattr(criterion, field, data[field])
+                    dirty = True
+                    if field == 'weight':
+                        weight_changed.add(criterion.id)
+            if dirty:
+                changed.append(criterion)
+
+        removed = set(existing) - kept
+        regraded = removed | weight_changed
+        affected = []
+        if regraded:
+            affected = list(models.Enrollment.objects.filter(
+                Exists(models.CriterionScore.objects.filter(
+                    enrollment=OuterRef('pk'), sub_criterion__parent_criterion__in=regraded))
+                | Exists(models.SpecialCriterionScore.objects.filter(
+                    enrollment=OuterRef('pk'), special_criterion__parent_criterion__in=regraded))
+            ).values_list('id', flat=True))
+
+        if changed:
+            models.EvaluationCriterion.objects.bulk_update(changed, ['name', 'weight'])
+        if new:
+            models.EvaluationCriterion.objects.bulk_create(new)
+        if removed:
+            models.EvaluationCriterion.objects.filter(id__in=removed).delete()
+        return affected
+
 class SubjectSerializer(serializers.ModelSerializer):
     program_details = ProgramSerializer(source='program', read_only=True)
     period_details = AcademicPeriodSerializer(source='period', read_only=True)
@@ -68,11 +132,15 @@ class CourseSerializer(serializers.ModelSerializer):
     course_identifier = serializers.CharField(
         max_length=100, required=False, allow_blank=True, allow_null=True
     )
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = models.Course
         fields = '__all__'
 
+    def get_image_renditions(self, obj):
+        return rendition_urls(obj.image, self.context.get('request'))
+
     def validate_course_identifier(self, value):
         # Convert empty string to None so unique constraint doesn't fail
         if value == '' or value is None:
@@ -138,6 +206,10 @@ class TaskScoreSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class ProjectSerializer(serializers.ModelSerializer):
+    # Declared explicitly: DRF makes M2M fields with a through model read-only
+    members = serializers.PrimaryKeyRelatedField(
+        many=True, required=False, queryset=models.Enrollment.objects.all()
+    )
     member_details = EnrollmentSerializer(source='members', many=True, read_only=True)
     leader_details = EnrollmentSerializer(source='student_in_charge', read_only=True)
 
@@ -145,6 +217,30 @@ class ProjectSerializer(serializers.ModelSerializer):
         model = models.Project
         fields = '__all__'
 
+    def create(self, validated_data):
+        members = validated_data.pop('members', [])
+        return self._save_members(lambda: super(ProjectSerializer, self).create(validated_data), members)
+
+    def update(self, instance, validated_data):
+        members = validated_data.pop('members', None)
+        return self._save_members(lambda: super(ProjectSerializer, self).update(instance, validated_data), members)
+
+    def _save_members(self, save, members):
+        from django.db import IntegrityError, transaction
+
+        try:
+            with transaction.atomic():
+                project = save()
+                if members is not None:
+                    project.set_members(members)
+                # Memberships carry the project's sub-criterion for the uniqueness constraint
+                models.ProjectMembership.objects.filter(
+                    project=project, sub_criterion__isnull=False
+                ).exclude(sub_criterion_id=project.sub_criterion_id).update(sub_criterion_id=project.sub_criterion_id)
+        except IntegrityError:
+            raise serializers.ValidationError({'members': 'A student can only be in one project per sub-criterion.'})
+        return project
+
 class RegistrationRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.RegistrationRequest
@@ -199,8 +295,20 @@ class RegistrationRequestSerializer(serializers.ModelSerializer):
             raise
         except Exception as e:
             # Catch internal errors and report them as validation errors to avoid 500
-            import traceback
             traceback.print_exc()
             raise serializers.ValidationError(f"Error interno validando proyecto: {str(e)}")
 
         return data
+
+class RegistrationSubmissionSerializer(RegistrationRequestSerializer):
+    """
+    Public submission form. The (course, ci) uniqueness check is left to the
+    database so submit_request can insert first and report duplicates after.
+    """
+    class Meta(RegistrationRequestSerializer.Meta):
+        validators = []
+
+class BulkRegistrationTargetsSerializer(serializers.Serializer):
+    """Body of the bulk approve/reject actions: {"ids": [...]} or {"course_id": X}."""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    course_id = serializers.IntegerField(required=False)
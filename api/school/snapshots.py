@@ -0,0 +1,76 @@
+"""
+Grade snapshots of closed academic periods.
+
+Closing a period freezes what the gradesheet and the student dashboard show for
+each of its enrollments into one GradeSnapshot row; from then on those read paths
+serve the snapshot instead of recomputing from tasks and scores, and score writes
+to the period are refused (the recalculations skip its enrollments too).
+Reopening drops the snapshots and makes the period and its subjects current again.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import models
+
+CLOSED_PERIOD_ERROR = "El periodo está cerrado; sus notas ya no se pueden modificar"
+
+
+def close_period(period):
+    """Snapshots every enrollment of the period's courses and marks it closed. Returns the snapshot count."""
+    from .views import gradesheet_grades, gradesheet_structure, student_criteria_grades
+
+    with transaction.atomic():
+        models.GradeSnapshot.objects.filter(course__period=period).delete()
+        snapshots = []
+        for course in models.Course.objects.filter(period=period).order_by('id'):
+            enrollments = list(models.Enrollment.objects.filter(course=course).select_related('course').order_by('id'))
+            grades = gradesheet_grades(course.id, gradesheet_structure(course.id), [e.id for e in enrollments])
+            for enrollment in enrollments:
+                snapshots.append(models.GradeSnapshot(
+                    enrollment=enrollment,
+                    course=course,
+                    final_grade=enrollment.final_grade,
+                    breakdown={
+                        'grades': grades[enrollment.id],
+                        'criteria': student_criteria_grades(enrollment),
+                    },
+                ))
+        models.GradeSnapshot.objects.bulk_create(snapshots, batch_size=500)
+
+        period.closed_at = timezone.now()
+        period.active = False
+        period.save(update_fields=['closed_at', 'active'])
+        models.Subject.objects.filter(period=period).update(archived=True)
+    return len(snapshots)
+
+
+def reopen_period(period):
+    """Undoes close_period; subjects stay archived only if the period has already ended."""
+    with transaction.atomic():
+        models.GradeSnapshot.objects.filter(course__period=period).delete()
+        period.closed_at = None
+        period.active = True
+        period.save(update_fields=['closed_at', 'active'])
+        models.Subject.objects.filter(period=period).update(archived=period.end_date < date.today())
+
+
+def frozen_grades(course_id):
+    """{enrollment_id: gradesheet cells} when the course's period is closed, None otherwise."""
+    if not course_is_closed(course_id):
+        return None
+    return {
+        snapshot.enrollment_id: snapshot.grades()
+        for snapshot in models.GradeSnapshot.objects.filter(course_id=course_id).only('enrollment_id', 'breakdown')
+    }
+
+
+def touches_closed_period(enrollment_ids):
+    return models.Enrollment.objects.filter(
+        id__in=[e for e in enrollment_ids if e is not None], course__period__closed_at__isnull=False
+    ).exists()
+
+
+def course_is_closed(course_id):
+    return models.Course.objects.filter(id=course_id, period__closed_at__isnull=False).exists()
@@ -0,0 +1,118 @@
+"""
+Server-sent events stream of gradesheet deltas, served by core.asgi next to Django.
+
+    GET /api/gradesheet-stream/?course_id=<id>&ticket=<ticket>[&since=<cursor>]
+
+EventSource cannot send an Authorization header, and a query parameter ends up in
+access logs, so the stream does not take the session token. The client first gets
+a ticket for one course from the authenticated gradesheet_stream_ticket action: a
+signed (user, course) pair valid for STREAM_TICKET_SECONDS, checked only when the
+stream opens. Each event is `event: grades`, `id: <cursor>`, data =
+events.gradesheet_delta. A reconnecting client fetches a new ticket and sends ?since=
+(or Last-Event-ID) to first receive the rows changed in the meantime.
+`event: reset` asks a client that fell behind to reload once.
+"""
+import asyncio
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import events, models
+
+GRADESHEET_STREAM_PATH = '/api/gradesheet-stream/'
+KEEPALIVE_SECONDS = 15
+STREAM_TICKET_SECONDS = 60
+STREAM_TICKET_SALT = 'gradesheet-stream'
+
+_encoder = JSONEncoder()
+
+
+def make_ticket(user, course_id):
+    return signing.dumps({'u': user.pk, 'c': course_id}, salt=STREAM_TICKET_SALT)
+
+
+def _authorized_course(ticket, course_id):
+    from api.user.models import User
+
+    try:
+        claims = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=STREAM_TICKET_SECONDS)
+    except signing.BadSignature:  # includes SignatureExpired
+        return None, False
+    user = User.objects.filter(pk=claims['u'], is_active=True).first()
+    if user is None or claims['c'] != course_id:
+        return None, False
+    return user, models.Course.objects.visible_to(user).filter(id=course_id).exists()
+
+
+def _event(delta):
+    kind = 'reset' if delta.get('reset') else 'grades'
+    return f"event: {kind}\nid: {delta['cursor']}\ndata: {_encoder.encode(delta)}\n\n".encode()
+
+
+async def _respond(send, status, body):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def gradesheet_stream(scope, receive, send):
+    params = {key: values[-1] for key, values in parse_qs(scope['query_string'].decode()).items()}
+    headers = dict(scope.get('headers', []))
+    try:
+        course_id = int(params['course_id'])
+        since = headers.get(b'last-event-id', b'').decode() or params.get('since')
+        since = int(since) if since else None
+    except (KeyError, ValueError):
+        return await _respond(send, 400, b'{"error": "course_id is required"}')
+
+    user, allowed = await sync_to_async(_authorized_course)(params.get('ticket', ''), course_id)
+    if user is None:
+        return await _respond(send, 401, b'{"error": "Invalid or expired ticket"}')
+    if not allowed:
+        return await _respond(send, 404, b'{"error": "Course not found"}')
+
+    queue = events.broker.subscribe(course_id)
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),  # nginx must not buffer the stream
+        ]})
+        if since is not None:
+            await _send_event(send, await sync_to_async(events.changes_since)(course_id, since))
+        else:
+            await _send_body(send, b': connected\n\n')
+
+        while True:
+            next_delta = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({next_delta, disconnect}, timeout=KEEPALIVE_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                next_delta.cancel()
+                break
+            if next_delta in done:
+                await _send_event(send, next_delta.result())
+            else:
+                next_delta.cancel()
+                await _send_body(send, b': keepalive\n\n')
+    finally:
+        events.broker.unsubscribe(course_id, queue)
+        disconnect.cancel()
+
+
+async def _send_event(send, delta):
+    await _send_body(send, _event(delta))
+
+
+async def _send_body(send, body):
+    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
@@ -0,0 +1,1179 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from api.images import rendition_name
+from api.user.models import User
+from api.school import models
+
+
+class SchoolTestMixin:
+    """Builds a course with an evaluation template, one sub-criterion and two tasks."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@school.test", password="12345678", role="ADMIN")
+        self.client.force_authenticate(self.admin)
+
+        self.period = models.AcademicPeriod.objects.create(
+            name="2026-I", start_date=date(2026, 1, 1), end_date=date(2026, 6, 30)
+        )
+        self.program = models.Program.objects.create(name="Program")
+        self.template = models.EvaluationTemplate.objects.create(name="Template")
+        self.criterion = models.EvaluationCriterion.objects.create(
+            evaluation_template=self.template, name="Practice", weight=Decimal("40.00")
+        )
+        self.subject = models.Subject.objects.create(
+            name="Math", code="MAT-101", program=self.program, period=self.period,
+            evaluation_template=self.template
+        )
+        self.course = models.Course.objects.create(subject=self.subject, period=self.period, parallel="A")
+        self.sub_criterion = models.CourseSubCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Homework", percentage=Decimal("20.00")
+        )
+        self.tasks = [
+            models.CourseTask.objects.create(sub_criterion=self.sub_criterion, name="T1", weight=1),
+            models.CourseTask.objects.create(sub_criterion=self.sub_criterion, name="T2", weight=3),
+        ]
+
+        self.enrollments = []
+        for i, surname in enumerate(["Alvarez", "Benitez", "Castro"]):
+            student = User.objects.create_user(
+                email=f"s{i}@school.test", password="12345678", role="STUDENT",
+                ci_number=f"100{i}", first_name="Student", paternal_surname=surname
+            )
+            self.enrollments.append(models.Enrollment.objects.create(student=student, course=self.course))
+
+
+class TaskSheetTest(SchoolTestMixin, APITestCase):
+    base_url = reverse("api:task-scores-task-sheet")
+
+    def setUp(self):
+        super().setUp()
+        models.TaskScore.objects.create(enrollment=self.enrollments[0], task=self.tasks[0], score=Decimal("0.80"))
+        models.TaskScore.objects.create(enrollment=self.enrollments[0], task=self.tasks[1], score=Decimal("0.50"))
+        models.TaskScore.objects.create(enrollment=self.enrollments[2], task=self.tasks[1], score=Decimal("1.00"))
+
+    def params(self, **extra):
+        return {"course_id": self.course.id, "sub_criterion_id": self.sub_criterion.id, **extra}
+
+    def test_task_sheet_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.base_url, self.params())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        baseline = len(ctx.captured_queries)
+
+        for i in range(5):
+            student = User.objects.create_user(email=f"extra{i}@school.test", password="x", role="STUDENT")
+            enrollment = models.Enrollment.objects.create(student=student, course=self.course)
+            models.TaskScore.objects.create(enrollment=enrollment, task=self.tasks[0], score=Decimal("0.10"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.base_url, self.params())
+        self.assertEqual(len(ctx.captured_queries), baseline)
+        self.assertEqual(len(response.json()["rows"]), 8)
+
+    def test_task_sheet_rows(self):
+        response = self.client.get(self.base_url, self.params())
+        rows = response.json()["rows"]
+        self.assertEqual([r["paterno"] for r in rows], ["Alvarez", "Benitez", "Castro"])
+        self.assertEqual(rows[0]["scores"], {str(self.tasks[0].id): 0.8, str(self.tasks[1].id): 0.5})
+        self.assertEqual(rows[1]["scores"], {})
+
+    def test_task_sheet_columnar(self):
+        response = self.client.get(self.base_url, self.params(format="columnar"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["columns"], [t.id for t in self.tasks])
+        self.assertEqual(data["students"]["paterno"], ["Alvarez", "Benitez", "Castro"])
+        self.assertEqual(data["scores"], [[0.8, 0.5], [None, None], [None, 1.0]])
+
+
+class GradesheetTest(SchoolTestMixin, APITestCase):
+    base_url = reverse("api:criterion-scores-gradesheet")
+
+    def setUp(self):
+        super().setUp()
+        self.special = models.CourseSpecialCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Bonus", percentage=Decimal("5.00")
+        )
+        models.CriterionScore.objects.create(enrollment=self.enrollments[0], sub_criterion=self.sub_criterion, score=Decimal("12.50"))
+        models.SpecialCriterionScore.objects.create(enrollment=self.enrollments[1], special_criterion=self.special, score=Decimal("3.00"))
+
+    def test_gradesheet_columnar(self):
+        rows = self.client.get(self.base_url, {"course_id": self.course.id}).json()["rows"]
+
+        response = self.client.get(self.base_url, {"course_id": self.course.id, "format": "columnar"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["columns"], [self.sub_criterion.id, f"special-{self.special.id}"])
+        self.assertEqual(data["students"]["enrollment_id"], [r["enrollment_id"] for r in rows])
+        self.assertEqual(data["grades"], [[12.5, None], [None, 3.0], [None, None]])
+
+    def test_gradesheet_msgpack(self):
+        from api.school.renderers import msgpack
+        if msgpack is None:
+            self.skipTest("msgpack is not installed")
+
+        response = self.client.get(self.base_url, {"course_id": self.course.id}, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        data = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(data["grades"][0], [12.5, None])
+
+
+class CourseImageRenditionTest(SchoolTestMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().tearDown()
+
+    def upload(self, course):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new("RGB", (2000, 1500), (200, 30, 30)).save(buffer, "JPEG")
+        image = SimpleUploadedFile("phone photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+        url = reverse("api:courses-detail", args=[course.id])
+        return self.client.patch(url, {"image": image}, format="multipart")
+
+    def test_upload_builds_renditions_and_dedupes(self):
+        other = models.Course.objects.create(subject=self.subject, period=self.period, parallel="B")
+
+        response = self.upload(self.course)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.upload(other)
+
+        self.course.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.course.image.name, other.image.name)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, "course_images"))), 2)  # file + renditions/
+
+        renditions = response.json()["image_renditions"]
+        self.assertEqual(set(renditions), {"thumbnail", "card"})
+        self.assertTrue(renditions["thumbnail"]["webp"].endswith("_thumbnail.webp"))
+
+        from PIL import Image
+        with self.course.image.storage.open(rendition_name(self.course.image.name, "card", "jpeg")) as f:
+            self.assertEqual(Image.open(f).size, (720, 540))
+
+
+class RoleScopeTest(SchoolTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create_user(email="t@school.test", password="x", role="TEACHER")
+        self.course.teacher = self.teacher
+        self.course.save()
+        self.other_course = models.Course.objects.create(subject=self.subject, period=self.period, parallel="B")
+        self.parent = User.objects.create_user(email="p@school.test", password="x", role="PARENT")
+        models.FamilyRelationship.objects.create(parent=self.parent, student=self.enrollments[0].student)
+        for enrollment in self.enrollments:
+            models.CriterionScore.objects.create(enrollment=enrollment, sub_criterion=self.sub_criterion, score=5)
+
+    def test_course_visibility(self):
+        student = self.enrollments[1].student
+        self.assertEqual(models.Course.objects.visible_to(self.admin).count(), 2)
+        self.assertEqual(list(models.Course.objects.visible_to(self.teacher)), [self.course])
+        self.assertEqual(list(models.Course.objects.visible_to(student)), [self.course])
+        self.assertEqual(list(models.Course.objects.visible_to(self.parent)), [self.course])
+
+        sql = str(models.Course.objects.visible_to(self.parent).query).upper()
+        self.assertIn("EXISTS", sql)
+        self.assertNotIn("DISTINCT", sql)
+
+    def test_scores_are_scoped_to_the_student(self):
+        student = self.enrollments[1].student
+        self.assertEqual(models.CriterionScore.objects.visible_to(self.teacher).count(), 3)
+        self.assertEqual(
+            list(models.CriterionScore.objects.visible_to(student).values_list("enrollment", flat=True)),
+            [self.enrollments[1].id],
+        )
+        self.assertEqual(
+            list(models.Enrollment.objects.visible_to(self.parent)), [self.enrollments[0]]
+        )
+
+        self.client.force_authenticate(student)
+        response = self.client.get(reverse("api:criterion-scores-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["enrollment"] for row in response.data], [self.enrollments[1].id])
+
+    def test_enrollment_list_query_count_is_constant(self):
+        url = reverse("api:enrollments-list")
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, {"course": self.course.id})
+        baseline = len(ctx.captured_queries)
+
+        for i in range(4):
+            student = User.objects.create_user(email=f"more{i}@school.test", password="x", role="STUDENT")
+            models.Enrollment.objects.create(student=student, course=self.course)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {"course": self.course.id})
+        self.assertEqual(len(response.data), 7)
+        # Only SubjectSerializer.has_grades still queries per row
+        self.assertEqual(len(ctx.captured_queries), baseline + 4)
+
+
+class BulkUpdateSettingsTest(SchoolTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_sub = models.CourseSubCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Quiz", percentage=Decimal("20.00")
+        )
+        self.special = models.CourseSpecialCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Bonus", percentage=Decimal("5.00")
+        )
+
+    def test_sub_criteria_settings(self):
+        url = reverse("api:course-sub-criteria-bulk-update-settings")
+        updates = [
+            {"id": self.sub_criterion.id, "visible": False},
+            {"id": self.other_sub.id, "visible": True, "editable": True},  # unchanged
+            {"id": 999999, "visible": False},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, {"updates": updates}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"saved": 1, "missing": [999999]})  # the unchanged row is not counted
+        updates_sql = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates_sql), 1)
+
+        self.sub_criterion.refresh_from_db()
+        self.assertFalse(self.sub_criterion.visible_on_gradesheet)
+        self.assertTrue(self.sub_criterion.editable_on_gradesheet)
+
+    def test_special_criteria_prefixed_ids(self):
+        url = reverse("api:course-special-criterion-bulk-update-settings")
+        updates = [{"id": f"special-{self.special.id}", "editable": False}, {"id": "special-x"}]
+        response = self.client.post(url, {"updates": updates}, format="json")
+        self.assertEqual(response.data["saved"], 1)
+        self.assertEqual(response.data["missing"], ["special-x"])
+        self.special.refresh_from_db()
+        self.assertFalse(self.special.editable_on_gradesheet)
+        self.assertTrue(self.special.visible_on_gradesheet)
+
+
+class CloneStructureTest(SchoolTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.special = models.CourseSpecialCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Bonus", percentage=Decimal("5.00")
+        )
+        models.CourseTask.objects.create(special_criterion=self.special, name="Extra", weight=1)
+        self.targets = [
+            models.Course.objects.create(subject=self.subject, period=self.period, parallel=p) for p in "BC"
+        ]
+        student = User.objects.create_user(email="b@school.test", password="x", role="STUDENT")
+        self.target_enrollment = models.Enrollment.objects.create(student=student, course=self.targets[0])
+
+    def test_clone_to_many_courses(self):
+        url = reverse("api:courses-clone-structure", args=[self.course.id])
+        target_ids = [course.id for course in self.targets] + [999999]
+        response = self.client.post(url, {"target_courses": target_ids}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data["cloned"]), sorted(target_ids[:2]))
+        self.assertEqual(response.data["skipped"], [{"id": 999999, "reason": "not found"}])
+        self.assertEqual(response.data["created"]["tasks"], 6)
+
+        for target in self.targets:
+            sub = target.sub_criteria.get()
+            self.assertEqual((sub.name, sub.parent_criterion_id), ("Homework", self.criterion.id))
+            self.assertEqual(sorted(sub.tasks.values_list("name", "weight")), [("T1", 1), ("T2", 3)])
+            self.assertEqual(list(target.special_criteria.get().tasks.values_list("name", flat=True)), ["Extra"])
+
+        score = models.CriterionScore.objects.get(enrollment=self.target_enrollment)
+        self.assertEqual(score.sub_criterion.course_id, self.targets[0].id)
+        self.assertEqual(score.score, 0)
+        # Source course untouched
+        self.assertEqual(self.course.sub_criteria.count(), 1)
+        self.assertEqual(models.CourseTask.objects.filter(sub_criterion=self.sub_criterion).count(), 2)
+
+    def test_clone_query_count_does_not_grow_with_enrollments(self):
+        url = reverse("api:courses-clone-structure", args=[self.course.id])
+
+        def clone_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(url, {"target_courses": [course.id for course in self.targets]}, format="json")
+            return len(ctx.captured_queries)
+
+        baseline = clone_queries()
+        for i in range(5):
+            student = User.objects.create_user(email=f"c{i}@school.test", password="x", role="STUDENT")
+            models.Enrollment.objects.create(student=student, course=self.targets[1])
+        self.assertEqual(clone_queries(), baseline)
+
+        # The second clone's tasks hang off its own sub-criteria, not the first clone's
+        for target in self.targets:
+            subs = list(target.sub_criteria.order_by("id"))
+            self.assertEqual([sub.tasks.count() for sub in subs], [2, 2])
+
+    def test_different_template_is_skipped(self):
+        other = models.Subject.objects.create(
+            name="Physics", code="FIS-101", program=self.program, period=self.period,
+            evaluation_template=models.EvaluationTemplate.objects.create(name="Other")
+        )
+        target = models.Course.objects.create(subject=other, period=self.period, parallel="A")
+        url = reverse("api:courses-clone-structure", args=[self.course.id])
+        response = self.client.post(url, {"target_courses": [target.id]}, format="json")
+        self.assertEqual(response.data["cloned"], [])
+        self.assertEqual(response.data["skipped"][0]["reason"], "different evaluation template")
+        self.assertFalse(target.sub_criteria.exists())
+
+
+class EvaluationTemplateUpdateTest(SchoolTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam = models.EvaluationCriterion.objects.create(
+            evaluation_template=self.template, name="Exam", weight=Decimal("60.00")
+        )
+        models.CriterionScore.objects.create(
+            enrollment=self.enrollments[0], sub_criterion=self.sub_criterion, score=Decimal("30.00")
+        )
+        self.url = reverse("api:evaluation-templates-detail", args=[self.template.id])
+
+    def test_update_keeps_matching_criteria(self):
+        payload = {
+            "name": "Template",
+            "criteria": [
+                {"id": self.criterion.id, "name": "Practice", "weight": "20.00"},
+                {"name": "Final", "weight": "40.00"},
+            ],
+        }
+        response = self.client.put(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(
+            sorted(self.template.criteria.values_list("name", "weight")),
+            [("Final", Decimal("40.00")), ("Practice", Decimal("20.00"))],
+        )
+        # Sub-criteria and scores under the kept criterion survive
+        self.assertTrue(models.CourseSubCriterion.objects.filter(pk=self.sub_criterion.pk).exists())
+        self.assertFalse(models.EvaluationCriterion.objects.filter(pk=self.exam.pk).exists())
+
+        # Only the enrollment with scores under the re-weighted criterion is recomputed (capped at 20)
+        grades = dict(models.Enrollment.objects.values_list("id", "final_grade"))
+        self.assertEqual(grades[self.enrollments[0].id], Decimal("20.00"))
+        self.assertIsNone(grades[self.enrollments[1].id])
+
+    def test_name_change_does_not_recompute(self):
+        payload = {"name": "Template", "criteria": [
+            {"id": self.criterion.id, "name": "Labs", "weight": "40.00"},
+            {"id": self.exam.id, "name": "Exam", "weight": "60.00"},
+        ]}
+        self.client.put(self.url, payload, format="json")
+        self.criterion.refresh_from_db()
+        self.assertEqual(self.criterion.name, "Labs")
+        self.assertIsNone(models.Enrollment.objects.get(pk=self.enrollments[0].pk).final_grade)
+
+
+class ProjectRegistrationTest(SchoolTestMixin, APITestCase):
+    url = reverse("api:project-registration-register")
+
+    def setUp(self):
+        super().setUp()
+        self.sub_criterion.is_project = True
+        self.sub_criterion.is_project_registration_open = True
+        self.sub_criterion.max_members = 3
+        self.sub_criterion.save()
+        self.client.force_authenticate(None)
+
+    def register(self, leader, members, name="Group"):
+        return self.client.post(self.url, {
+            "sub_criterion_id": self.sub_criterion.id, "name": name,
+            "leader_ci": leader, "members_ci": members,
+        }, format="json")
+
+    def test_register_group(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.register("1000", ["1001", "1000"])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLessEqual(len(ctx.captured_queries), 8)
+
+        project = models.Project.objects.get(pk=response.data["project_id"])
+        self.assertEqual(project.student_in_charge, self.enrollments[0])
+        self.assertEqual(set(project.members.all()), set(self.enrollments[:2]))
+        self.assertEqual(
+            set(models.ProjectMembership.objects.values_list("sub_criterion_id", flat=True)), {self.sub_criterion.id}
+        )
+
+    def test_member_already_in_a_project(self):
+        self.register("1000", ["1001"])
+        response = self.register("1002", ["1001"], name="Other")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "Student 1001 is already in a project")
+        self.assertEqual(models.Project.objects.count(), 1)
+
+    def test_unknown_and_unenrolled_cis(self):
+        User.objects.create_user(email="x@school.test", password="x", role="STUDENT", ci_number="2000")
+        self.assertEqual(self.register("1000", ["2000"]).data["error"], "Student CI 2000 not enrolled")
+        self.assertEqual(self.register("9999", []).data["error"], "Leader CI 9999 not found")
+
+    def test_constraint_blocks_duplicate_membership(self):
+        from django.db import IntegrityError, transaction
+
+        self.register("1000", [])
+        other = models.Project.objects.create(course=self.course, sub_criterion=self.sub_criterion, name="Manual")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            other.set_members([self.enrollments[0]])
+
+
+class AvailableProjectsTest(SchoolTestMixin, APITestCase):
+    url = reverse("api:project-registration-available-projects")
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import cache
+        cache.clear()
+        self.sub_criterion.is_project = True
+        self.sub_criterion.is_project_registration_open = True
+        self.sub_criterion.save()
+
+    def test_listing_is_cached_per_course(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {"course_id": self.course.id})
+        self.assertEqual(len(ctx.captured_queries), 1)
+        row = response.json()[0]
+        self.assertEqual(row["course_name"], "MAT-101 (2026-I) - A")
+        self.assertEqual(row["course_details"]["subject_details"]["code"], "MAT-101")
+        self.assertTrue(row["is_active_time"])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url, {"course_id": self.course.id})
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_clock_is_evaluated_per_request(self):
+        from datetime import timedelta
+        from unittest import mock
+        from django.utils import timezone
+
+        now = timezone.now()
+        self.sub_criterion.registration_end = now + timedelta(hours=1)
+        self.sub_criterion.save()
+        self.assertTrue(self.client.get(self.url).json()[0]["is_active_time"])
+
+        # Served from the cache, but the window has closed in the meantime
+        with mock.patch("api.school.views.timezone.now", return_value=now + timedelta(hours=2)):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(self.url)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertFalse(response.json()[0]["is_active_time"])
+
+
+class ProjectGradingTest(SchoolTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.sub_criterion.is_project = True
+        self.sub_criterion.save()
+        self.projects = []
+        for name, members in (("A", self.enrollments[:2]), ("B", self.enrollments[2:])):
+            project = models.Project.objects.create(course=self.course, sub_criterion=self.sub_criterion, name=name)
+            project.set_members(members)
+            self.projects.append(project)
+
+    def test_batched_final_grades_match_single(self):
+        from api.school.views import update_final_grade, update_final_grades
+
+        special = models.CourseSpecialCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Bonus", percentage=Decimal("5.00")
+        )
+        models.CriterionScore.objects.create(enrollment=self.enrollments[0], sub_criterion=self.sub_criterion, score=38)
+        models.SpecialCriterionScore.objects.create(enrollment=self.enrollments[0], special_criterion=special, score=5)
+        models.CriterionScore.objects.create(enrollment=self.enrollments[1], sub_criterion=self.sub_criterion, score=12.5)
+
+        ids = [e.id for e in self.enrollments]
+        for enrollment_id in ids:
+            update_final_grade(enrollment_id)
+        expected = dict(models.Enrollment.objects.values_list("id", "final_grade"))
+        models.Enrollment.objects.update(final_grade=None)
+
+        self.assertEqual(update_final_grades(ids), 3)
+        self.assertEqual(dict(models.Enrollment.objects.values_list("id", "final_grade")), expected)
+        self.assertEqual(expected[self.enrollments[0].id], Decimal("40.00"))
+
+    def test_grade_sub_criterion(self):
+        url = reverse("api:projects-grade-sub-criterion")
+        payload = {
+            "sub_criterion_id": self.sub_criterion.id,
+            "scores": {str(self.projects[0].id): 15, str(self.projects[1].id): "18.5", "999999": 1},
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["missing"], [999999])
+        self.assertEqual(response.data["graded_members"], 3)
+        self.assertLess(len(ctx.captured_queries), 15)
+
+        scores = dict(models.CriterionScore.objects.values_list("enrollment_id", "score"))
+        self.assertEqual(scores, {
+            self.enrollments[0].id: Decimal("15.00"),
+            self.enrollments[1].id: Decimal("15.00"),
+            self.enrollments[2].id: Decimal("18.50"),
+        })
+        self.assertEqual(models.Enrollment.objects.get(pk=self.enrollments[2].pk).final_grade, Decimal("18.50"))
+        self.projects[1].refresh_from_db()
+        self.assertEqual(self.projects[1].score, Decimal("18.50"))
+
+    def test_project_update_syncs_members(self):
+        url = reverse("api:projects-detail", args=[self.projects[0].id])
+        response = self.client.patch(url, {"score": "12.00"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(models.CriterionScore.objects.values_list("score", flat=True)), [Decimal("12.00")] * 2
+        )
+        self.assertEqual(models.Enrollment.objects.get(pk=self.enrollments[0].pk).final_grade, Decimal("12.00"))
+
+
+class BulkRegistrationTest(SchoolTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_course = models.Course.objects.create(subject=self.subject, period=self.period, parallel="B")
+
+        def request(ci, email, course=None, **extra):
+            return models.RegistrationRequest.objects.create(
+                course=course or self.course, ci=ci, first_name="New", paternal_surname="Student", email=email, **extra
+            )
+        self.already_enrolled = request("1000", "s0@school.test")           # existing user, same course
+        self.existing_user = request("1001", "s1@school.test", self.other_course)
+        self.new_user = request("5000", "new@school.test")
+        self.new_user_again = request("5000", "new@school.test", self.other_course)
+        self.email_taken = request("5001", "s2@school.test")
+        self.approved = request("5002", "done@school.test", status="APPROVED")
+
+    def test_bulk_approve(self):
+        url = reverse("api:registration-requests-bulk-approve")
+        ids = [self.already_enrolled.id, self.existing_user.id, self.new_user.id,
+               self.new_user_again.id, self.email_taken.id, self.approved.id, 999999]
+        response = self.client.post(url, {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = {row["id"]: row["result"] for row in response.data["results"]}
+        self.assertEqual(results, {
+            self.already_enrolled.id: "already_enrolled",
+            self.existing_user.id: "enrolled",
+            self.new_user.id: "enrolled",
+            self.new_user_again.id: "enrolled",
+            self.email_taken.id: "error",
+            self.approved.id: "skipped",
+        })
+        self.assertEqual(response.data["missing"], [999999])
+        self.assertEqual(response.data["users_created"], 1)
+
+        new = User.objects.get(ci_number="5000")
+        self.assertTrue(new.check_password("5000"))
+        self.assertEqual(new.role, "STUDENT")
+        self.assertEqual(set(new.enrollments.values_list("course_id", flat=True)), {self.course.id, self.other_course.id})
+        self.assertTrue(models.Enrollment.objects.filter(student__ci_number="1001", course=self.other_course).exists())
+        self.assertEqual(
+            models.RegistrationRequest.objects.get(pk=self.email_taken.pk).status, "PENDING"
+        )
+
+    def test_bulk_reject_by_course(self):
+        url = reverse("api:registration-requests-bulk-reject")
+        response = self.client.post(url, {"course_id": self.course.id}, format="json")
+        self.assertEqual(response.data["rejected"], 3)
+        self.assertEqual(
+            set(models.RegistrationRequest.objects.filter(course=self.course).values_list("status", flat=True)),
+            {"REJECTED", "APPROVED"},
+        )
+        self.assertEqual(models.RegistrationRequest.objects.get(pk=self.new_user_again.pk).status, "PENDING")
+
+    def test_malformed_targets_are_rejected(self):
+        for action in ("approve", "reject"):
+            url = reverse(f"api:registration-requests-bulk-{action}")
+            for body in ({"ids": self.new_user.id}, {"ids": [self.new_user.id, "abc"]}, {"ids": [{"id": 1}]},
+                         {"course_id": "abc"}, {"course_id": [self.course.id]}, [self.new_user.id]):
+                response = self.client.post(url, body, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, (action, body))
+            self.assertEqual(self.client.post(url, {}, format="json").data["error"], "ids o course_id requerido")
+        self.assertFalse(models.RegistrationRequest.objects.exclude(pk=self.approved.pk).exclude(status="PENDING").exists())
+
+
+class SubmitRegistrationRequestTest(SchoolTestMixin, APITestCase):
+    url = reverse("api:student-course-registration-submit-request")
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import cache
+        cache.clear()
+        self.client.force_authenticate(None)
+
+    def submit(self, ci, **extra):
+        return self.client.post(self.url, {
+            "course": self.course.id, "ci": ci, "first_name": "Ana", "paternal_surname": "Rojas",
+            "email": f"{ci}@mail.test",
+        }, format="json", **extra)
+
+    def test_duplicate_is_reported_not_500(self):
+        self.assertEqual(self.submit("7000").status_code, status.HTTP_201_CREATED)
+        response = self.submit("7000")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "Ya tienes una solicitud pendiente para este curso.")
+
+        models.RegistrationRequest.objects.filter(ci="7000").update(status="REJECTED")
+        self.assertEqual(self.submit("7000").data["error"], "Tu solicitud para este curso fue rechazada.")
+
+    def test_already_enrolled(self):
+        response = self.submit("1000")
+        self.assertEqual(response.data["error"], "Ya estás inscrito en este curso.")
+        self.assertFalse(models.RegistrationRequest.objects.exists())
+
+    @override_settings(REGISTRATION_RATE_PER_CI=2, REGISTRATION_RATE_PER_IP=3)
+    def test_rate_limits(self):
+        self.submit("7001")
+        self.submit("7001")
+        self.assertEqual(self.submit("7001").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Fourth hit from the same address, different CI
+        self.assertEqual(self.submit("7002").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # The proxy-appended address counts, not the client-supplied one
+        forwarded = {"HTTP_X_FORWARDED_FOR": "1.2.3.4, 10.0.0.9"}
+        self.assertEqual(self.submit("7003", **forwarded).status_code, status.HTTP_201_CREATED)
+
+    def test_invalid_submission_is_rejected_before_insert(self):
+        self.assertEqual(self.submit("7000").status_code, status.HTTP_201_CREATED)
+
+        # A duplicate with bad fields gets the field errors, not the duplicate message
+        for ci, field, value in (("7000", "email", "not-an-email"), ("7001", "course", 999999),
+                                 ("7001", "first_name", ""), ("7001", "ci", "")):
+            response = self.client.post(self.url, {
+                "course": self.course.id, "ci": ci, "first_name": "Ana", "paternal_surname": "Rojas",
+                "email": f"{ci}@mail.test", field: value,
+            }, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, field)
+            self.assertIn(field, response.data)
+        self.assertEqual(list(models.RegistrationRequest.objects.values_list("ci", flat=True)), ["7000"])
+
+
+class WeightedTaskAverageTest(SchoolTestMixin, APITestCase):
+    """(Sum(score * weight) / Sum(weights)) * percentage, computed in the database."""
+
+    def setUp(self):
+        super().setUp()
+        self.special = models.CourseSpecialCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Bonus", percentage=Decimal("5.00")
+        )
+        self.special_tasks = [
+            models.CourseTask.objects.create(special_criterion=self.special, name="E1", weight=1),
+            models.CourseTask.objects.create(special_criterion=self.special, name="E2", weight=2),
+        ]
+
+    def test_criterion_points(self):
+        e0, e1, e2 = self.enrollments
+        models.TaskScore.objects.create(enrollment=e0, task=self.tasks[0], score=Decimal("0.80"))
+        models.TaskScore.objects.create(enrollment=e0, task=self.tasks[1], score=Decimal("0.50"))
+        # Whole-valued scores must not fall into integer division
+        models.TaskScore.objects.create(enrollment=e1, task=self.tasks[0], score=Decimal("1.00"))
+
+        rows = models.TaskScore.objects.filter(enrollment__course=self.course).criterion_points("sub")
+        parts = {(r["enrollment_id"], r["criterion_id"]): (r["weighted"], r["total_weight"]) for r in rows}
+        self.assertEqual(parts, {
+            (e0.id, self.sub_criterion.id): (Decimal("2.30"), 4),
+            (e1.id, self.sub_criterion.id): (Decimal("1.00"), 4),
+        })
+
+        from api.school.views import task_criterion_points
+        points = task_criterion_points("sub", [self.sub_criterion.id], [e0.id, e1.id, e2.id])
+        self.assertEqual(points, {
+            (e0.id, self.sub_criterion.id): Decimal("11.50"),
+            (e1.id, self.sub_criterion.id): Decimal("5.00"),
+            (e2.id, self.sub_criterion.id): Decimal("0.00"),
+        })
+
+    def test_task_bulk_save_updates_criterion_and_final_grade(self):
+        url = reverse("api:task-scores-bulk-save")
+        e0, e1, _ = self.enrollments
+        updates = [
+            {"enrollment_id": e0.id, "task_id": self.tasks[0].id, "score": "1.00"},
+            {"enrollment_id": e0.id, "task_id": self.tasks[1].id, "score": "1.00"},
+            {"enrollment_id": e1.id, "task_id": self.tasks[1].id, "score": "0.50"},
+        ]
+        response = self.client.post(url, {"updates": updates}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        scores = dict(models.CriterionScore.objects.values_list("enrollment_id", "score"))
+        self.assertEqual(scores, {e0.id: Decimal("20.00"), e1.id: Decimal("7.50")})
+        grades = dict(models.Enrollment.objects.filter(pk__in=[e0.id, e1.id]).values_list("id", "final_grade"))
+        self.assertEqual(grades, {e0.id: Decimal("20.00"), e1.id: Decimal("7.50")})
+
+    def test_gradesheet_and_dashboard_special_points(self):
+        e0 = self.enrollments[0]
+        models.TaskScore.objects.create(enrollment=e0, task=self.special_tasks[1], score=Decimal("0.75"))
+
+        response = self.client.get(reverse("api:criterion-scores-gradesheet"), {"course_id": self.course.id})
+        grades = {row["enrollment_id"]: row["grades"] for row in response.data["rows"]}
+        key = f"special-{self.special.id}"
+        self.assertAlmostEqual(grades[e0.id][key], 2.5)
+        self.assertEqual(grades[self.enrollments[1].id][key], 0.0)
+
+        self.client.force_authenticate(e0.student)
+        response = self.client.get(reverse("api:reports-dashboard-stats"))
+        group = response.data["enrolled_courses"][0]["criteria_grades"][0]
+        bonus = next(item for item in group["sub_criteria"] if item["is_special"])
+        self.assertEqual(bonus["score"], Decimal("2.50"))
+        self.assertEqual([t["score"] for t in bonus["tasks"]], [0.0, 0.75])
+
+
+class GradingModuleTest(SchoolTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam = models.EvaluationCriterion.objects.create(
+            evaluation_template=self.template, name="Exam", weight=Decimal("60.00")
+        )
+        self.exam_sub = models.CourseSubCriterion.objects.create(
+            course=self.course, parent_criterion=self.exam, name="Final", percentage=Decimal("60.00")
+        )
+        self.special = models.CourseSpecialCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Bonus", percentage=Decimal("5.00")
+        )
+        e0, e1, e2 = self.enrollments
+        for enrollment, t1, t2 in ((e0, "0.80", "0.50"), (e1, "1.00", "1.00"), (e2, "0.33", None)):
+            models.TaskScore.objects.create(enrollment=enrollment, task=self.tasks[0], score=Decimal(t1))
+            if t2:
+                models.TaskScore.objects.create(enrollment=enrollment, task=self.tasks[1], score=Decimal(t2))
+        models.CriterionScore.objects.create(enrollment=e0, sub_criterion=self.exam_sub, score=Decimal("45.25"))
+        models.SpecialCriterionScore.objects.create(enrollment=e1, special_criterion=self.special, score=Decimal("5.00"))
+
+    def test_rounding(self):
+        from api.school.grading import div_round_half_even
+        self.assertEqual([div_round_half_even(n, 2) for n in (1, 3, 5, 7)], [0, 2, 2, 4])
+        self.assertEqual(div_round_half_even(2, 3), 1)
+        self.assertEqual(div_round_half_even(1, 3), 0)
+
+        import numpy as np
+        columns = div_round_half_even(np.array([[1, 3, 5], [7, 2, 1]], dtype=np.int64), np.array([2, 2, 3]))
+        self.assertEqual(columns.tolist(), [[0, 2, 2], [4, 1, 0]])
+
+    def test_matches_row_by_row_recalculation(self):
+        from api.school.grading import compute_course_grades
+        from api.school.views import recalculate_sub_criterion_scores
+
+        with self.assertNumQueries(9):
+            result = compute_course_grades(self.course.id)
+
+        recalculate_sub_criterion_scores(self.sub_criterion.id)
+        stored = dict(models.Enrollment.objects.values_list("id", "final_grade"))
+        self.assertEqual(result.final_grades(), stored)
+
+        e0, e1, e2 = self.enrollments
+        self.assertEqual(result.criterion_scores(), {
+            (e0.id, self.sub_criterion.id): Decimal("11.50"),
+            (e1.id, self.sub_criterion.id): Decimal("20.00"),
+            (e2.id, self.sub_criterion.id): Decimal("1.65"),
+        })
+        # Practice 20.00 + 5.00 bonus; Practice 11.50 + Exam 45.25
+        self.assertEqual(stored[e1.id], Decimal("25.00"))
+        self.assertEqual(stored[e0.id], Decimal("56.75"))
+
+    def test_live_update_uses_same_arithmetic(self):
+        from api.school.grading import compute_course_grades
+        from api.school.views import recalculate_sub_criterion_scores, update_final_grade
+
+        extra = models.CourseSpecialCriterion.objects.create(
+            course=self.course, parent_criterion=self.exam, name="Oral", percentage=Decimal("10.00")
+        )
+        for enrollment in self.enrollments:
+            models.SpecialCriterionScore.objects.create(enrollment=enrollment, special_criterion=extra, score=Decimal("0.10"))
+            models.SpecialCriterionScore.objects.update_or_create(
+                enrollment=enrollment, special_criterion=self.special, defaults={"score": Decimal("0.20")}
+            )
+        recalculate_sub_criterion_scores(self.sub_criterion.id)
+        update_final_grade(self.enrollments[2].id)
+
+        stored = dict(models.Enrollment.objects.values_list("id", "final_grade"))
+        self.assertEqual(compute_course_grades(self.course.id).final_grades(), stored)
+        self.assertEqual(stored[self.enrollments[2].id], Decimal("1.95"))
+
+
+    def test_half_cent_points_agree_with_grading_run(self):
+        from api.school.grading import compute_course_grades
+        from api.school.views import task_criterion_points
+
+        # 1.00% over two tasks of weight 1: an odd number of cents lands on a half cent
+        quiz = models.CourseSubCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Quiz", percentage=Decimal("1.00")
+        )
+        first, second = (models.CourseTask.objects.create(sub_criterion=quiz, name=n, weight=1) for n in ("Q1", "Q2"))
+        e0, e1, e2 = self.enrollments
+        for enrollment, task, score in ((e0, first, "0.03"), (e1, first, "0.01"), (e2, first, "0.05"), (e2, second, "0.00")):
+            models.TaskScore.objects.create(enrollment=enrollment, task=task, score=Decimal(score))
+
+        live = task_criterion_points("sub", [quiz.id], [e0.id, e1.id, e2.id])
+        computed = {key: points for key, points in compute_course_grades(self.course.id).criterion_scores().items()
+                    if key[1] == quiz.id}
+        self.assertEqual(live, computed)
+        # 0.015 -> 0.02, 0.005 -> 0.00, 0.025 -> 0.02 (half to even)
+        self.assertEqual([str(live[(e.id, quiz.id)]) for e in (e0, e1, e2)], ["0.02", "0.00", "0.02"])
+
+
+class RecomputeGradesCommandTest(SchoolTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        e0, e1, _ = self.enrollments
+        models.TaskScore.objects.create(enrollment=e0, task=self.tasks[0], score=Decimal("1.00"))
+        models.TaskScore.objects.create(enrollment=e1, task=self.tasks[1], score=Decimal("0.50"))
+        models.CriterionScore.objects.create(enrollment=e0, sub_criterion=self.sub_criterion, score=Decimal("1.00"))
+
+    def call(self, *args):
+        from django.core.management import call_command
+        out = io.StringIO()
+        call_command("recompute_grades", *args, "--workers", "1", stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_reports_without_writing(self):
+        output = self.call("--course", str(self.course.id), "--dry-run", "-v", "2")
+        self.assertIn(f"enrollment {self.enrollments[0].id} sub-criterion {self.sub_criterion.id}: 1.00 -> 5.00", output)
+        self.assertIn("would change 3 criterion scores and 3 final grades", output)
+        self.assertEqual(models.CriterionScore.objects.get().score, Decimal("1.00"))
+
+    def test_recompute_period(self):
+        output = self.call("--period", str(self.period.id))
+        self.assertIn("updated 3 criterion scores and 3 final grades", output)
+        scores = dict(models.CriterionScore.objects.values_list("enrollment_id", "score"))
+        self.assertEqual(scores, {
+            self.enrollments[0].id: Decimal("5.00"),
+            self.enrollments[1].id: Decimal("7.50"),
+            self.enrollments[2].id: Decimal("0.00"),
+        })
+        # Second run has nothing left to write
+        self.assertIn("updated 0 criterion scores and 0 final grades", self.call("--all"))
+
+
+class GradeSnapshotTest(SchoolTestMixin, APITestCase):
+    gradesheet_url = reverse("api:criterion-scores-gradesheet")
+
+    def setUp(self):
+        super().setUp()
+        self.special = models.CourseSpecialCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Bonus", percentage=Decimal("5.00")
+        )
+        models.CriterionScore.objects.create(enrollment=self.enrollments[0], sub_criterion=self.sub_criterion, score=Decimal("12.50"))
+        models.SpecialCriterionScore.objects.create(enrollment=self.enrollments[1], special_criterion=self.special, score=Decimal("3.00"))
+        self.course.active = True
+        self.course.save()
+        for enrollment, grade in zip(self.enrollments, ["12.50", "3.00", "0.00"]):
+            enrollment.final_grade = Decimal(grade)
+            enrollment.save()
+
+    def gradesheet(self, **params):
+        return self.client.get(self.gradesheet_url, {"course_id": self.course.id, **params}).json()
+
+    def dashboard(self, enrollment):
+        self.client.force_authenticate(enrollment.student)
+        try:
+            return self.client.get(reverse("api:reports-dashboard-stats")).json()["enrolled_courses"]
+        finally:
+            self.client.force_authenticate(self.admin)
+
+    def test_close_period_freezes_read_paths(self):
+        live_sheet = self.gradesheet()
+        live_columnar = self.gradesheet(format="columnar")
+        live_dashboard = self.dashboard(self.enrollments[0])
+        self.assertEqual(live_dashboard[0]["criteria_grades"][0]["score"], 12.5)
+
+        response = self.client.post(reverse("api:periods-close", args=[self.period.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["snapshots"], 3)
+        self.period.refresh_from_db()
+        self.assertIsNotNone(self.period.closed_at)
+        self.assertTrue(models.Subject.objects.get(id=self.subject.id).archived)
+
+        # Later changes to the raw scores no longer show up
+        models.CriterionScore.objects.update(score=Decimal("1.00"))
+        models.Enrollment.objects.update(final_grade=Decimal("1.00"))
+        self.assertEqual(self.gradesheet(), live_sheet)
+        self.assertEqual(self.gradesheet(format="columnar"), live_columnar)
+        self.assertEqual(self.dashboard(self.enrollments[0]), live_dashboard)
+
+    def test_closed_period_rejects_score_writes(self):
+        self.client.post(reverse("api:periods-close", args=[self.period.id]))
+        response = self.client.post(reverse("api:criterion-scores-bulk-save"), {"updates": [
+            {"enrollment_id": self.enrollments[0].id, "criterion_id": self.sub_criterion.id, "score": 1},
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse("api:task-scores-bulk-save"), {"updates": [
+            {"enrollment_id": self.enrollments[0].id, "task_id": self.tasks[0].id, "score": 1},
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(models.CriterionScore.objects.get(enrollment=self.enrollments[0]).score, Decimal("12.50"))
+
+    def test_closed_period_rejects_other_grade_writes(self):
+        from django.core.management import call_command
+
+        score = models.CriterionScore.objects.get(enrollment=self.enrollments[0])
+        project = models.Project.objects.create(course=self.course, sub_criterion=self.sub_criterion, name="P")
+        self.client.post(reverse("api:periods-close", args=[self.period.id]))
+
+        response = self.client.patch(reverse("api:criterion-scores-detail", args=[score.id]), {"score": "1.00"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse("api:course-tasks-list"), {
+            "sub_criterion": self.sub_criterion.id, "name": "T3", "weight": 1,
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.delete(reverse("api:course-tasks-detail", args=[self.tasks[0].id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(reverse("api:projects-detail", args=[project.id]), {"score": "9.00"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"error": "El periodo está cerrado; sus notas ya no se pueden modificar"})
+        response = self.client.post(reverse("api:projects-grade-sub-criterion"), {
+            "sub_criterion_id": self.sub_criterion.id, "scores": {str(project.id): 9},
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        out = io.StringIO()
+        with self.assertRaises(Exception):
+            call_command("recompute_grades", "--course", str(self.course.id), "--workers", "1", stdout=out)
+        self.assertIn("Skipping 1 course(s) of closed periods.", out.getvalue())
+
+        score.refresh_from_db()
+        self.assertEqual(score.score, Decimal("12.50"))
+        self.assertEqual(models.CourseTask.objects.filter(sub_criterion=self.sub_criterion).count(), 2)
+        self.assertEqual(models.Enrollment.objects.get(id=self.enrollments[0].id).final_grade, Decimal("12.50"))
+
+    def test_close_and_reopen_round_trip(self):
+        self.period.end_date = date.today() + timedelta(days=30)
+        self.period.save()
+
+        self.client.post(reverse("api:periods-close", args=[self.period.id]))
+        self.period.refresh_from_db()
+        self.assertFalse(self.period.active)
+        self.assertTrue(models.Subject.objects.get(id=self.subject.id).archived)
+
+        self.client.post(reverse("api:periods-reopen", args=[self.period.id]))
+        self.period.refresh_from_db()
+        self.assertIsNone(self.period.closed_at)
+        self.assertTrue(self.period.active)
+        self.assertFalse(models.Subject.objects.get(id=self.subject.id).archived)
+
+    def test_reopen_serves_live_grades_again(self):
+        self.client.post(reverse("api:periods-close", args=[self.period.id]))
+        response = self.client.post(reverse("api:periods-reopen", args=[self.period.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(models.GradeSnapshot.objects.exists())
+
+        models.CriterionScore.objects.update(score=Decimal("1.00"))
+        self.assertEqual(self.gradesheet(format="columnar")["grades"][0], [1.0, None])
+
+    def test_only_admins_close_periods(self):
+        self.client.force_authenticate(self.enrollments[0].student)
+        response = self.client.post(reverse("api:periods-close", args=[self.period.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(models.GradeSnapshot.objects.exists())
+
+
+class ScoreChangeLogTest(SchoolTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.special = models.CourseSpecialCriterion.objects.create(
+            course=self.course, parent_criterion=self.criterion, name="Bonus", percentage=Decimal("5.00")
+        )
+        models.CriterionScore.objects.create(enrollment=self.enrollments[0], sub_criterion=self.sub_criterion, score=Decimal("12.50"))
+
+    def test_bulk_save_logs_changed_cells_in_one_insert(self):
+        e0, e1, _ = self.enrollments
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse("api:criterion-scores-bulk-save"), {"updates": [
+                {"enrollment_id": e0.id, "criterion_id": self.sub_criterion.id, "score": "12.5"},  # unchanged
+                {"enrollment_id": e1.id, "criterion_id": self.sub_criterion.id, "score": 10},
+                {"enrollment_id": e1.id, "criterion_id": f"special-{self.special.id}", "score": 2},
+            ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "school_scorechange"')]
+        self.assertEqual(len(inserts), 1)
+
+        changes = set(models.ScoreChange.objects.values_list("kind", "enrollment_id", "column_id", "old_score", "new_score", "changed_by_id"))
+        self.assertEqual(changes, {
+            ("criterion", e1.id, self.sub_criterion.id, None, Decimal("10.00"), self.admin.id),
+            ("special", e1.id, self.special.id, None, Decimal("2.00"), self.admin.id),
+        })
+
+    def test_task_scores_and_history_api(self):
+        e0 = self.enrollments[0]
+        url = reverse("api:task-scores-bulk-save")
+        for score in ("0.50", "0.75"):
+            self.client.post(url, {"updates": [{"enrollment_id": e0.id, "task_id": self.tasks[0].id, "score": score}]}, format="json")
+
+        history = self.client.get(reverse("api:score-changes-list"), {
+            "enrollment_id": e0.id, "kind": "task", "column_id": self.tasks[0].id,
+        }).json()
+        self.assertEqual([(h["old_score"], h["new_score"]) for h in history], [(0.5, 0.75), (None, 0.5)])
+
+        # Another student cannot read this enrollment's history
+        self.client.force_authenticate(self.enrollments[1].student)
+        self.assertEqual(self.client.get(reverse("api:score-changes-list"), {"enrollment_id": e0.id}).json(), [])
+
+    def test_archive_moves_old_months_to_files(self):
+        import gzip
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        now = timezone.now()
+        old = models.ScoreChange.objects.create(
+            kind="task", enrollment_id=self.enrollments[0].id, column_id=self.tasks[0].id,
+            new_score=Decimal("1.00"), changed_at=now - timedelta(days=500),
+        )
+        recent = models.ScoreChange.objects.create(
+            kind="task", enrollment_id=self.enrollments[0].id, column_id=self.tasks[0].id,
+            new_score=Decimal("2.00"), changed_at=now,
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("archive_score_changes", "--output-dir", directory, stdout=io.StringIO())
+            files = os.listdir(directory)
+            self.assertEqual(files, [f"score_changes-{timezone.localtime(old.changed_at):%Y-%m}.jsonl.gz"])
+            with gzip.open(os.path.join(directory, files[0]), "rt") as f:
+                self.assertEqual([json.loads(line)["id"] for line in f], [old.id])
+        self.assertEqual(list(models.ScoreChange.objects.values_list("id", flat=True)), [recent.id])
+
+
+class GradesheetStreamTest(SchoolTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.ticket = self.client.get(
+            reverse("api:criterion-scores-gradesheet-stream-ticket"), {"course_id": self.course.id}
+        ).json()["ticket"]
+
+    def save_scores(self, *cells):
+        # Streams are notified on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("api:criterion-scores-bulk-save"), {"updates": [
+                {"enrollment_id": enrollment.id, "criterion_id": self.sub_criterion.id, "score": score}
+                for enrollment, score in cells
+            ]}, format="json")
+
+    def stream(self, scenario, query):
+        from asgiref.sync import async_to_sync
+        from asgiref.testing import ApplicationCommunicator
+        from core.asgi import application
+        from api.school.streams import GRADESHEET_STREAM_PATH
+
+        async def run():
+            communicator = ApplicationCommunicator(application, {
+                "type": "http", "method": "GET", "path": GRADESHEET_STREAM_PATH,
+                "query_string": query.encode(), "headers": [],
+            })
+            await communicator.send_input({"type": "http.request"})
+            try:
+                return await scenario(communicator)
+            finally:
+                await communicator.send_input({"type": "http.disconnect"})
+                await communicator.wait(1)
+
+        return async_to_sync(run)()
+
+    def test_stream_pushes_changed_rows(self):
+        from asgiref.sync import sync_to_async
+
+        async def scenario(communicator):
+            start = await communicator.receive_output(1)
+            await communicator.receive_output(1)  # ": connected"
+            await sync_to_async(self.save_scores)((self.enrollments[1], 15))
+            return start, (await communicator.receive_output(1))["body"].decode()
+
+        start, event = self.stream(scenario, f"course_id={self.course.id}&ticket={self.ticket}")
+        self.assertEqual(start["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream"), start["headers"])
+        head, data = event.split("data: ")
+        self.assertEqual(head, f"event: grades\nid: {models.ScoreChange.objects.get().id}\n")
+        rows = json.loads(data)["rows"]
+        self.assertEqual(rows, [{
+            "enrollment_id": self.enrollments[1].id,
+            "grades": {str(self.sub_criterion.id): 15.0},
+            "final_grade": 15.0,
+        }])
+
+    def test_stream_resumes_from_cursor(self):
+        cursor = self.client.get(reverse("api:criterion-scores-gradesheet"), {"course_id": self.course.id}).json()["cursor"]
+        self.save_scores((self.enrollments[0], 7))
+
+        async def scenario(communicator):
+            await communicator.receive_output(1)
+            return (await communicator.receive_output(1))["body"].decode()
+
+        event = self.stream(scenario, f"course_id={self.course.id}&ticket={self.ticket}&since={cursor}")
+        rows = json.loads(event.split("data: ")[1])["rows"]
+        self.assertEqual([row["enrollment_id"] for row in rows], [self.enrollments[0].id])
+
+    def test_stream_requires_valid_ticket(self):
+        async def scenario(communicator):
+            return (await communicator.receive_output(1))["status"]
+
+        self.assertEqual(self.stream(scenario, f"course_id={self.course.id}&ticket=bad"), 401)
+        other = models.Course.objects.create(subject=self.subject, period=self.period, parallel="B")
+        self.assertEqual(self.stream(scenario, f"course_id={other.id}&ticket={self.ticket}"), 401)
+
+    def test_every_grade_write_is_published(self):
+        from api.school import events
+        from api.school.views import recalculate_sub_criterion_scores
+
+        published = []
+        original = events.LocalBackend.publish
+        events.LocalBackend.publish = lambda backend, course_id, ids: published.append(ids)
+        events.broker._streams[self.course.id] = {}  # an open stream in this process
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                models.TaskScore.objects.create(enrollment=self.enrollments[1], task=self.tasks[0], score=Decimal("1.00"))
+                recalculate_sub_criterion_scores(self.sub_criterion.id)
+            with self.captureOnCommitCallbacks(execute=True):
+                score = models.CriterionScore.objects.get(enrollment=self.enrollments[2])
+                response = self.client.patch(reverse("api:criterion-scores-detail", args=[score.id]), {"score": "3.00"}, format="json")
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        finally:
+            events.LocalBackend.publish = original
+            events.broker._streams.pop(self.course.id, None)
+        self.assertEqual(published, [sorted(e.id for e in self.enrollments), [self.enrollments[2].id]])
+
+    def test_gradesheet_changes_poll(self):
+        url = reverse("api:criterion-scores-gradesheet-changes")
+        cursor = self.client.get(url, {"course_id": self.course.id}).json()["cursor"]
+        self.save_scores((self.enrollments[2], 4), (self.enrollments[0], 8))
+
+        data = self.client.get(url, {"course_id": self.course.id, "since": cursor}).json()
+        self.assertEqual([row["enrollment_id"] for row in data["rows"]], [self.enrollments[0].id, self.enrollments[2].id])
+        self.assertEqual(data["rows"][0]["final_grade"], 8.0)
+        self.assertEqual(self.client.get(url, {"course_id": self.course.id, "since": data["cursor"]}).json()["rows"], [])
+
+
+class AsyncReadViewsTest(SchoolTestMixin, APITestCase):
+    def test_public_reads_are_async_and_match_drf(self):
+        import asyncio
+        from django.urls import resolve
+        from rest_framework.test import APIRequestFactory
+        from api.school.views import StudentCourseRegistrationViewSet
+
+        self.course.is_visible = True
+        self.course.save()
+        url = reverse("api:student-course-registration-open-courses")
+        self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+
+        drf_view = StudentCourseRegistrationViewSet.as_view({"get": "open_courses"})
+        expected = drf_view(APIRequestFactory().get(url)).render().content
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(response.content), json.loads(expected))
+        self.assertEqual(response.json()[0]["id"], self.course.id)
+
+    def test_writes_fall_back_to_drf(self):
+        url = reverse("api:web-config-list")
+        self.assertIsNone(self.client.get(url).json()["facebook"])
+        response = self.client.post(url, {"facebook": "https://facebook.com/school"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).json()["facebook"], "https://facebook.com/school")
+
+        response = self.client.post(reverse("api:publications-list"), {"title": "Book"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)  # DRF validation still applies
+        self.assertEqual(self.client.get(reverse("api:publications-list")).json(), [])
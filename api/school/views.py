@@ -1,14 +1,92 @@
+import io
+import traceback
+
 from rest_framework import viewsets, permissions, status, parsers
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from . import models
 from . import serializers
+from . import snapshots
+from . import audit
+from . import events
+from . import grading
+from . import streams
+from .renderers import with_columnar, wants_columnar
 from django.contrib.auth import get_user_model
-from django.db.models import Exists, OuterRef
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from django.db import IntegrityError, transaction
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
+from api import ratelimit, spreadsheets
+from api.images import rendition_urls
 
 User = get_user_model()
 
+
+# Everything CourseSerializer (and EnrollmentSerializer through course_details) touches
+COURSE_SELECT = ('subject__program', 'subject__period', 'subject__evaluation_template', 'teacher')
+COURSE_PREFETCH = ('subject__evaluation_template__criteria',)
+ENROLLMENT_SELECT = ('student',) + tuple(f'course__{path}' for path in COURSE_SELECT)
+ENROLLMENT_PREFETCH = tuple(f'course__{path}' for path in COURSE_PREFETCH)
+
+
+class RoleScopedViewSetMixin:
+    """
+    Base queryset = model.objects.visible_to(request.user), shaped by a named prefetch profile.
+
+    prefetch_profiles maps a profile name to {'select': (...), 'prefetch': (...)}.
+    The profile named after the current action is used, falling back to 'default',
+    so list/retrieve can load the nested serializer data while writes stay bare.
+    """
+    prefetch_profiles = {}
+
+    def get_prefetch_profile(self):
+        return self.prefetch_profiles.get(self.action) or self.prefetch_profiles.get('default') or {}
+
+    def get_scoped_queryset(self):
+        queryset = self.queryset.model.objects.visible_to(self.request.user)
+        profile = self.get_prefetch_profile()
+        if profile.get('select'):
+            queryset = queryset.select_related(*profile['select'])
+        if profile.get('prefetch'):
+            queryset = queryset.prefetch_related(*profile['prefetch'])
+        return queryset
+
+def ensure_open_period(enrollment_ids=(), course_ids=()):
+    """Raises a 400 when any of these enrollments or courses belongs to a closed period."""
+    if snapshots.touches_closed_period(enrollment_ids) or any(
+        snapshots.course_is_closed(course_id) for course_id in set(course_ids) if course_id is not None
+    ):
+        raise ValidationError({'error': snapshots.CLOSED_PERIOD_ERROR})
+
+
+class ScoreWriteMixin:
+    """
+    Plain create/update/destroy of per-enrollment score rows: refused in closed
+    periods, announced to the gradesheet streams once written.
+    """
+
+    def perform_create(self, serializer):
+        ensure_open_period([getattr(serializer.validated_data.get('enrollment'), 'pk', None)])
+        super().perform_create(serializer)
+        events.publish_enrollment_changes([serializer.instance.enrollment_id])
+
+    def perform_update(self, serializer):
+        enrollment = serializer.validated_data.get('enrollment')
+        previous = serializer.instance.enrollment_id
+        ensure_open_period([previous, getattr(enrollment, 'pk', None)])
+        super().perform_update(serializer)
+        events.publish_enrollment_changes({previous, serializer.instance.enrollment_id})
+
+    def perform_destroy(self, instance):
+        enrollment_id = instance.enrollment_id
+        ensure_open_period([enrollment_id])
+        super().perform_destroy(instance)
+        events.publish_enrollment_changes([enrollment_id])
+
+
 class EvaluationTemplateViewSet(viewsets.ModelViewSet):
     queryset = models.EvaluationTemplate.objects.all()
     serializer_class = serializers.EvaluationTemplateSerializer
@@ -19,6 +97,22 @@ class AcademicPeriodViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.AcademicPeriodSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @action(detail=True, methods=['post'])
+    def close(self, request, pk=None):
+        """Freezes the grades of every enrollment of the period (see snapshots.close_period)."""
+        if request.user.role != 'ADMIN' and not request.user.is_superuser:
+            return Response({'error': 'Solo un administrador puede cerrar el periodo'}, status=status.HTTP_403_FORBIDDEN)
+        period = self.get_object()
+        count = snapshots.close_period(period)
+        return Response({'status': 'closed', 'closed_at': period.closed_at, 'snapshots': count})
+
+    @action(detail=True, methods=['post'])
+    def reopen(self, request, pk=None):
+        if request.user.role != 'ADMIN' and not request.user.is_superuser:
+            return Response({'error': 'Solo un administrador puede reabrir el periodo'}, status=status.HTTP_403_FORBIDDEN)
+        snapshots.reopen_period(self.get_object())
+        return Response({'status': 'reopened'})
+
 
 class ProgramViewSet(viewsets.ModelViewSet):
     queryset = models.Program.objects.all()
@@ -48,63 +142,192 @@ class SubjectViewSet(viewsets.ModelViewSet):
 
 from decimal import Decimal
 
-def recalculate_sub_criterion_scores(sub_criterion_id, enrollment_ids=None):
+def task_criterion_points(kind, criterion_ids, enrollment_ids):
     """
-    Recalculates the CriterionScore for a given sub-criterion.
-    If enrollment_ids is None, recalculates for ALL enrollments in the course.
-    Logic: (Sum(Score * Weight) / Sum(Weights)) * SubCrit.Percentage
+    {(enrollment_id, criterion_id): points} for task-graded criteria, kind 'sub' or
+    'special'. The weighted averages come from one grouped query
+    (TaskScore.objects.criterion_points) and are rounded to hundredths by
+    grading.task_average_points; students without task scores get 0.
+    Criteria whose tasks weigh 0 in total (or have no tasks) have no entries.
     """
-    try:
-        sub_crit = models.CourseSubCriterion.objects.get(pk=sub_criterion_id)
-        all_tasks = models.CourseTask.objects.filter(sub_criterion=sub_crit)
-        total_weight = sum(t.weight for t in all_tasks)
-        max_score = sub_crit.percentage  # Already Decimal
+    from django.db.models import Sum
 
-        target_enrollments = []
+    fk = models.TASK_CRITERION_FIELDS[kind]
+    enrollment_ids = list(enrollment_ids)
+    graded = [
+        criterion_id for criterion_id, total in
+        models.CourseTask.objects.filter(**{f'{fk}_id__in': list(criterion_ids)}).order_by()
+        .values_list(f'{fk}_id').annotate(total=Sum('weight'))
+        if total and total > 0
+    ]
+    if not graded or not enrollment_ids:
+        return {}
+
+    points = {(e, c): Decimal('0.00') for c in graded for e in enrollment_ids}
+    rows = models.TaskScore.objects.filter(
+        enrollment_id__in=enrollment_ids, **{f'task__{fk}_id__in': graded}
+    ).criterion_points(kind)
+    for row in rows:
+        points[(row['enrollment_id'], row['criterion_id'])] = grading.task_average_points(
+            row['weighted'], row['total_weight'], row['percentage']
+        )
+    return points
+
+def recalculate_sub_criterion_scores(sub_criterion_ids, enrollment_ids=None, update_grades=True):
+    """
+    Recalculates the CriterionScore of task-graded sub-criteria (one id or a list).
+    If enrollment_ids is None, recalculates for ALL enrollments in each course.
+    Logic: (Sum(Score * Weight) / Sum(Weights)) * SubCrit.Percentage, computed in the database.
+    Final grades of the touched enrollments are then recomputed once (unless
+    update_grades is False, for callers that recompute a wider set themselves).
+    """
+    if isinstance(sub_criterion_ids, (int, str)):
+        sub_criterion_ids = [sub_criterion_ids]
+    try:
+        # Closed periods keep their frozen grades
+        sub_criteria = list(models.CourseSubCriterion.objects.filter(
+            pk__in=sub_criterion_ids, course__period__closed_at__isnull=True
+        ))
         if enrollment_ids:
-            target_enrollments = models.Enrollment.objects.filter(id__in=enrollment_ids)
-        else:
-            # Get all active enrollments for the course
-            target_enrollments = models.Enrollment.objects.filter(course=sub_crit.course)
-
-        if total_weight > 0:
-            for enroll in target_enrollments:
-                # Calculate weighted average
-                student_scores = models.TaskScore.objects.filter(enrollment=enroll, task__in=all_tasks)
-                score_sum = Decimal('0.00')
-                for s in student_scores:
-                    score_sum += (s.score * s.task.weight)
-                
-                # Normalized average (0.0 to 1.0)
-                # Ensure total_weight is Decimal
-                normalized_avg = score_sum / Decimal(total_weight)
-                
-                # Final score scaled to Max Points (Direct Points)
-                # normalized_avg is 0.0 to 1.0
-                final_score = normalized_avg * sub_crit.percentage
-                
-                models.CriterionScore.objects.update_or_create(
-                    enrollment=enroll,
-                    sub_criterion=sub_crit,
-                    defaults={'score': final_score}
-                )
-                
-                # Update final grade for this student
-                update_final_grade(enroll.id)
+            enrollments = list(models.Enrollment.objects.filter(id__in=enrollment_ids).values_list('id', 'course_id'))
         else:
-            # If total_weight is 0 (no tasks or all 0), maybe set score to 0?
-            # For now, leaving as is or setting to 0 depending on logic.
-            pass
+            # Get all active enrollments for the courses
+            enrollments = list(models.Enrollment.objects.filter(
+                course_id__in={sc.course_id for sc in sub_criteria}
+            ).values_list('id', 'course_id'))
+
+        points = task_criterion_points('sub', [sc.id for sc in sub_criteria], [e for e, _ in enrollments])
+        # If the tasks weigh 0 in total (or there are none), existing scores are left as is
+        touched = set()
+        for sc in sub_criteria:
+            scores = {
+                enrollment_id: points[(enrollment_id, sc.id)]
+                for enrollment_id, course_id in enrollments
+                if course_id == sc.course_id and (enrollment_id, sc.id) in points
+            }
+            if scores:
+                upsert_criterion_scores(sc.id, scores)
+                touched.update(scores)
+
+        # Update final grades for these students
+        if update_grades:
+            update_final_grades(touched)
 
     except Exception as e:
         print(f"Error recalculating averages: {e}")
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+def _bulk_create_with_pks(model, objs, key):
+    """
+    bulk_create that always leaves primary keys on objs.
+    Backends that cannot return ids from a bulk insert (SQLite, MySQL on Django 3.2)
+    get them back by matching the new rows on key (field names, the first one
+    narrowing the lookup), in insertion order among equal keys. Callers run this
+    inside a transaction that keeps other writers off those keys meanwhile.
+    """
+    from django.db import connections, router
+
+    if not objs:
+        return objs
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    rows = model.objects.filter(**{f'{key[0]}__in': {getattr(obj, key[0]) for obj in objs}})
+    existing = set(rows.values_list('id', flat=True))
+    model.objects.bulk_create(objs)
+    created = {}
+    for pk, *values in rows.exclude(id__in=existing).order_by('id').values_list('id', *key):
+        created.setdefault(tuple(values), []).append(pk)
+    for obj in objs:
+        obj.pk = created[tuple(getattr(obj, field) for field in key)].pop(0)
+    return objs
+
+
+def clone_course_structure(source, targets):
+    """
+    Copies the sub-criteria, special criteria and tasks of source into every
+    target course: one bulk_create per model for all targets together.
+    Project registration windows are not copied and tasks start unlocked.
+    New tasks have no scores yet, so the graded sub-criteria get a 0 CriterionScore
+    per enrollment (what recalculate_sub_criterion_scores would write) and each
+    affected final grade is recomputed once at the end.
+    Returns a dict of created counts.
+    """
+    sub_criteria = list(source.sub_criteria.all())
+    special_criteria = list(source.special_criteria.all())
+    tasks = list(models.CourseTask.objects.filter(
+        Q(sub_criterion__course=source) | Q(special_criterion__course=source)
+    ).order_by('id'))
+
+    with transaction.atomic():
+        # Serializes concurrent clones into the same courses (no-op on SQLite)
+        list(models.Course.objects.select_for_update().filter(id__in=[target.id for target in targets]))
+        new_subs = {}
+        new_specials = {}
+        sub_objs = []
+        special_objs = []
+        for target in targets:
+            for sc in sub_criteria:
+                obj = models.CourseSubCriterion(
+                    course=target, parent_criterion_id=sc.parent_criterion_id, name=sc.name,
+                    percentage=sc.percentage, visible_on_gradesheet=sc.visible_on_gradesheet,
+                    editable_on_gradesheet=sc.editable_on_gradesheet, is_project=sc.is_project,
+                    max_members=sc.max_members,
+                )
+                new_subs[(target.id, sc.id)] = obj
+                sub_objs.append(obj)
+            for spec in special_criteria:
+                obj = models.CourseSpecialCriterion(
+                    course=target, parent_criterion_id=spec.parent_criterion_id, name=spec.name,
+                    percentage=spec.percentage, visible_on_gradesheet=spec.visible_on_gradesheet,
+                    editable_on_gradesheet=spec.editable_on_gradesheet,
+                )
+                new_specials[(target.id, spec.id)] = obj
+                special_objs.append(obj)
+        criterion_key = ('course_id', 'parent_criterion_id', 'name')
+        _bulk_create_with_pks(models.CourseSubCriterion, sub_objs, criterion_key)
+        _bulk_create_with_pks(models.CourseSpecialCriterion, special_objs, criterion_key)
+
+        task_objs = []
+        graded_subs = set()
+        for target in targets:
+            for task in tasks:
+                obj = models.CourseTask(name=task.name, weight=task.weight, is_public=task.is_public)
+                if task.sub_criterion_id:
+                    obj.sub_criterion = new_subs[(target.id, task.sub_criterion_id)]
+                    if task.weight:
+                        graded_subs.add(obj.sub_criterion)
+                else:
+                    obj.special_criterion = new_specials[(target.id, task.special_criterion_id)]
+                task_objs.append(obj)
+        models.CourseTask.objects.bulk_create(task_objs)
+
+        enrollments = list(models.Enrollment.objects.filter(course__in=targets).values_list('id', 'course_id'))
+        models.CriterionScore.objects.bulk_create([
+            models.CriterionScore(enrollment_id=enrollment_id, sub_criterion=sc, score=0)
+            for sc in graded_subs
+            for enrollment_id, course_id in enrollments
+            if sc.course_id == course_id
+        ], ignore_conflicts=True)
+
+    update_final_grades([enrollment_id for enrollment_id, _ in enrollments])
+
+    return {
+        'sub_criteria': len(sub_objs),
+        'special_criteria': len(special_objs),
+        'tasks': len(task_objs),
+        'recomputed_enrollments': len(enrollments),
+    }
+
+
+class CourseViewSet(RoleScopedViewSetMixin, viewsets.ModelViewSet):
     queryset = models.Course.objects.all()
     serializer_class = serializers.CourseSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = (parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser)
+    prefetch_profiles = {
+        'default': {'select': COURSE_SELECT, 'prefetch': COURSE_PREFETCH},
+    }
 
     def perform_create(self, serializer):
         """
@@ -148,16 +371,8 @@ class CourseViewSet(viewsets.ModelViewSet):
         except Exception as e:
             print(f"Error auto-closing courses: {e}")
 
-        user = self.request.user
-        queryset = models.Course.objects.all()
-
-        # Apply role-based filtering first
-        if user.role == 'TEACHER':
-            queryset = queryset.filter(teacher=user)
-        elif user.role == 'STUDENT':
-            queryset = queryset.filter(enrollments__student=user)
-        elif user.role == 'PARENT':
-            queryset = queryset.filter(enrollments__student__parent_relationships__parent=user).distinct()
+        # Role-based filtering first (EXISTS subqueries, no DISTINCT needed)
+        queryset = self.get_scoped_queryset()
         
         # Apply filters
         subject_id = self.request.query_params.get('subject')
@@ -204,19 +419,48 @@ class CourseViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'])
+    def clone_structure(self, request, pk=None):
+        """
+        Copy this course's sub-criteria, special criteria and tasks to other courses.
+        Expects: { "target_courses": [2, 3, ...] }
+        Targets must be visible to the user and use the same evaluation template,
+        since sub-criteria hang off the template's criteria.
+        """
+        source = self.get_object()
+        target_ids = request.data.get('target_courses') or []
+        if not isinstance(target_ids, list) or not target_ids:
+            return Response({'error': 'target_courses must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        candidates = models.Course.objects.visible_to(request.user).filter(
+            id__in=[t for t in target_ids if str(t).isdigit()]
+        ).exclude(id=source.id).select_related('subject', 'period')
+        template_id = source.subject.evaluation_template_id if source.subject else None
+        targets = []
+        skipped = []
+        for course in candidates:
+            if course.period and course.period.closed_at:
+                skipped.append({'id': course.id, 'reason': 'closed period'})
+            elif course.subject and course.subject.evaluation_template_id == template_id:
+                targets.append(course)
+            else:
+                skipped.append({'id': course.id, 'reason': 'different evaluation template'})
+        found = {str(course.id) for course in candidates}
+        skipped += [{'id': t, 'reason': 'not found'} for t in target_ids if str(t) not in found]
+
+        created = clone_course_structure(source, targets) if targets else {}
+        return Response({'cloned': [course.id for course in targets], 'skipped': skipped, 'created': created})
+
+class EnrollmentViewSet(RoleScopedViewSetMixin, viewsets.ModelViewSet):
     queryset = models.Enrollment.objects.all()
     serializer_class = serializers.EnrollmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    prefetch_profiles = {
+        'default': {'select': ENROLLMENT_SELECT, 'prefetch': ENROLLMENT_PREFETCH},
+    }
 
     def get_queryset(self):
-        queryset = models.Enrollment.objects.all()
-        user = self.request.user
-        
-        if user.role == 'STUDENT':
-            queryset = queryset.filter(student=user)
-        elif user.role == 'PARENT':
-            queryset = queryset.filter(student__parent_relationships__parent=user)
+        queryset = self.get_scoped_queryset()
         
         # Allow filtering by course for admin/teachers
         course_id = self.request.query_params.get('course')
@@ -240,8 +484,6 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
         try:
             filename = file.name.lower()
             if filename.endswith('.csv'):
-                import csv
-                import io
                 decoded_file = file.read().decode('utf-8')
                 io_string = io.StringIO(decoded_file)
                 # Read header
@@ -253,14 +495,12 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
                 rows = [l.split(delimiter) for l in lines[1:]]
             
             elif filename.endswith('.xlsx'):
-                import openpyxl
-                wb = openpyxl.load_workbook(file, data_only=True)
+                wb = spreadsheets.openpyxl().load_workbook(file, data_only=True)
                 sheet = wb.active
                 # Scan first 50 rows for header
                 header_row_idx = 0
                 headers = []
                 found_header = False
-                import re
                 
                 target_headers = [
                     'ci', 'carnet', 'cedula', 'documento', 'c.i.', 'c.i', 'ci_number',
@@ -271,7 +511,7 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
                 rows_iter = list(sheet.iter_rows(values_only=True))
                 for i, row in enumerate(rows_iter[:50]):
                    # Normalize headers
-                   row_strs = [re.sub(r'\s+', ' ', str(c).strip().lower()) if c else '' for c in row]
+                   row_strs = [spreadsheets.WHITESPACE_RE.sub(' ', str(c).strip().lower()) if c else '' for c in row]
                    if any(h in row_strs for h in target_headers):
                        headers = row_strs
                        header_row_idx = i
@@ -304,7 +544,6 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
                  return Response({"error": f"Missing CI column. Found: {headers}"}, status=status.HTTP_400_BAD_REQUEST)
 
             seen_cis = set()
-            import re
 
             for row in rows:
                 if not row: continue
@@ -315,7 +554,7 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
 
                 raw_ci = row_vals[col_map['ci']]
                 # Clean CI: keep only digits
-                ci = re.sub(r'\D', '', raw_ci)
+                ci = spreadsheets.NON_DIGITS_RE.sub('', raw_ci)
 
                 if not ci: continue
                 
@@ -361,7 +600,6 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
                 students_found.append(student_data)
 
         except Exception as e:
-            import traceback
             traceback.print_exc()
             return Response({"error": f"Error parsing file: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -489,7 +727,7 @@ class SubEvaluationViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.SubEvaluationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class ScoreViewSet(viewsets.ModelViewSet):
+class ScoreViewSet(ScoreWriteMixin, viewsets.ModelViewSet):
     queryset = models.Score.objects.all()
     serializer_class = serializers.ScoreSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -503,7 +741,12 @@ class ScoreViewSet(viewsets.ModelViewSet):
         data = request.data
         if not isinstance(data, list):
             return Response({"error": "Expected a list of scores"}, status=status.HTTP_400_BAD_REQUEST)
+        if snapshots.touches_closed_period(item.get('enrollment') for item in data):
+            return Response({"error": snapshots.CLOSED_PERIOD_ERROR}, status=status.HTTP_400_BAD_REQUEST)
         
+        log = audit.ScoreChangeLog(request.user)
+        log.snapshot(models.ScoreChange.SCORE, [(item.get('enrollment'), item.get('sub_evaluation')) for item in data])
+
         updated_scores = []
         for item in data:
             enrollment_id = item.get('enrollment')
@@ -516,9 +759,165 @@ class ScoreViewSet(viewsets.ModelViewSet):
                 defaults={'value': value}
             )
             updated_scores.append(score)
+            log.record(models.ScoreChange.SCORE, enrollment_id, sub_eval_id, value)
+        log.save()
+        events.publish_enrollment_changes(item.get('enrollment') for item in data)
         
         return Response({"status": "Scores updated"}, status=status.HTTP_200_OK)
 
+def student_criteria_grades(enrollment):
+    """
+    Dashboard breakdown of one enrollment: parent criteria (capped at their weight)
+    with their sub-criteria, extra points and task scores.
+    """
+    course = enrollment.course
+    criteria_grades = []
+
+    # All of this course's tasks and this student's task scores, loaded once
+    tasks_by_criterion = {}
+    for task in models.CourseTask.objects.filter(
+        Q(sub_criterion__course=course) | Q(special_criterion__course=course)
+    ).order_by('id'):
+        key = ('sub', task.sub_criterion_id) if task.sub_criterion_id else ('special', task.special_criterion_id)
+        tasks_by_criterion.setdefault(key, []).append(task)
+    my_task_scores = dict(
+        models.TaskScore.objects.filter(enrollment=enrollment).values_list('task_id', 'score')
+    )
+
+    def task_rows(key):
+        return [
+            {'name': task.name, 'weight': float(task.weight), 'score': float(my_task_scores.get(task.id, 0))}
+            for task in tasks_by_criterion.get(key, [])
+        ]
+
+    # Fetch all sub-criteria for the course, grouped by parent
+    sub_criteria = models.CourseSubCriterion.objects.filter(course=course).select_related('parent_criterion').annotate(
+        has_tasks=Exists(models.CourseTask.objects.filter(sub_criterion=OuterRef('pk'))),
+        has_projects=Exists(models.Project.objects.filter(sub_criterion=OuterRef('pk')))
+    ).order_by('parent_criterion__id', 'id')
+
+    # Group by Parent Criterion
+    grouped_criteria = {}
+
+    # 1. Process Standard Sub-Criteria
+    for sub in sub_criteria:
+        parent = sub.parent_criterion
+        if not parent:
+            continue
+
+        if parent.id not in grouped_criteria:
+            grouped_criteria[parent.id] = {
+                'name': parent.name,
+                'max_points': parent.weight, # Cap limit
+                'sum_max_points': 0, # Sum of children max points (for display if needed)
+                'score': 0,
+                'raw_score': 0, # Uncapped sum
+                'sub_criteria': [],
+                'is_special': False
+            }
+
+        sub_tasks_list = task_rows(('sub', sub.id)) if sub.has_tasks else []
+
+        # Get Score
+        sub_score = 0
+
+        # Check if it's a Project Sub-Criterion
+        if sub.is_project:
+            # Find project where student is a member
+            project = models.Project.objects.filter(
+                sub_criterion=sub,
+                members=enrollment
+            ).first()
+
+            if project:
+                sub_score = project.score
+            else:
+                sub_score = 0
+        else:
+            # Standard CriterionScore
+            score_obj = models.CriterionScore.objects.filter(
+                enrollment=enrollment,
+                sub_criterion=sub
+            ).first()
+            sub_score = score_obj.score if score_obj else 0
+
+        sub_max = sub.percentage
+
+        grouped_criteria[parent.id]['sub_criteria'].append({
+            'name': sub.name,
+            'max_points': sub_max,
+            'score': sub_score,
+            'is_special': False,
+            'tasks': sub_tasks_list
+        })
+        grouped_criteria[parent.id]['sum_max_points'] += sub_max
+        grouped_criteria[parent.id]['raw_score'] += sub_score
+
+    # 2. Process Special Criteria (Extra Points) - Grouped under Parent
+    special_criteria = list(models.CourseSpecialCriterion.objects.filter(course=course).select_related('parent_criterion').annotate(
+        has_tasks=Exists(models.CourseTask.objects.filter(special_criterion=OuterRef('pk')))
+    ).order_by('id'))
+    special_points = task_criterion_points(
+        'special', [spec.id for spec in special_criteria if spec.has_tasks], [enrollment.id]
+    )
+
+    for spec in special_criteria:
+        final_score = 0
+        sub_tasks_list = []
+
+        # Logic from gradesheet: Calculate from tasks if has_tasks
+        if spec.has_tasks:
+             sub_tasks_list = task_rows(('special', spec.id))
+             final_score = special_points.get((enrollment.id, spec.id), Decimal('0.00'))
+        else:
+            # Direct Score from SpecialCriterionScore
+            score_obj = models.SpecialCriterionScore.objects.filter(
+                enrollment=enrollment,
+                special_criterion=spec
+            ).first()
+            final_score = score_obj.score if score_obj else Decimal('0.00')
+
+        # Add to Parent Group if exists
+        parent = spec.parent_criterion
+        if parent and parent.id in grouped_criteria:
+             grouped_criteria[parent.id]['sub_criteria'].append({
+                'name': f"{spec.name} (Extra)",
+                'max_points': spec.percentage,
+                'score': final_score,
+                'is_special': True,
+                'tasks': sub_tasks_list
+            })
+             # Ensure raw_score is treated as Decimal (it starts as int 0? no, dependent on previous adds)
+             # Let's verify initialization
+             grouped_criteria[parent.id]['raw_score'] += final_score
+             # We rarely add special points to sum_max_points as they are "extra", but strictly speaking user didn't specify. 
+             # Usually extra points don't increase the denominator, only the numerator.
+        else:
+            # Fallback for orphaned special criteria (shouldn't happen with correct data)
+            criteria_grades.append({
+                'name': spec.name,
+                'max_points': spec.percentage,
+                'score': final_score,
+                'sub_criteria': [],
+                'is_special': True,
+                'tasks': sub_tasks_list
+            })
+
+    # 3. Finalize Groups and Apply Caps
+    for pid, group in grouped_criteria.items():
+        # Capping logic: Min(Raw Sum, Criterion Weight)
+        # Ensure we convert to float for comparison
+        limit = float(group['max_points'])
+        raw = float(group['raw_score'])
+
+        final_group_score = min(raw, limit)
+        group['score'] = final_group_score
+
+        criteria_grades.append(group)
+
+    return criteria_grades
+
+
 class ReportViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -643,7 +1042,7 @@ class ReportViewSet(viewsets.ViewSet):
             
             # Filter by active courses to match Header logic
             # Also ensures we don't crash on weird data
-            active_enrollments = my_enrollments.filter(course__active=True).select_related('course', 'course__subject', 'course__teacher', 'course__period')
+            active_enrollments = my_enrollments.filter(course__active=True).select_related('course', 'course__subject', 'course__teacher', 'course__period', 'grade_snapshot')
             
             print(f"Dashboard Stats: Found {active_enrollments.count()} active enrollments for user {user.email}")
 
@@ -653,171 +1052,17 @@ class ReportViewSet(viewsets.ViewSet):
                     image_url = None
                     if course.image:
                         image_url = request.build_absolute_uri(course.image.url)
+                    image_renditions = rendition_urls(course.image, request)
                     
 
                     # Calculate Criteria Grades (Hierarchical) - Aligned with Gradesheet
-                    criteria_grades = []
-                    
-                    # Fetch all sub-criteria for the course, grouped by parent
-                    sub_criteria = models.CourseSubCriterion.objects.filter(course=course).select_related('parent_criterion').annotate(
-                        has_tasks=Exists(models.CourseTask.objects.filter(sub_criterion=OuterRef('pk'))),
-                        has_projects=Exists(models.Project.objects.filter(sub_criterion=OuterRef('pk')))
-                    ).order_by('parent_criterion__id', 'id')
-
-                    # Group by Parent Criterion
-                    grouped_criteria = {}
-                    
-                    # 1. Process Standard Sub-Criteria
-                    for sub in sub_criteria:
-                        parent = sub.parent_criterion
-                        if not parent:
-                            continue
-                        
-                        if parent.id not in grouped_criteria:
-                            grouped_criteria[parent.id] = {
-                                'name': parent.name,
-                                'max_points': parent.weight, # Cap limit
-                                'sum_max_points': 0, # Sum of children max points (for display if needed)
-                                'score': 0,
-                                'raw_score': 0, # Uncapped sum
-                                'sub_criteria': [],
-                                'is_special': False
-                            }
-                        
-                        sub_tasks_list = []
-                        if sub.has_tasks:
-                             tasks = models.CourseTask.objects.filter(sub_criterion=sub)
-                             task_scores = models.TaskScore.objects.filter(
-                                 enrollment=enrollment,
-                                 task__sub_criterion=sub
-                             )
-                             score_map_tasks = {ts.task_id: ts.score for ts in task_scores}
-                             for task in tasks:
-                                 score_val = score_map_tasks.get(task.id, 0)
-                                 sub_tasks_list.append({
-                                     'name': task.name,
-                                     'weight': float(task.weight),
-                                     'score': float(score_val)
-                                 })
-                        
-                        # Get Score
-                        sub_score = 0
-                        
-                        # Check if it's a Project Sub-Criterion
-                        if sub.is_project:
-                            # Find project where student is a member
-                            project = models.Project.objects.filter(
-                                sub_criterion=sub,
-                                members=enrollment
-                            ).first()
-                            
-                            if project:
-                                sub_score = project.score
-                            else:
-                                sub_score = 0
-                        else:
-                            # Standard CriterionScore
-                            score_obj = models.CriterionScore.objects.filter(
-                                enrollment=enrollment,
-                                sub_criterion=sub
-                            ).first()
-                            sub_score = score_obj.score if score_obj else 0
-                        
-                        sub_max = sub.percentage
-
-                        grouped_criteria[parent.id]['sub_criteria'].append({
-                            'name': sub.name,
-                            'max_points': sub_max,
-                            'score': sub_score,
-                            'is_special': False,
-                            'tasks': sub_tasks_list
-                        })
-                        grouped_criteria[parent.id]['sum_max_points'] += sub_max
-                        grouped_criteria[parent.id]['raw_score'] += sub_score
-
-                    # 2. Process Special Criteria (Extra Points) - Grouped under Parent
-                    special_criteria = models.CourseSpecialCriterion.objects.filter(course=course).select_related('parent_criterion').annotate(
-                        has_tasks=Exists(models.CourseTask.objects.filter(special_criterion=OuterRef('pk')))
-                    ).order_by('id')
-
-                    for spec in special_criteria:
-                        final_score = 0
-                        sub_tasks_list = []
-                        
-                        # Logic from gradesheet: Calculate from tasks if has_tasks
-                        if spec.has_tasks:
-                             tasks = models.CourseTask.objects.filter(special_criterion=spec)
-                             task_scores = models.TaskScore.objects.filter(
-                                 enrollment=enrollment,
-                                 task__special_criterion=spec
-                             )
-                             score_map_tasks = {ts.task_id: ts.score for ts in task_scores}
-                             
-                             total_weight = 0
-                             weighted_sum = 0
-                             
-                             for task in tasks:
-                                 score_val = score_map_tasks.get(task.id, 0)
-                                 sub_tasks_list.append({
-                                     'name': task.name,
-                                     'weight': float(task.weight),
-                                     'score': float(score_val)
-                                 })
-                                 weighted_sum += score_val * task.weight
-                                 total_weight += task.weight
-                             
-                             if total_weight > 0:
-                                 # raw_avg is Decimal
-                                 raw_avg = weighted_sum / total_weight
-                                 # Ensure spec.percentage is Decimal
-                                 final_score = raw_avg * spec.percentage
-                             else:
-                                 final_score = Decimal('0.00')
-                        else:
-                            # Direct Score from SpecialCriterionScore
-                            score_obj = models.SpecialCriterionScore.objects.filter(
-                                enrollment=enrollment,
-                                special_criterion=spec
-                            ).first()
-                            final_score = score_obj.score if score_obj else Decimal('0.00')
-                        
-                        # Add to Parent Group if exists
-                        parent = spec.parent_criterion
-                        if parent and parent.id in grouped_criteria:
-                             grouped_criteria[parent.id]['sub_criteria'].append({
-                                'name': f"{spec.name} (Extra)",
-                                'max_points': spec.percentage,
-                                'score': final_score,
-                                'is_special': True,
-                                'tasks': sub_tasks_list
-                            })
-                             # Ensure raw_score is treated as Decimal (it starts as int 0? no, dependent on previous adds)
-                             # Let's verify initialization
-                             grouped_criteria[parent.id]['raw_score'] += final_score
-                             # We rarely add special points to sum_max_points as they are "extra", but strictly speaking user didn't specify. 
-                             # Usually extra points don't increase the denominator, only the numerator.
-                        else:
-                            # Fallback for orphaned special criteria (shouldn't happen with correct data)
-                            criteria_grades.append({
-                                'name': spec.name,
-                                'max_points': spec.percentage,
-                                'score': final_score,
-                                'sub_criteria': [],
-                                'is_special': True,
-                                'tasks': sub_tasks_list
-                            })
-
-                    # 3. Finalize Groups and Apply Caps
-                    for pid, group in grouped_criteria.items():
-                        # Capping logic: Min(Raw Sum, Criterion Weight)
-                        # Ensure we convert to float for comparison
-                        limit = float(group['max_points'])
-                        raw = float(group['raw_score'])
-                        
-                        final_group_score = min(raw, limit)
-                        group['score'] = final_group_score
-                        
-                        criteria_grades.append(group)
+                    snapshot = getattr(enrollment, 'grade_snapshot', None)
+                    if snapshot is not None:
+                        criteria_grades = snapshot.breakdown['criteria']
+                        grade = snapshot.final_grade
+                    else:
+                        criteria_grades = student_criteria_grades(enrollment)
+                        grade = enrollment.final_grade
 
                     data['enrolled_courses'].append({
                         'id': course.id,
@@ -827,7 +1072,8 @@ class ReportViewSet(viewsets.ViewSet):
                         'period': course.period.name,
                         'teacher': course.teacher.get_full_name() if course.teacher else "Sin Docente",
                         'image': image_url,
-                        'grade': enrollment.final_grade,
+                        'image_renditions': image_renditions,
+                        'grade': grade,
                         'schedule': course.schedule,
                         'whatsapp_link': course.whatsapp_link,
                         'criteria_grades': criteria_grades
@@ -847,6 +1093,50 @@ class ReportViewSet(viewsets.ViewSet):
 
         return Response(data)
 
+def bulk_update_gradesheet_settings(model, updates, id_prefix=None):
+    """
+    Applies [{"id", "visible", "editable"}, ...] to visible/editable_on_gradesheet.
+    All rows are fetched in one query and only the rows whose values change are
+    written, with a single bulk_update inside a transaction.
+    Returns (saved, missing_ids), saved being the number of rows actually changed.
+    """
+    wanted = {}
+    missing = []
+    for update in updates:
+        raw_id = update.get('id')
+        obj_id = raw_id
+        if id_prefix and isinstance(obj_id, str) and obj_id.startswith(id_prefix):
+            obj_id = obj_id[len(id_prefix):]
+        try:
+            wanted[int(obj_id)] = update
+        except (TypeError, ValueError):
+            missing.append(raw_id)
+
+    changed = []
+    with transaction.atomic():
+        found = model.objects.select_for_update().in_bulk(list(wanted))
+        for obj_id, update in wanted.items():
+            obj = found.get(obj_id)
+            if obj is None:
+                missing.append(update.get('id'))
+                continue
+            visible = update.get('visible')
+            editable = update.get('editable')
+            dirty = False
+            if visible is not None and obj.visible_on_gradesheet != visible:
+                obj.visible_on_gradesheet = visible
+                dirty = True
+            if editable is not None and obj.editable_on_gradesheet != editable:
+                obj.editable_on_gradesheet = editable
+                dirty = True
+            if dirty:
+                changed.append(obj)
+        if changed:
+            model.objects.bulk_update(changed, ['visible_on_gradesheet', 'editable_on_gradesheet'])
+
+    return len(changed), missing
+
+
 class CourseSubCriterionViewSet(viewsets.ModelViewSet):
     queryset = models.CourseSubCriterion.objects.all()
     serializer_class = serializers.CourseSubCriterionSerializer
@@ -863,6 +1153,7 @@ class CourseSubCriterionViewSet(viewsets.ModelViewSet):
         course = serializer.validated_data['course']
 
         serializer.save()
+        invalidate_available_projects(course.id)
 
     def perform_update(self, serializer):
         instance = serializer.instance
@@ -875,10 +1166,12 @@ class CourseSubCriterionViewSet(viewsets.ModelViewSet):
             models.Project.objects.filter(sub_criterion=instance).delete()
             
         serializer.save()
+        invalidate_available_projects(instance.course_id)
 
     def perform_destroy(self, instance):
 
         instance.delete()
+        invalidate_available_projects(instance.course_id)
 
     @action(detail=False, methods=['post'])
     def bulk_update_settings(self, request):
@@ -886,27 +1179,9 @@ class CourseSubCriterionViewSet(viewsets.ModelViewSet):
         Update visible/editable settings for a list of sub-criteria.
         Expects: { "updates": [ {"id": 1, "visible": true, "editable": false}, ... ] }
         """
-        print("DEBUG: bulk_update_settings called")
-        print(f"DEBUG: Data received: {request.data}")
         updates = request.data.get('updates', [])
-        saved = 0
-        for u in updates:
-            crit_id = u.get('id')
-            visible = u.get('visible')
-            editable = u.get('editable')
-            
-            try:
-                crit = models.CourseSubCriterion.objects.get(id=crit_id)
-                if visible is not None: crit.visible_on_gradesheet = visible
-                if editable is not None: crit.editable_on_gradesheet = editable
-                crit.save()
-                saved += 1
-            except models.CourseSubCriterion.DoesNotExist:
-                print(f"DEBUG: Criterion {crit_id} not found")
-                continue
-        
-        print(f"DEBUG: Saved {saved} updates")
-        return Response({"saved": saved})
+        saved, missing = bulk_update_gradesheet_settings(models.CourseSubCriterion, updates)
+        return Response({"saved": saved, "missing": missing})
 
 class CourseSpecialCriterionViewSet(viewsets.ModelViewSet):
     queryset = models.CourseSpecialCriterion.objects.all()
@@ -938,166 +1213,174 @@ class CourseSpecialCriterionViewSet(viewsets.ModelViewSet):
     def bulk_update_settings(self, request):
         """Update visibility and editability for multiple special criteria."""
         updates = request.data.get('updates', [])
-        for update in updates:
-            # Extract special- prefix from id if present
-            spec_id = update.get('id', '')
-            if isinstance(spec_id, str) and spec_id.startswith('special-'):
-                spec_id = spec_id.replace('special-', '')
-            
-            try:
-                spec = models.CourseSpecialCriterion.objects.get(id=spec_id)
-                spec.visible_on_gradesheet = update.get('visible', spec.visible_on_gradesheet)
-                spec.editable_on_gradesheet = update.get('editable', spec.editable_on_gradesheet)
-                spec.save()
-            except models.CourseSpecialCriterion.DoesNotExist:
-                pass
-        
-        return Response({'status': 'success'})
+        # Gradesheet column ids come as "special-<id>"
+        saved, missing = bulk_update_gradesheet_settings(
+            models.CourseSpecialCriterion, updates, id_prefix='special-'
+        )
+        return Response({'status': 'success', 'saved': saved, 'missing': missing})
+
+
+def gradesheet_structure(course_id):
+    """Criterion groups of a course, each with its sub-criteria and special criteria columns."""
+    # 1. Fetch Columns (SubCriteria) grouped by Parent
+    # We need the parent criterion info
+    sub_criteria = models.CourseSubCriterion.objects.filter(course_id=course_id).select_related('parent_criterion').annotate(
+        has_tasks=Exists(models.CourseTask.objects.filter(sub_criterion=OuterRef('pk'))),
+        has_projects=Exists(models.Project.objects.filter(sub_criterion=OuterRef('pk')))
+    ).order_by('parent_criterion__id', 'id')
+
+    # Fetch special criteria as well
+    special_criteria = models.CourseSpecialCriterion.objects.filter(course_id=course_id).select_related('parent_criterion').annotate(
+        has_tasks=Exists(models.CourseTask.objects.filter(special_criterion=OuterRef('pk')))
+    ).order_by('parent_criterion__id', 'id')
+
+    structure = []
+    current_parent_id = None
+    current_group = None
+
+    # Process regular sub_criteria
+    for sc in sub_criteria:
+        parent = sc.parent_criterion
+        if parent.id != current_parent_id:
+            if current_group:
+                structure.append(current_group)
+            current_parent_id = parent.id
+            current_group = {
+                "id": parent.id,
+                "name": parent.name,
+                "weight": parent.weight,
+                "sub_criteria": [],
+                "special_criteria": []
+            }
+
+        current_group["sub_criteria"].append({
+            "id": sc.id,
+            "name": sc.name,
+            "percentage": sc.percentage,
+            "visible": sc.visible_on_gradesheet,
+            "editable": sc.editable_on_gradesheet,
+            "has_tasks": sc.has_tasks,
+            "has_projects": sc.has_projects,
+            "is_special": False
+        })
+
+    if current_group:
+        structure.append(current_group)
+
+    # Add special criteria to their respective groups
+    for spec in special_criteria:
+        if not spec.parent_criterion:
+            continue
+        parent_id = spec.parent_criterion.id
+        # Find the group in structure
+        group = next((g for g in structure if g['id'] == parent_id), None)
+        if not group:
+            # Create group if it doesn't exist yet
+            group = {
+                "id": parent_id,
+                "name": spec.parent_criterion.name,
+                "weight": spec.parent_criterion.weight,
+                "sub_criteria": [],
+                "special_criteria": []
+            }
+            structure.append(group)
+
+        group["special_criteria"].append({
+            "id": f"special-{spec.id}",
+            "actual_id": spec.id,
+            "name": spec.name,
+            "percentage": spec.percentage,
+            "visible": spec.visible_on_gradesheet,
+            "editable": spec.editable_on_gradesheet,
+            "has_tasks": spec.has_tasks,
+            "has_projects": False,
+            "is_special": True
+        })
+
+    return structure
+
+
+def gradesheet_grades(course_id, structure, enrollment_ids):
+    """{enrollment_id: {column id: score}} for the given enrollments of the course."""
+    scores = models.CriterionScore.objects.filter(enrollment__course_id=course_id)
+    special_scores = models.SpecialCriterionScore.objects.filter(enrollment__course_id=course_id)
+
+    score_map = {} # (enrollment_id, criterion_id_str) -> score
+    for s in scores:
+        score_map[(s.enrollment_id, str(s.sub_criterion_id))] = s.score
+    for s in special_scores:
+        score_map[(s.enrollment_id, f"special-{s.special_criterion_id}")] = s.score
+
+    # Task-graded special criteria: weighted averages for the whole sheet in one grouped query
+    special_points = task_criterion_points(
+        'special',
+        [spec['actual_id'] for struct in structure for spec in struct['special_criteria'] if spec.get('has_tasks')],
+        enrollment_ids,
+    )
+
+    grades = {}
+    for enrollment_id in enrollment_ids:
+        student_grades = grades[enrollment_id] = {}
+        # Flatten subcriteria IDs for easy lookup
+        for struct in structure:
+            for sub in struct['sub_criteria']:
+                # Regular sub-criteria use ID as key
+                val = score_map.get((enrollment_id, str(sub['id'])))
+                if val is not None:
+                     student_grades[sub['id']] = val
+
+            # Special criteria
+            for spec in struct['special_criteria']:
+                spec_key = spec['id'] # "special-{id}"
+
+                # If it has tasks, calculate from tasks
+                if spec.get('has_tasks'):
+                    points = special_points.get((enrollment_id, spec['actual_id']))
+                    if points is not None:
+                        student_grades[spec_key] = float(points)
+                else:
+                    # If no tasks, check for manual score
+                    val = score_map.get((enrollment_id, spec_key))
+                    if val is not None:
+                        student_grades[spec_key] = val
+
+    return grades
 
-class CriterionScoreViewSet(viewsets.ModelViewSet):
+
+class CriterionScoreViewSet(ScoreWriteMixin, RoleScopedViewSetMixin, viewsets.ModelViewSet):
     queryset = models.CriterionScore.objects.all()
     serializer_class = serializers.CriterionScoreSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    @action(detail=False, methods=['get'])
+    def get_queryset(self):
+        return self.get_scoped_queryset()
+
+    @action(detail=False, methods=['get'], renderer_classes=with_columnar())
     def gradesheet(self, request):
+        """
+        Criterion structure plus one row of grades per student.
+        ?format=columnar (or msgpack) lists the column ids once, student info as
+        parallel arrays and the grades as a dense matrix (null = no score).
+        cursor is where the gradesheet event stream / gradesheet_changes continue from.
+        """
         course_id = request.query_params.get('course_id')
         if not course_id:
             return Response({"error": "Course ID required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 1. Fetch Columns (SubCriteria) grouped by Parent
-        # We need the parent criterion info
-        sub_criteria = models.CourseSubCriterion.objects.filter(course_id=course_id).select_related('parent_criterion').annotate(
-            has_tasks=Exists(models.CourseTask.objects.filter(sub_criterion=OuterRef('pk'))),
-            has_projects=Exists(models.Project.objects.filter(sub_criterion=OuterRef('pk')))
-        ).order_by('parent_criterion__id', 'id')
-        
-        # Fetch special criteria as well
-        special_criteria = models.CourseSpecialCriterion.objects.filter(course_id=course_id).select_related('parent_criterion').annotate(
-            has_tasks=Exists(models.CourseTask.objects.filter(special_criterion=OuterRef('pk')))
-        ).order_by('parent_criterion__id', 'id')
-        
-        structure = []
-        current_parent_id = None
-        current_group = None
-
-        # Process regular sub_criteria
-        for sc in sub_criteria:
-            parent = sc.parent_criterion
-            if parent.id != current_parent_id:
-                if current_group:
-                    structure.append(current_group)
-                current_parent_id = parent.id
-                current_group = {
-                    "id": parent.id,
-                    "name": parent.name,
-                    "weight": parent.weight,
-                    "sub_criteria": [],
-                    "special_criteria": []
-                }
-            
-            current_group["sub_criteria"].append({
-                "id": sc.id,
-                "name": sc.name,
-                "percentage": sc.percentage,
-                "visible": sc.visible_on_gradesheet,
-                "editable": sc.editable_on_gradesheet,
-                "has_tasks": sc.has_tasks,
-                "has_projects": sc.has_projects,
-                "is_special": False
-            })
-        
-        if current_group:
-            structure.append(current_group)
-        
-        # Add special criteria to their respective groups
-        for spec in special_criteria:
-            if not spec.parent_criterion:
-                continue
-            parent_id = spec.parent_criterion.id
-            # Find the group in structure
-            group = next((g for g in structure if g['id'] == parent_id), None)
-            if not group:
-                # Create group if it doesn't exist yet
-                group = {
-                    "id": parent_id,
-                    "name": spec.parent_criterion.name,
-                    "weight": spec.parent_criterion.weight,
-                    "sub_criteria": [],
-                    "special_criteria": []
-                }
-                structure.append(group)
-            
-            group["special_criteria"].append({
-                "id": f"special-{spec.id}",
-                "actual_id": spec.id,
-                "name": spec.name,
-                "percentage": spec.percentage,
-                "visible": spec.visible_on_gradesheet,
-                "editable": spec.editable_on_gradesheet,
-                "has_tasks": spec.has_tasks,
-                "has_projects": False,
-                "is_special": True
-            })
+        # Read first: a stream resumed from this cursor replays anything saved while the sheet is built
+        cursor = events.latest_cursor()
+        structure = gradesheet_structure(course_id)
 
         # 2. Rows (Students)
-        enrollments = models.Enrollment.objects.filter(course_id=course_id).select_related('student').order_by('student__paternal_surname', 'student__maternal_surname', 'student__first_name')
-        
-        # 3. Scores Data
-        scores = models.CriterionScore.objects.filter(enrollment__course_id=course_id)
-        special_scores = models.SpecialCriterionScore.objects.filter(enrollment__course_id=course_id)
-        
-        score_map = {} # (enrollment_id, criterion_id_str) -> score
-        for s in scores:
-            score_map[(s.enrollment_id, str(s.sub_criterion_id))] = s.score
-        for s in special_scores:
-            score_map[(s.enrollment_id, f"special-{s.special_criterion_id}")] = s.score
+        enrollments = list(models.Enrollment.objects.filter(course_id=course_id).select_related('student').order_by('student__paternal_surname', 'student__maternal_surname', 'student__first_name'))
+
+        # 3. Scores Data: frozen at period close, computed live otherwise
+        grades = snapshots.frozen_grades(course_id)
+        if grades is None:
+            grades = gradesheet_grades(course_id, structure, [enr.id for enr in enrollments])
 
         rows = []
         for enr in enrollments:
-            student_grades = {}
-            # Flatten subcriteria IDs for easy lookup
-            for struct in structure:
-                for sub in struct['sub_criteria']:
-                    # Regular sub-criteria use ID as key
-                    val = score_map.get((enr.id, str(sub['id'])))
-                    if val is not None:
-                         student_grades[sub['id']] = val
-                
-                # Special criteria
-                for spec in struct['special_criteria']:
-                    spec_key = spec['id'] # "special-{id}"
-                    
-                    # If it has tasks, calculate from tasks
-                    if spec.get('has_tasks'):
-                        # Calculate weighted average of tasks for this special criterion
-                        tasks = models.CourseTask.objects.filter(special_criterion_id=spec['actual_id'])
-                        task_scores = models.TaskScore.objects.filter(
-                            enrollment_id=enr.id,
-                            task__special_criterion_id=spec['actual_id']
-                        )
-                        
-                        total_weight = 0
-                        weighted_sum = 0
-                        score_map_tasks = {ts.task_id: ts.score for ts in task_scores}
-                        
-                        for task in tasks:
-                            score_val = score_map_tasks.get(task.id, 0)
-                            weighted_sum += score_val * task.weight
-                            total_weight += task.weight
-                        
-                        if total_weight > 0:
-                            raw_avg = weighted_sum / total_weight
-                            # percentage is Decimal, raw_avg can be Decimal or float (if 0.0)
-                            # Safe to convert both to float for calculation/serialization
-                            final_score = float(raw_avg) * float(spec['percentage'])
-                            student_grades[spec_key] = final_score
-                    else:
-                        # If no tasks, check for manual score
-                        val = score_map.get((enr.id, spec_key))
-                        if val is not None:
-                            student_grades[spec_key] = val
-            
             rows.append({
                 "enrollment_id": enr.id,
                 "student_id": enr.student.id,
@@ -1105,18 +1388,70 @@ class CriterionScoreViewSet(viewsets.ModelViewSet):
                 "paterno": enr.student.paternal_surname,
                 "materno": enr.student.maternal_surname,
                 "nombre": enr.student.first_name,
-                "grades": student_grades
+                "grades": grades.get(enr.id, {})
             })
+
+        if wants_columnar(request):
+            return Response({**_columnar_gradesheet(structure, rows), "cursor": cursor})
             
         return Response({
             "structure": structure,
-            "rows": rows
+            "rows": rows,
+            "cursor": cursor
         })
 
+    @action(detail=False, methods=['get'])
+    def gradesheet_changes(self, request):
+        """
+        Polling counterpart of the gradesheet event stream (api.school.streams):
+        ?course_id=&since=<cursor> returns the rows changed since the cursor and the new cursor.
+        Without since it only returns the current cursor.
+        """
+        try:
+            course_id = int(request.query_params['course_id'])
+            since = request.query_params.get('since')
+            since = int(since) if since else None
+        except (KeyError, ValueError):
+            return Response({"error": "Course ID required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not models.Course.objects.visible_to(request.user).filter(id=course_id).exists():
+            return Response({"error": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
+        if since is None:
+            return Response({'course_id': course_id, 'cursor': events.latest_cursor(), 'rows': []})
+        return Response(events.changes_since(course_id, since))
+
+    @action(detail=False, methods=['get'])
+    def gradesheet_stream_ticket(self, request):
+        """
+        Short-lived ticket that opens the gradesheet event stream of ?course_id=
+        (api.school.streams), so the session token never goes in a URL.
+        """
+        try:
+            course_id = int(request.query_params['course_id'])
+        except (KeyError, ValueError):
+            return Response({"error": "Course ID required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not models.Course.objects.visible_to(request.user).filter(id=course_id).exists():
+            return Response({"error": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'ticket': streams.make_ticket(request.user, course_id), 'expires_in': streams.STREAM_TICKET_SECONDS})
+
     @action(detail=False, methods=['post'])
     def bulk_save(self, request):
         # Expects: { "updates": [ {"enrollment_id": 1, "criterion_id": 2, "score": 50}, ... ] }
         updates = request.data.get('updates', [])
+        if snapshots.touches_closed_period(u.get('enrollment_id') for u in updates):
+            return Response({"error": snapshots.CLOSED_PERIOD_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Previous values of every cell, for the change log
+        log = audit.ScoreChangeLog(request.user)
+        cells = {models.ScoreChange.CRITERION: [], models.ScoreChange.SPECIAL: []}
+        for u in updates:
+            criterion_id = str(u.get('criterion_id'))
+            if criterion_id.startswith('special-'):
+                cells[models.ScoreChange.SPECIAL].append((u.get('enrollment_id'), criterion_id.replace('special-', '')))
+            else:
+                cells[models.ScoreChange.CRITERION].append((u.get('enrollment_id'), criterion_id))
+        for kind, kind_cells in cells.items():
+            log.snapshot(kind, kind_cells)
+
         saved = 0
         for u in updates:
             try:
@@ -1137,6 +1472,7 @@ class CriterionScoreViewSet(viewsets.ModelViewSet):
                         special_criterion_id=actual_id,
                         defaults={'score': score_val}
                     )
+                    log.record(models.ScoreChange.SPECIAL, enrollment_id, actual_id, score_val)
                 else:
                     # Regular sub-criterion
                     models.CriterionScore.objects.update_or_create(
@@ -1144,24 +1480,74 @@ class CriterionScoreViewSet(viewsets.ModelViewSet):
                         sub_criterion_id=criteria_id_raw,
                         defaults={'score': score_val}
                     )
+                    log.record(models.ScoreChange.CRITERION, enrollment_id, criteria_id_raw, score_val)
                 saved += 1
             except Exception as e:
                 print(f"Error in bulk_save loop item {u}: {e}")
                 # Continue saving others? Or return error?
                 # Reporting error for this item makes debugging easier
+                log.save()  # the items before this one are saved
                 return Response({"error": f"Error saving item: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        log.save()
         
-        # Recalculate final grades for affect enrollments
+        # Recalculate final grades for affect enrollments (this also notifies the gradesheet streams)
         affected_enrollment_ids = set(u.get('enrollment_id') for u in updates)
-        for enr_id in affected_enrollment_ids:
-            try:
-                update_final_grade(enr_id)
-            except Exception as e:
-                print(f"Error calling update_final_grade for {enr_id}: {e}")
-                # We don't want to fail the save if recalc fails, but we should log it.
+        try:
+            update_final_grades(affected_enrollment_ids)
+        except Exception as e:
+            print(f"Error calling update_final_grades for {affected_enrollment_ids}: {e}")
+            # We don't want to fail the save if recalc fails, but we should log it.
 
         return Response({"saved": saved})
 
+class ScoreChangeViewSet(RoleScopedViewSetMixin, viewsets.GenericViewSet):
+    queryset = models.ScoreChange.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        """
+        Score history, newest first: ?enrollment_id= for one enrollment, plus
+        ?kind=&column_id= for one cell. ?limit= caps the rows (default 200).
+        """
+        params = request.query_params
+        enrollment_id = params.get('enrollment_id')
+        if not enrollment_id:
+            return Response({'error': 'enrollment_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(params.get('limit', 200)), 1000)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_scoped_queryset()
+        if params.get('kind') and params.get('column_id'):
+            queryset = queryset.for_cell(params['kind'], enrollment_id, params['column_id'])
+        else:
+            queryset = queryset.for_enrollment(enrollment_id)
+        return Response(list(queryset.history()[:limit]))
+
+
+GRADESHEET_STUDENT_FIELDS = ("enrollment_id", "student_id", "ci", "paterno", "materno", "nombre")
+
+def _columnar_gradesheet(structure, rows):
+    """
+    Turns gradesheet rows into the columnar wire format:
+    column ids once, student info as parallel arrays, grades as a dense matrix.
+    """
+    columns = []
+    for group in structure:
+        columns.extend(sub['id'] for sub in group['sub_criteria'])
+        columns.extend(spec['id'] for spec in group['special_criteria'])
+
+    students = {field: [row[field] for row in rows] for field in GRADESHEET_STUDENT_FIELDS}
+    grades = [[row['grades'].get(col) for col in columns] for row in rows]
+
+    return {
+        "structure": structure,
+        "columns": columns,
+        "students": students,
+        "grades": grades
+    }
+
 def update_final_grade(enrollment_id):
     """
     Calculates and updates the final_grade for an enrollment based on Direct Points.
@@ -1171,55 +1557,43 @@ def update_final_grade(enrollment_id):
       CappedTotal = Min(Total, Criterion.Weight)
     FinalGrade = Sum(CappedTotal for all Criteria)
     """
-    from django.db.models import Sum
     try:
-        enrollment = models.Enrollment.objects.get(pk=enrollment_id)
-        course = enrollment.course
-        
-        final_grade = 0.0
-        
-        # Iterate over all parent criteria
-        # We need to fetch them from the evaluation template if possible, or just used ones?
-        # Better: get all criteria associated with the course via Subject -> EvaluationTemplate
-        if course.subject and course.subject.evaluation_template:
-            criteria = course.subject.evaluation_template.criteria.all()
-            
-            for criterion in criteria:
-                # 1. Sum Regular SubCriteria Scores for this parent
-                # Filter scores where sub_criterion__parent_criterion == criterion
-                regular_sum = models.CriterionScore.objects.filter(
-                    enrollment=enrollment,
-                    sub_criterion__parent_criterion=criterion
-                ).aggregate(t=Sum('score'))['t'] or 0
-                
-                # 2. Sum Special Criteria Scores for this parent
-                special_sum = models.SpecialCriterionScore.objects.filter(
-                    enrollment=enrollment,
-                    special_criterion__parent_criterion=criterion
-                ).aggregate(t=Sum('score'))['t'] or 0
-                
-                total_criterion_score = float(regular_sum) + float(special_sum)
-                
-                # 3. Cap at Criterion Weight
-                max_weight = float(criterion.weight)
-                capped_score = min(total_criterion_score, max_weight)
-                
-                final_grade += capped_score
-                
-        else:
-            # Fallback for legacy courses or weird Data?
-            # Just sum everything as before, but we can't cap without parent info easily.
-            print(f"Warning: Course {course.id} has no evaluation template. Summing all scores directly.")
-            total_regular = models.CriterionScore.objects.filter(enrollment=enrollment).aggregate(t=Sum('score'))['t'] or 0
-            total_special = models.SpecialCriterionScore.objects.filter(enrollment=enrollment).aggregate(t=Sum('score'))['t'] or 0
-            final_grade = float(total_regular) + float(total_special)
-
-        enrollment.final_grade = final_grade
-        enrollment.save()
-        
+        update_final_grades([enrollment_id])
     except Exception as e:
         print(f"Error updating final grade for {enrollment_id}: {e}")
 
+def update_final_grades(enrollment_ids):
+    """
+    Batched update_final_grade: the grades come from grading.stored_final_grades
+    (two grouped sums, exact cents, same rules as recompute_grades) and are
+    written with one bulk_update. Every path that changes scores ends here, so
+    this is also where the gradesheet streams are notified, once the
+    surrounding transaction (if any) commits.
+    """
+    grades = grading.stored_final_grades(enrollment_ids)
+    enrollments = [models.Enrollment(id=enrollment_id, final_grade=grade) for enrollment_id, grade in grades.items()]
+    models.Enrollment.objects.bulk_update(enrollments, ['final_grade'], batch_size=500)
+    if grades:
+        transaction.on_commit(lambda: events.publish_enrollment_changes(grades))
+    return len(enrollments)
+
+def upsert_criterion_scores(sub_criterion_id, scores):
+    """
+    Writes {enrollment_id: score} for one sub-criterion: one read, one bulk_update
+    for existing rows and one bulk_create for the rest.
+    """
+    existing = list(models.CriterionScore.objects.filter(
+        sub_criterion_id=sub_criterion_id, enrollment_id__in=list(scores)
+    ))
+    for row in existing:
+        row.score = scores[row.enrollment_id]
+    found = {row.enrollment_id for row in existing}
+    models.CriterionScore.objects.bulk_update(existing, ['score'], batch_size=500)
+    models.CriterionScore.objects.bulk_create([
+        models.CriterionScore(enrollment_id=enrollment_id, sub_criterion_id=sub_criterion_id, score=score)
+        for enrollment_id, score in scores.items() if enrollment_id not in found
+    ], batch_size=500)
+
 class CourseTaskViewSet(viewsets.ModelViewSet):
     queryset = models.CourseTask.objects.all()
     serializer_class = serializers.CourseTaskSerializer
@@ -1232,7 +1606,13 @@ class CourseTaskViewSet(viewsets.ModelViewSet):
             qs = qs.filter(sub_criterion_id=sub_criteria_id)
         return qs
 
+    def _ensure_open(self, sub_criterion, special_criterion):
+        criterion = sub_criterion or special_criterion
+        ensure_open_period(course_ids=[criterion.course_id if criterion else None])
+
     def perform_create(self, serializer):
+        data = serializer.validated_data
+        self._ensure_open(data.get('sub_criterion'), data.get('special_criterion'))
         task = serializer.save()
         # Lock the parent criterion if it's a regular sub-criterion
         if task.sub_criterion:
@@ -1243,11 +1623,15 @@ class CourseTaskViewSet(viewsets.ModelViewSet):
         # Note: Special criteria don't need locking or recalculation in the same way
 
     def perform_update(self, serializer):
+        data = serializer.validated_data
+        self._ensure_open(serializer.instance.sub_criterion, serializer.instance.special_criterion)
+        self._ensure_open(data.get('sub_criterion'), data.get('special_criterion'))
         task = serializer.save()
         if task.sub_criterion:
             recalculate_sub_criterion_scores(task.sub_criterion.id)
 
     def perform_destroy(self, instance):
+        self._ensure_open(instance.sub_criterion, instance.special_criterion)
         if instance.sub_criterion:
             sub_id = instance.sub_criterion.id
             instance.delete()
@@ -1255,13 +1639,13 @@ class CourseTaskViewSet(viewsets.ModelViewSet):
         else:
             instance.delete()
 
-class TaskScoreViewSet(viewsets.ModelViewSet):
+class TaskScoreViewSet(ScoreWriteMixin, RoleScopedViewSetMixin, viewsets.ModelViewSet):
     queryset = models.TaskScore.objects.all()
     serializer_class = serializers.TaskScoreSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        queryset = models.TaskScore.objects.all()
+        queryset = self.get_scoped_queryset()
         enrollment_id = self.request.query_params.get('enrollment_id', None)
         task_id = self.request.query_params.get('task_id', None)
         if enrollment_id is not None:
@@ -1274,10 +1658,13 @@ class TaskScoreViewSet(viewsets.ModelViewSet):
     def bulk_save(self, request):
         try:
             scores = request.data.get('updates', request.data.get('scores', []))
+            if snapshots.touches_closed_period(s.get('enrollment_id') for s in scores):
+                return Response({"error": snapshots.CLOSED_PERIOD_ERROR}, status=status.HTTP_400_BAD_REQUEST)
             saved_scores = []
             
             affected_enrollments = set()
-            affected_subcriteria = set()
+            log = audit.ScoreChangeLog(request.user)
+            log.snapshot(models.ScoreChange.TASK, [(s.get('enrollment_id'), s.get('task_id')) for s in scores])
 
             for score_data in scores:
                 enrollment_id = score_data.get('enrollment_id')
@@ -1290,59 +1677,30 @@ class TaskScoreViewSet(viewsets.ModelViewSet):
                     defaults={'score': score_value}
                 )
                 saved_scores.append(score_obj)
-                
                 affected_enrollments.add(enrollment_id)
-                try:
-                    task = models.CourseTask.objects.get(id=task_id)
-                    if task.sub_criterion:
-                        affected_subcriteria.add(('sub', task.sub_criterion.id))
-                    elif task.special_criterion:
-                        affected_subcriteria.add(('special', task.special_criterion.id))
-                except models.CourseTask.DoesNotExist:
-                    pass
+                log.record(models.ScoreChange.TASK, enrollment_id, task_id, score_value)
+            log.save()
 
-            for enroll_id in affected_enrollments:
-                for crit_type, crit_id in affected_subcriteria:
-                    if crit_type == 'sub':
-                        tasks = models.CourseTask.objects.filter(sub_criterion_id=crit_id)
-                        scores = models.TaskScore.objects.filter(enrollment_id=enroll_id, task__sub_criterion_id=crit_id)
-                        
-                        total_weight = 0
-                        weighted_sum = 0
-                        score_map = {s.task_id: s.score for s in scores}
-                        
-                        for task in tasks:
-                            s_val = score_map.get(task.id, 0)
-                            weighted_sum += s_val * task.weight
-                            total_weight += task.weight
-                        
-                        if total_weight > 0:
-                            raw_avg = weighted_sum / total_weight
-                            sub_crit = models.CourseSubCriterion.objects.get(id=crit_id)
-                            final_score = float(raw_avg) * float(sub_crit.percentage)
-                            
-                            # Update CriterionScore
-                            models.CriterionScore.objects.update_or_create(
-                                enrollment_id=enroll_id,
-                                sub_criterion_id=crit_id,
-                                defaults={'score': final_score}
-                            )
-                    elif crit_type == 'special':
-                        pass
-
-                # Update Final Grade
-                try:
-                    update_final_grade(enroll_id)
-                except Exception as e:
-                    print(f"Error updating final grade for {enroll_id}: {e}")
+            # Special criteria are averaged on read (gradesheet), only sub-criteria are stored
+            affected_subcriteria = set(models.CourseTask.objects.filter(
+                id__in={s.task_id for s in saved_scores}, sub_criterion__isnull=False
+            ).values_list('sub_criterion_id', flat=True))
+
+            # One grouped query for every (student, sub-criterion) average, one batched final grade pass
+            recalculate_sub_criterion_scores(affected_subcriteria, affected_enrollments, update_grades=False)
+            update_final_grades(affected_enrollments)
 
             return Response({'status': 'success', 'saved': len(saved_scores)})
         except Exception as e:
-            import traceback
             traceback.print_exc()
             return Response({'error': str(e), 'traceback': traceback.format_exc()}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], renderer_classes=with_columnar())
     def task_sheet(self, request):
+        """
+        Task scores for every student of a course under one (sub or special) criterion.
+        Scores come from a single TaskScore query pivoted in memory.
+        ?format=columnar returns the task ids once plus a dense score matrix (null = no score).
+        """
         try:
             course_id = request.query_params.get('course_id')
             sub_criterion_id = request.query_params.get('sub_criterion_id')
@@ -1357,40 +1715,80 @@ class TaskScoreViewSet(viewsets.ModelViewSet):
                 tasks = models.CourseTask.objects.filter(special_criterion_id=actual_id).order_by('id')
             else:
                 tasks = models.CourseTask.objects.filter(sub_criterion_id=sub_criterion_id).order_by('id')
+            tasks = list(tasks)
+            task_ids = [t.id for t in tasks]
             
             enrollments = models.Enrollment.objects.filter(course_id=course_id).select_related('student').order_by('student__paternal_surname', 'student__maternal_surname', 'student__first_name')
             
+            # One query for the whole sheet: enrollment_id -> {task_id: score}
+            score_maps = {}
+            task_scores = models.TaskScore.objects.filter(
+                enrollment__course_id=course_id,
+                task_id__in=task_ids
+            ).values_list('enrollment_id', 'task_id', 'score')
+            for enrollment_id, task_id, score in task_scores:
+                score_maps.setdefault(enrollment_id, {})[task_id] = score
+
+            tasks_data = serializers.CourseTaskSerializer(tasks, many=True).data
+
+            if wants_columnar(request):
+                students = {'enrollment_id': [], 'nombre': [], 'paterno': [], 'materno': [], 'ci': []}
+                matrix = []
+                for enrollment in enrollments:
+                    student = enrollment.student
+                    students['enrollment_id'].append(enrollment.id)
+                    students['nombre'].append(student.first_name)
+                    students['paterno'].append(student.paternal_surname)
+                    students['materno'].append(student.maternal_surname)
+                    students['ci'].append(student.ci_number)
+                    score_map = score_maps.get(enrollment.id, {})
+                    matrix.append([score_map.get(task_id) for task_id in task_ids])
+
+                return Response({
+                    'tasks': tasks_data,
+                    'columns': task_ids,
+                    'students': students,
+                    'scores': matrix
+                })
+
             rows = []
             for enrollment in enrollments:
                 student = enrollment.student
-                scores = models.TaskScore.objects.filter(enrollment=enrollment, task__in=tasks)
-                score_map = {score.task_id: score.score for score in scores}
-                
                 rows.append({
                     'enrollment_id': enrollment.id,
                     'nombre': student.first_name,
                     'paterno': student.paternal_surname,
                     'materno': student.maternal_surname,
                     'ci': student.ci_number,
-                    'scores': score_map
+                    'scores': score_maps.get(enrollment.id, {})
                 })
                 
             return Response({
-                'tasks': serializers.CourseTaskSerializer(tasks, many=True).data,
+                'tasks': tasks_data,
                 'rows': rows
             })
         except Exception as e:
-            import traceback
             traceback.print_exc()
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(RoleScopedViewSetMixin, viewsets.ModelViewSet):
     queryset = models.Project.objects.all()
     serializer_class = serializers.ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # member_details / leader_details are full EnrollmentSerializer payloads
+    prefetch_profiles = {
+        'default': {
+            'select': tuple(f'student_in_charge__{path}' for path in ENROLLMENT_SELECT),
+            'prefetch': (
+                Prefetch('members', queryset=models.Enrollment.objects.select_related(*ENROLLMENT_SELECT)),
+                *(f'members__{path}' for path in ENROLLMENT_PREFETCH),
+                *(f'student_in_charge__{path}' for path in ENROLLMENT_PREFETCH),
+            ),
+        },
+    }
 
     def get_queryset(self):
-        queryset = models.Project.objects.all()
+        queryset = self.get_scoped_queryset()
         course = self.request.query_params.get('course', None)
         sub_criterion = self.request.query_params.get('sub_criterion', None)
         if course:
@@ -1400,32 +1798,134 @@ class ProjectViewSet(viewsets.ModelViewSet):
         return queryset.order_by('-id')
 
     def perform_create(self, serializer):
+        ensure_open_period(course_ids=[getattr(serializer.validated_data.get('course'), 'pk', None)])
         project = serializer.save()
         self.sync_project_grades(project)
 
     def perform_update(self, serializer):
+        course = serializer.validated_data.get('course')
+        ensure_open_period(course_ids=[serializer.instance.course_id, getattr(course, 'pk', None)])
         project = serializer.save()
         self.sync_project_grades(project)
 
     def sync_project_grades(self, project):
-        # Sync project score to members' CriterionScore
+        # Sync project score (a Direct Score) to members' CriterionScore
         if project.score is not None:
-            sub_criterion = project.sub_criterion
-            for member in project.members.all():
-                # Store the Direct Score
-                final_val = project.score 
-                
-                models.CriterionScore.objects.update_or_create(
-                    enrollment=member,
-                    sub_criterion=sub_criterion,
-                    defaults={'score': final_val}
-                )
-                
-                # Recalculate Final Grade
-                try:
-                    update_final_grade(member.id)
-                except Exception as e:
-                    print(f"Error updating final grade for {member.id} in project sync: {e}")
+            member_ids = list(project.members.values_list('id', flat=True))
+            with transaction.atomic():
+                upsert_criterion_scores(project.sub_criterion_id, {m: project.score for m in member_ids})
+            try:
+                update_final_grades(member_ids)
+            except Exception as e:
+                print(f"Error updating final grades in project sync for project {project.id}: {e}")
+
+    @action(detail=False, methods=['post'])
+    def grade_sub_criterion(self, request):
+        """
+        Grade every project of a sub-criterion at once.
+        Expects: { "sub_criterion_id": 5, "scores": { "<project_id>": 18.5, ... } }
+        Member CriterionScores are upserted in one pass and final grades recomputed once.
+        """
+        from decimal import InvalidOperation
+
+        sub_criterion_id = request.data.get('sub_criterion_id')
+        raw_scores = request.data.get('scores')
+        if not sub_criterion_id or not isinstance(raw_scores, dict):
+            return Response({'error': 'sub_criterion_id and scores are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            scores = {int(pid): Decimal(str(score)) for pid, score in raw_scores.items()}
+        except (TypeError, ValueError, InvalidOperation):
+            return Response({'error': 'scores must map project ids to numbers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        projects = list(models.Project.objects.visible_to(request.user).filter(
+            sub_criterion_id=sub_criterion_id, id__in=list(scores)
+        ).select_related('course__period'))
+        if any(project.course.period.closed_at for project in projects):
+            return Response({'error': snapshots.CLOSED_PERIOD_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+        for project in projects:
+            project.score = scores[project.id]
+        project_ids = [project.id for project in projects]
+
+        member_scores = {}
+        for project_id, enrollment_id in models.ProjectMembership.objects.filter(
+            project_id__in=project_ids
+        ).values_list('project_id', 'enrollment_id'):
+            member_scores[enrollment_id] = scores[project_id]
+
+        log = audit.ScoreChangeLog(request.user)
+        log.snapshot(models.ScoreChange.CRITERION, [(e, sub_criterion_id) for e in member_scores])
+        for enrollment_id, score in member_scores.items():
+            log.record(models.ScoreChange.CRITERION, enrollment_id, sub_criterion_id, score)
+
+        with transaction.atomic():
+            models.Project.objects.bulk_update(projects, ['score'])
+            upsert_criterion_scores(sub_criterion_id, member_scores)
+            log.save()
+        update_final_grades(list(member_scores))
+
+        return Response({
+            'updated': project_ids,
+            'missing': sorted(set(scores) - set(project_ids)),
+            'graded_members': len(member_scores),
+        })
+
+def available_projects_cache_key(course_id=None):
+    return f"available-projects:{course_id or 'all'}"
+
+
+def invalidate_available_projects(course_id):
+    cache.delete_many([available_projects_cache_key(course_id), available_projects_cache_key()])
+
+
+def build_available_projects(course_id=None):
+    """Sub-criteria open for project registration, as plain dicts (cacheable)."""
+    queryset = models.CourseSubCriterion.objects.filter(
+        is_project_registration_open=True
+    ).select_related('course__subject', 'course__period')
+    if course_id:
+        queryset = queryset.filter(course_id=course_id)
+
+    rows = []
+    for sc in queryset:
+        course = sc.course
+        subject = course.subject
+        rows.append({
+            'id': sc.id,
+            'name': sc.name,
+            'course_name': str(course),
+            'course_details': {
+                'id': course.id,
+                'parallel': course.parallel,
+                'subject_details': {'id': subject.id, 'name': subject.name, 'code': subject.code} if subject else None,
+            },
+            'max_members': sc.max_members,
+            'description': f"Project for {sc.name}",
+            'registration_start': sc.registration_start,
+            'registration_end': sc.registration_end,
+        })
+    return rows
+
+
+def available_projects_data(course_id=None):
+    """available_projects payload (shared by the DRF action and api.async_views)."""
+    if course_id and not course_id.isdigit():
+        return []
+    key = available_projects_cache_key(course_id)
+    rows = cache.get(key)
+    if rows is None:
+        rows = build_available_projects(course_id)
+        cache.set(key, rows, settings.AVAILABLE_PROJECTS_CACHE_SECONDS)
+
+    # The open/closed flag depends on the clock, so it is never cached
+    now = timezone.now()
+    data = []
+    for row in rows:
+        start, end = row['registration_start'], row['registration_end']
+        is_active_time = not (start and now < start) and not (end and now > end)
+        data.append({**row, 'is_active_time': is_active_time})
+    return data
+
 
 class StudentProjectRegistrationViewSet(viewsets.ViewSet):
     """
@@ -1440,74 +1940,7 @@ class StudentProjectRegistrationViewSet(viewsets.ViewSet):
         List sub-criteria that are open for project registration.
         Optional filter: ?course_id=123
         """
-        course_id = request.query_params.get('course_id')
-        queryset = models.CourseSubCriterion.objects.filter(is_project_registration_open=True)
-        
-        if course_id:
-            queryset = queryset.filter(course_id=course_id)
-            
-        # Add current status regarding dates
-        now = timezone.now()
-        print(f"DEBUG: Current Server Time (now): {now}")
-        data = []
-        for sc in queryset:
-            # Check if active based on dates
-            is_active_time = True
-            print(f"DEBUG: Checking Criterion {sc.name} (ID: {sc.id})")
-            print(f"DEBUG: Start: {sc.registration_start}, End: {sc.registration_end}")
-            
-            if sc.registration_start and now < sc.registration_start:
-                print(f"DEBUG: INACTIVE - now < start")
-                is_active_time = False
-            if sc.registration_end and now > sc.registration_end:
-                print(f"DEBUG: INACTIVE - now > end")
-                is_active_time = False
-            
-            print(f"DEBUG: Result is_active_time: {is_active_time}")
-
-            # Serialize course details with nested subject
-            course_data = None
-            if sc.course:
-                print(f"DEBUG: Course found: {sc.course}")
-                print(f"DEBUG: Course ID: {sc.course.id}, Parallel: {sc.course.parallel}")
-                
-                subject_data = None
-                if sc.course.subject:
-                    print(f"DEBUG: Subject found: {sc.course.subject}")
-                    print(f"DEBUG: Subject ID: {sc.course.subject.id}")
-                    print(f"DEBUG: Subject name: {sc.course.subject.name}")
-                    print(f"DEBUG: Subject code: {sc.course.subject.code}")
-                    
-                    subject_data = {
-                        'id': sc.course.subject.id,
-                        'name': sc.course.subject.name,
-                        'code': sc.course.subject.code
-                    }
-                else:
-                    print(f"DEBUG: No subject found for course {sc.course.id}")
-                
-                course_data = {
-                    'id': sc.course.id,
-                    'parallel': sc.course.parallel,
-                    'subject_details': subject_data
-                }
-            else:
-                print(f"DEBUG: No course found for sub-criterion {sc.id}")
-
-            data.append({
-                'id': sc.id,
-                'name': sc.name,
-                'course_name': str(sc.course),
-                'course_details': course_data,
-                'max_members': sc.max_members,
-                'description': f"Project for {sc.name}",
-                'registration_start': sc.registration_start,
-                'registration_end': sc.registration_end,
-                'is_active_time': is_active_time
-            })
-            
-            print(f"DEBUG: Added project data with course_details: {data[-1]}")
-        return Response(data)
+        return Response(available_projects_data(request.query_params.get('course_id')))
 
     @action(detail=False, methods=['get'])
     def validate_student(self, request):
@@ -1555,115 +1988,150 @@ class StudentProjectRegistrationViewSet(viewsets.ViewSet):
                 return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
 
             try:
-                sub_crit = models.CourseSubCriterion.objects.get(pk=sub_criterion_id)
-            except models.CourseSubCriterion.DoesNotExist:
-                return Response({'error': 'Invalid SubCriterion'}, status=status.HTTP_404_NOT_FOUND)
-
-            if not sub_crit.is_project_registration_open:
-                return Response({'error': 'Registration is closed for this project'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Date Validation
-            now = timezone.now()
-            if sub_crit.registration_start and now < sub_crit.registration_start:
-                 return Response({'error': 'Registration has not started yet'}, status=status.HTTP_400_BAD_REQUEST)
-            if sub_crit.registration_end and now > sub_crit.registration_end:
-                 return Response({'error': 'Registration deadline has passed'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # 1. Validate Leader
-            try:
-                leader_user = User.objects.get(ci_number=leader_ci)
-                leader_enrollment = models.Enrollment.objects.get(student=leader_user, course=sub_crit.course)
-            except User.DoesNotExist:
-                 return Response({'error': f'Leader CI {leader_ci} not found'}, status=status.HTTP_400_BAD_REQUEST)
-            except models.Enrollment.DoesNotExist:
-                 return Response({'error': f'Leader CI {leader_ci} is not enrolled in this course'}, status=status.HTTP_400_BAD_REQUEST)
+                with transaction.atomic():
+                    result = self._register_group(sub_criterion_id, str(leader_ci), members_ci, name, description)
+            except IntegrityError:
+                # Lost a race: a member joined another group between our check and insert
+                return Response({'error': 'One of the students is already in a project'}, status=status.HTTP_400_BAD_REQUEST)
+            if isinstance(result, Response):
+                return result
+            project = result
 
-            # 2. Validate Members
-            member_enrollments = []
-            unique_cis = set(members_ci)
-            
-            # Total members = Leader + Members (excluding leader if in list)
-            if leader_ci in unique_cis:
-                unique_cis.remove(leader_ci) # Ensure leader is distinct
-
-            total_count = 1 + len(unique_cis)
+            return Response({'message': 'Project registered successfully', 'project_id': project.id}, status=status.HTTP_201_CREATED)
 
-            if sub_crit.max_members and total_count > sub_crit.max_members:
-                 return Response({'error': f'Group size ({total_count}) exceeds limit of {sub_crit.max_members}'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            traceback.print_exc()
+            return Response({'error': f'Internal Server Error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            # Check Leader Exclusivity
-            if models.Project.objects.filter(sub_criterion=sub_crit, members=leader_enrollment).exists():
-                 return Response({'error': f'Leader {leader_ci} is already in a project'}, status=status.HTTP_400_BAD_REQUEST)
+    def _register_group(self, sub_criterion_id, leader_ci, members_ci, name, description):
+        """
+        Validates and creates one project group; runs inside the caller's transaction.
+        All CIs are resolved with one query and membership is checked with one more.
+        The (sub_criterion, enrollment) constraint on ProjectMembership is the final
+        guard against concurrent registrations. Returns the Project or an error Response.
+        """
+        def bad_request(message):
+            return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
 
-            for ci in unique_cis:
-                try:
-                    u = User.objects.get(ci_number=ci)
-                    enr = models.Enrollment.objects.get(student=u, course=sub_crit.course)
-                    
-                    # Exclusivity Check
-                    if models.Project.objects.filter(sub_criterion=sub_crit, members=enr).exists():
-                         return Response({'error': f'Student {ci} is already in a project'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Row lock: registrations for the same sub-criterion queue up instead of racing
+            sub_crit = models.CourseSubCriterion.objects.select_for_update().get(pk=sub_criterion_id)
+        except (models.CourseSubCriterion.DoesNotExist, ValueError):
+            return Response({'error': 'Invalid SubCriterion'}, status=status.HTTP_404_NOT_FOUND)
 
-                    member_enrollments.append(enr)
-                except User.DoesNotExist:
-                    return Response({'error': f'Student CI {ci} not found'}, status=status.HTTP_400_BAD_REQUEST)
-                except models.Enrollment.DoesNotExist:
-                    return Response({'error': f'Student CI {ci} not enrolled'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # 3. Create Project
-            project = models.Project.objects.create(
-                course=sub_crit.course,
-                sub_criterion=sub_crit,
-                name=name,
-                description=description,
-                student_in_charge=leader_enrollment
-            )
-            
-            # Add members (Leader + Others)
-            all_members = [leader_enrollment] + member_enrollments
-            project.members.set(all_members)
-            project.save()
+        if not sub_crit.is_project_registration_open:
+            return bad_request('Registration is closed for this project')
 
-            return Response({'message': 'Project registered successfully', 'project_id': project.id}, status=status.HTTP_201_CREATED)
+        # Date Validation
+        now = timezone.now()
+        if sub_crit.registration_start and now < sub_crit.registration_start:
+            return bad_request('Registration has not started yet')
+        if sub_crit.registration_end and now > sub_crit.registration_end:
+            return bad_request('Registration deadline has passed')
+
+        # Total members = Leader + Members (excluding leader if in list)
+        member_cis = list(dict.fromkeys(str(ci) for ci in members_ci if str(ci) != leader_ci))
+        total_count = 1 + len(member_cis)
+        if sub_crit.max_members and total_count > sub_crit.max_members:
+            return bad_request(f'Group size ({total_count}) exceeds limit of {sub_crit.max_members}')
+
+        all_cis = [leader_ci] + member_cis
+        enrollment_by_ci = dict(
+            models.Enrollment.objects.filter(course_id=sub_crit.course_id, student__ci_number__in=all_cis)
+            .values_list('student__ci_number', 'id')
+        )
+        missing = [ci for ci in all_cis if ci not in enrollment_by_ci]
+        if missing:
+            known = set(User.objects.filter(ci_number__in=missing).values_list('ci_number', flat=True))
+            ci = missing[0]
+            if ci == leader_ci:
+                if ci in known:
+                    return bad_request(f'Leader CI {ci} is not enrolled in this course')
+                return bad_request(f'Leader CI {ci} not found')
+            if ci in known:
+                return bad_request(f'Student CI {ci} not enrolled')
+            return bad_request(f'Student CI {ci} not found')
+
+        enrollment_ids = [enrollment_by_ci[ci] for ci in all_cis]
+        taken = set(
+            models.ProjectMembership.objects.filter(project__sub_criterion=sub_crit, enrollment_id__in=enrollment_ids)
+            .values_list('enrollment_id', flat=True)
+        )
+        for ci in all_cis:
+            if enrollment_by_ci[ci] in taken:
+                if ci == leader_ci:
+                    return bad_request(f'Leader {ci} is already in a project')
+                return bad_request(f'Student {ci} is already in a project')
+
+        project = models.Project.objects.create(
+            course_id=sub_crit.course_id,
+            sub_criterion=sub_crit,
+            name=name,
+            description=description,
+            student_in_charge_id=enrollment_by_ci[leader_ci]
+        )
+        # Leader first, then the others
+        models.ProjectMembership.objects.bulk_create([
+            models.ProjectMembership(project=project, enrollment_id=enrollment_id, sub_criterion=sub_crit)
+            for enrollment_id in enrollment_ids
+        ])
+        return project
+
+REGISTRATION_DUPLICATE_MESSAGES = {
+    'PENDING': 'Ya tienes una solicitud pendiente para este curso.',
+    'APPROVED': 'Tu solicitud para este curso ya fue aprobada.',
+    'REJECTED': 'Tu solicitud para este curso fue rechazada.',
+}
+
+def open_courses_data():
+    """open_courses payload (shared by the DRF action and api.async_views)."""
+    courses = models.Course.objects.filter(is_visible=True, active=True).select_related(
+        *COURSE_SELECT
+    ).prefetch_related(*COURSE_PREFETCH)
+    # Serialize all visible courses. The frontend uses course.is_registration_open
+    # to decide whether to show the "Inscribirse Ahora" button.
+    return serializers.CourseSerializer(courses, many=True).data
 
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return Response({'error': f'Internal Server Error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class StudentCourseRegistrationViewSet(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
 
     @action(detail=False, methods=['get'])
     def open_courses(self, request):
-        now = timezone.now()
-        courses = models.Course.objects.filter(is_visible=True, active=True)
-        # Serialize all visible courses. The frontend uses course.is_registration_open
-        # to decide whether to show the "Inscribirse Ahora" button.
-        serializer = serializers.CourseSerializer(courses, many=True)
-        return Response(serializer.data)
+        return Response(open_courses_data())
 
     @action(detail=False, methods=['post'])
     def submit_request(self, request):
-        serializer = serializers.RegistrationRequestSerializer(data=request.data)
+        too_many = Response(
+            {'error': 'Demasiadas solicitudes. Intenta de nuevo en un momento.'},
+            status=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        window = settings.REGISTRATION_RATE_WINDOW_SECONDS
+        if not ratelimit.hit(f"register-ip:{ratelimit.client_ip(request)}", settings.REGISTRATION_RATE_PER_IP, window):
+            return too_many
+
+        serializer = serializers.RegistrationSubmissionSerializer(data=request.data)
         if serializer.is_valid():
             # Additional Validation
             ci = serializer.validated_data.get('ci')
             course = serializer.validated_data.get('course')
-            email = serializer.validated_data.get('email')
 
-            # Check if already enrolled
-            if models.Enrollment.objects.filter(student__ci_number=ci, course=course).exists():
+            if not ratelimit.hit(f"register-ci:{ci}", settings.REGISTRATION_RATE_PER_CI, window):
+                return too_many
+
+            # Check if already enrolled (User.ci_number is indexed)
+            students = User.objects.filter(ci_number=ci).values('id')
+            if models.Enrollment.objects.filter(course=course, student_id__in=students).exists():
                 return Response({'error': 'Ya estás inscrito en este curso.'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Check if pending request exists
-            if models.RegistrationRequest.objects.filter(ci=ci, course=course, status='PENDING').exists():
-                 return Response({'error': 'Ya tienes una solicitud pendiente para este curso.'}, status=status.HTTP_400_BAD_REQUEST)
 
-             # Check email unique globally? Or just ensure no conflict if creating new user?
-             # For now, simplistic check.
-            
-            serializer.save()
+            # Insert first; the (course, ci) unique constraint reports duplicates, even racing ones
+            try:
+                with transaction.atomic():
+                    serializer.save()
+            except IntegrityError:
+                existing = models.RegistrationRequest.objects.filter(course=course, ci=ci).values_list('status', flat=True).first()
+                return Response({'error': REGISTRATION_DUPLICATE_MESSAGES.get(existing, REGISTRATION_DUPLICATE_MESSAGES['PENDING'])},
+                                status=status.HTTP_400_BAD_REQUEST)
             return Response({'message': 'Solicitud enviada correctamente', 'id': serializer.instance.id}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -1743,3 +2211,144 @@ class RegistrationRequestViewSet(viewsets.ModelViewSet):
         reg_req.status = 'REJECTED'
         reg_req.save()
         return Response({'message': 'Solicitud rechazada'})
+
+    def _bulk_targets(self, request):
+        """
+        (queryset, ids) for the requests picked by {"ids": [...]} or by {"course_id": X}
+        (all its PENDING ones; ids is then empty), None when the body has neither.
+        Malformed ids or course_id are rejected with a 400.
+        """
+        serializer = serializers.BulkRegistrationTargetsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get('ids')
+        course_id = serializer.validated_data.get('course_id')
+        if ids is None and course_id is None:
+            return None
+        queryset = models.RegistrationRequest.objects.all()
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        else:
+            queryset = queryset.filter(course_id=course_id, status='PENDING')
+        return queryset.order_by('id'), ids or []
+
+    @action(detail=False, methods=['post'])
+    def bulk_approve(self, request):
+        """
+        Approve many requests at once.
+        Expects: { "ids": [1, 2, ...] } or { "course_id": 3 } (every PENDING request of the course).
+        Existing users are matched by CI (or CI used as email) in one query; new users
+        and enrollments are bulk-created in one transaction. Returns one outcome per request.
+        """
+        from api.authentication.hashing import make_passwords
+
+        targets = self._bulk_targets(request)
+        if targets is None:
+            return Response({'error': 'ids o course_id requerido'}, status=status.HTTP_400_BAD_REQUEST)
+        targets, ids = targets
+
+        with transaction.atomic():
+            reqs = list(targets.select_for_update())
+            outcomes = {}
+            pending = []
+            for reg_req in reqs:
+                if reg_req.status != 'PENDING':
+                    outcomes[reg_req.id] = {'id': reg_req.id, 'result': 'skipped', 'message': 'Solo se pueden aprobar solicitudes pendientes'}
+                else:
+                    pending.append(reg_req)
+
+            cis = {r.ci for r in pending}
+            emails = {User.objects.normalize_email(r.email) for r in pending}
+            by_ci, by_email = {}, {}
+            for user in User.objects.filter(Q(ci_number__in=cis) | Q(email__in=cis | emails)).order_by('id'):
+                if user.ci_number:
+                    by_ci.setdefault(user.ci_number, user)
+                if user.email:
+                    by_email.setdefault(user.email, user)
+
+            # Same precedence as approve(): CI, then the CI used as email, else a new student
+            new_users = {}
+            users = {}
+            for reg_req in pending:
+                user = by_ci.get(reg_req.ci) or by_email.get(reg_req.ci) or new_users.get(reg_req.ci)
+                if user is None:
+                    email = User.objects.normalize_email(reg_req.email)
+                    if email in by_email:
+                        outcomes[reg_req.id] = {'id': reg_req.id, 'result': 'error', 'message': f'El correo {email} ya pertenece a otro usuario'}
+                        continue
+                    user = User(
+                        email=email, first_name=reg_req.first_name, paternal_surname=reg_req.paternal_surname,
+                        maternal_surname=reg_req.maternal_surname, ci_number=reg_req.ci, role='STUDENT'
+                    )
+                    new_users[reg_req.ci] = user
+                    by_email[email] = user
+                users[reg_req.id] = user
+
+            # "el correo es su numero de carnet y su contrasena es el mismo numero de carnet"
+            created = list(new_users.values())
+            for user, encoded in zip(created, make_passwords([u.ci_number for u in created])):
+                user.password = encoded
+            _bulk_create_with_pks(User, created, ('email',))
+
+            user_ids = {user.id for user in users.values()}
+            course_ids = {r.course_id for r in pending}
+            enrolled = set(models.Enrollment.objects.filter(
+                student_id__in=user_ids, course_id__in=course_ids
+            ).values_list('student_id', 'course_id'))
+
+            new_enrollments = []
+            approved = []
+            for reg_req in pending:
+                user = users.get(reg_req.id)
+                if user is None:
+                    continue
+                key = (user.id, reg_req.course_id)
+                if key in enrolled:
+                    outcomes[reg_req.id] = {'id': reg_req.id, 'result': 'already_enrolled', 'message': 'El estudiante ya estaba inscrito. Solicitud marcada como aprobada.'}
+                else:
+                    enrolled.add(key)
+                    new_enrollments.append(models.Enrollment(student_id=user.id, course_id=reg_req.course_id))
+                    outcomes[reg_req.id] = {'id': reg_req.id, 'result': 'enrolled', 'message': 'Estudiante inscrito correctamente'}
+                outcomes[reg_req.id]['user_id'] = user.id
+                outcomes[reg_req.id]['user_created'] = new_users.get(reg_req.ci) is user
+                reg_req.status = 'APPROVED'
+                approved.append(reg_req)
+
+            models.Enrollment.objects.bulk_create(new_enrollments)
+            models.RegistrationRequest.objects.bulk_update(approved, ['status'])
+
+        found = {r.id for r in reqs}
+        missing = [i for i in ids if i not in found]
+        return Response({
+            'results': [outcomes[r.id] for r in reqs],
+            'missing': missing,
+            'approved': len(approved),
+            'users_created': len(created),
+        })
+
+    @action(detail=False, methods=['post'])
+    def bulk_reject(self, request):
+        """
+        Reject many requests at once (same body as bulk_approve).
+        Only PENDING requests change; the rest are reported as skipped.
+        """
+        targets = self._bulk_targets(request)
+        if targets is None:
+            return Response({'error': 'ids o course_id requerido'}, status=status.HTTP_400_BAD_REQUEST)
+        targets, ids = targets
+
+        with transaction.atomic():
+            reqs = list(targets.select_for_update().values_list('id', 'status'))
+            pending = [req_id for req_id, req_status in reqs if req_status == 'PENDING']
+            models.RegistrationRequest.objects.filter(id__in=pending).update(status='REJECTED')
+
+        rejected = set(pending)
+        found = {req_id for req_id, _ in reqs}
+        return Response({
+            'results': [
+                {'id': req_id, 'result': 'rejected', 'message': 'Solicitud rechazada'} if req_id in rejected
+                else {'id': req_id, 'result': 'skipped', 'message': 'Solo se pueden rechazar solicitudes pendientes'}
+                for req_id, _ in reqs
+            ],
+            'missing': [i for i in ids if i not in found],
+            'rejected': len(pending),
+        })
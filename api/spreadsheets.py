@@ -0,0 +1,13 @@
+"""Helpers for the CSV/Excel student upload previews."""
+import re
+from functools import lru_cache
+
+WHITESPACE_RE = re.compile(r'\s+')
+NON_DIGITS_RE = re.compile(r'\D')
+
+
+@lru_cache(maxsize=None)
+def openpyxl():
+    """openpyxl, imported on first use: it is slow to import and only .xlsx uploads need it."""
+    import openpyxl
+    return openpyxl
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+# What a gunicorn worker does before serving: import the app and load the URLconf
+BOOT = "import core.wsgi; from django.urls import get_resolver; get_resolver().url_patterns"
+
+
+class WorkerBootTest(SimpleTestCase):
+    """Boots a fresh interpreter under `python -X importtime` and checks what the boot costs."""
+
+    budget_ms = int(os.environ.get("BOOT_IMPORT_BUDGET_MS", 1500))
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="core.settings")
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+        )
+        if result.returncode:
+            raise AssertionError(result.stderr[-2000:])
+        cls.stdout = result.stdout
+
+        # "import time: self [us] | cumulative | <indent>module"; top-level imports have a single space
+        cls.modules = {}
+        cls.total_us = 0
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            _, cumulative, name = line.split("|")
+            cls.modules[name.strip()] = int(cumulative)
+            if not name.startswith("  "):
+                cls.total_us += int(cumulative)
+
+    def test_boot_prints_nothing(self):
+        self.assertEqual(self.stdout, "")
+
+    def test_heavy_optional_modules_are_lazy(self):
+        for module in ("openpyxl",):
+            self.assertNotIn(module, self.modules)
+
+    def test_boot_fits_budget(self):
+        self.assertLess(self.total_us / 1000, self.budget_ms, "slowest imports: " + ", ".join(
+            f"{name} {us // 1000} ms" for name, us in sorted(self.modules.items(), key=lambda m: -m[1])[:10]
+        ))
+
+
+class StaticStorageTest(SimpleTestCase):
+    def test_plain_names_until_collectstatic(self):
+        from core.storage import HashedStaticFilesStorage
+
+        with tempfile.TemporaryDirectory() as root:
+            self.assertEqual(HashedStaticFilesStorage(location=root).url("app.css"), "/django_static/app.css")
+
+            with open(os.path.join(root, "staticfiles.json"), "w") as f:
+                json.dump({"version": "1.0", "paths": {"app.css": "app.0123abcd.css"}}, f)
+            self.assertEqual(HashedStaticFilesStorage(location=root).url("app.css"), "/django_static/app.0123abcd.css")
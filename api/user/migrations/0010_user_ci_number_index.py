@@ -0,0 +1,18 @@
+# Generated by Django 3.2.13 on 2026-10-19 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_user', '0009_user_active_course'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='ci_number',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+    ]
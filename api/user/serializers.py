@@ -1,7 +1,15 @@
 from api.user.models import User
+from api.authentication.revocation import revocations
 from rest_framework import serializers
 
 
+def _invalidates_tokens(instance, validated_data):
+    """Deactivation or a role change must end the user's stateless JWT sessions."""
+    if instance.is_active and validated_data.get('is_active') is False:
+        return True
+    return 'role' in validated_data and validated_data['role'] != instance.role
+
+
 class UserSerializer(serializers.ModelSerializer):
     date = serializers.DateTimeField(read_only=True)
 
@@ -10,6 +18,13 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ["id", "email", "date", "first_name", "paternal_surname", "maternal_surname", "ci_number", "phone", "role", "active_course"]
         read_only_field = ["id"]
 
+    def update(self, instance, validated_data):
+        revoke = _invalidates_tokens(instance, validated_data)
+        instance = super().update(instance, validated_data)
+        if revoke:
+            revocations.revoke_user(instance.pk)
+        return instance
+
 
 class ManageUserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
@@ -35,11 +50,14 @@ class ManageUserSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         password = validated_data.pop('password', None)
+        revoke = _invalidates_tokens(instance, validated_data)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         if password:
             instance.set_password(password)
         instance.save()
+        if revoke:
+            revocations.revoke_user(instance.pk)
         return instance
 
 
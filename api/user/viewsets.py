@@ -1,5 +1,10 @@
+import io
+import traceback
+
 from api.user.serializers import UserSerializer, ManageUserSerializer, ProfileUpdateSerializer
 from api.user.models import User
+from api import spreadsheets
+from api.authentication.revocation import revocations
 from rest_framework import viewsets, status, filters
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
@@ -19,10 +24,14 @@ class ManageUserViewSet(viewsets.ModelViewSet):
         try:
             return super().create(request, *args, **kwargs)
         except Exception as e:
-            import traceback
             traceback.print_exc()
             return Response({'error': str(e), 'traceback': traceback.format_exc()}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def perform_destroy(self, instance):
+        user_id = instance.pk
+        instance.delete()
+        revocations.revoke_user(user_id)
+
     def get_queryset(self):
         role = self.request.query_params.get('role')
         queryset = User.objects.all().order_by('paternal_surname', 'maternal_surname', 'first_name')
@@ -110,8 +119,6 @@ class ManageUserViewSet(viewsets.ModelViewSet):
         try:
             filename = file.name.lower()
             if filename.endswith('.csv'):
-                import csv
-                import io
                 decoded_file = file.read().decode('utf-8')
                 io_string = io.StringIO(decoded_file)
                 # Read header
@@ -123,14 +130,12 @@ class ManageUserViewSet(viewsets.ModelViewSet):
                 rows = [l.split(delimiter) for l in lines[1:]]
             
             elif filename.endswith('.xlsx'):
-                import openpyxl
-                wb = openpyxl.load_workbook(file, data_only=True)
+                wb = spreadsheets.openpyxl().load_workbook(file, data_only=True)
                 sheet = wb.active
                 # Scan first 50 rows for header
                 header_row_idx = 0
                 headers = []
                 found_header = False
-                import re
                 
                 target_headers = [
                     'ci', 'carnet', 'cedula', 'documento', 'c.i.', 'c.i', 'ci_number',
@@ -141,7 +146,7 @@ class ManageUserViewSet(viewsets.ModelViewSet):
                 rows_iter = list(sheet.iter_rows(values_only=True))
                 for i, row in enumerate(rows_iter[:50]):
                    # Normalize headers
-                   row_strs = [re.sub(r'\s+', ' ', str(c).strip().lower()) if c else '' for c in row]
+                   row_strs = [spreadsheets.WHITESPACE_RE.sub(' ', str(c).strip().lower()) if c else '' for c in row]
                    if any(h in row_strs for h in target_headers):
                        headers = row_strs
                        header_row_idx = i
@@ -173,7 +178,6 @@ class ManageUserViewSet(viewsets.ModelViewSet):
                  return Response({"error": f"Missing CI column. Found: {headers}"}, status=status.HTTP_400_BAD_REQUEST)
 
             seen_cis = set()
-            import re
 
             for row in rows:
                 if not row: continue
@@ -184,7 +188,7 @@ class ManageUserViewSet(viewsets.ModelViewSet):
 
                 raw_ci = row_vals[col_map['ci']]
                 # Clean CI: keep only digits
-                ci = re.sub(r'\D', '', raw_ci)
+                ci = spreadsheets.NON_DIGITS_RE.sub('', raw_ci)
 
                 if not ci: continue
                 
@@ -230,7 +234,6 @@ class ManageUserViewSet(viewsets.ModelViewSet):
                 students_to_create.append(student_data)
 
         except Exception as e:
-            import traceback
             traceback.print_exc()
             return Response({"error": f"Error parsing file: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.13 on 2026-10-19 18:23
+
+import api.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_config', '0002_landingpageconfig'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='landingpageconfig',
+            name='landing_image',
+            field=models.ImageField(blank=True, null=True, storage=api.images.ImageRenditionStorage(), upload_to='landing-page/'),
+        ),
+    ]
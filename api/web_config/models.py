@@ -1,5 +1,7 @@
 from django.db import models
 
+from api.images import image_storage
+
 class SocialMediaLink(models.Model):
     facebook = models.URLField(max_length=255, blank=True, null=True)
     youtube = models.URLField(max_length=255, blank=True, null=True)
@@ -23,7 +25,7 @@ class SocialMediaLink(models.Model):
 
 
 class LandingPageConfig(models.Model):
-    landing_image = models.ImageField(upload_to='landing-page/', blank=True, null=True)
+    landing_image = models.ImageField(upload_to='landing-page/', storage=image_storage, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
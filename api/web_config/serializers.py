@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from api.images import rendition_urls
 from .models import SocialMediaLink, LandingPageConfig
 
 class SocialMediaSerializer(serializers.ModelSerializer):
@@ -8,7 +9,12 @@ class SocialMediaSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'updated_at']
 
 class LandingPageConfigSerializer(serializers.ModelSerializer):
+    landing_image_renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = LandingPageConfig
-        fields = ['id', 'landing_image', 'updated_at']
+        fields = ['id', 'landing_image', 'landing_image_renditions', 'updated_at']
         read_only_fields = ['id', 'updated_at']
+
+    def get_landing_image_renditions(self, obj):
+        return rendition_urls(obj.landing_image, self.context.get('request'))
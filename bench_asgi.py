@@ -0,0 +1,88 @@
+"""
+Concurrency load test: sync WSGI profile vs ASGI profile (uvicorn workers).
+
+Starts gunicorn with gunicorn-cfg.py once per SERVER_PROFILE on a local port, fires
+--requests GETs at the public read endpoints from --concurrency client threads and
+reports requests per second and latency percentiles for each profile. It uses the
+database configured in .env (run `python manage.py migrate` first); --workers is the
+same for both profiles, so the numbers compare the serving model, not process count.
+
+Usage: python bench_asgi.py [--requests 2000] [--concurrency 64] [--workers 2] [--port 5077]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = [
+    "/api/student-course-registration/open_courses/",
+    "/api/project-registration/available_projects/",
+    "/api/publications/",
+    "/api/web-config/",
+]
+
+
+def start_server(profile, port, workers):
+    env = dict(os.environ, SERVER_PROFILE=profile, GUNICORN_WORKERS=str(workers))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn-cfg.py", "--bind", f"127.0.0.1:{port}",
+         "--log-level", "warning", "--access-logfile", "/dev/null"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}{ENDPOINTS[-1]}", timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise SystemExit(f"{profile} server did not come up on port {port}")
+
+
+def fetch(url):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run(port, requests, concurrency):
+    urls = [f"http://127.0.0.1:{port}{ENDPOINTS[i % len(ENDPOINTS)]}" for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    return requests / elapsed, percentile(0.5), percentile(0.95), percentile(0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=5077)
+    args = parser.parse_args()
+
+    print(f"{args.requests} GETs over {len(ENDPOINTS)} endpoints, {args.concurrency} clients, {args.workers} workers")
+    for profile in ("wsgi", "asgi"):
+        server = start_server(profile, args.port, args.workers)
+        try:
+            fetch(f"http://127.0.0.1:{args.port}{ENDPOINTS[0]}")  # warm up
+            rps, p50, p95, p99 = run(args.port, args.requests, args.concurrency)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+        print(f"{profile}: {rps:8.1f} req/s   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   p99 {p99:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Login throughput benchmark.
+
+Creates a throwaway test database with N student accounts and pushes them through
+LoginSerializer, sequentially and from a pool of request threads (like gunicorn
+gthread workers), reporting logins per second and queries per login.
+
+Usage: python bench_login.py [--users 200] [--threads 8]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.getcwd())
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django
+django.setup()
+
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from api.authentication.models import ActiveSession
+from api.authentication.serializers import LoginSerializer
+from api.user.models import User
+
+
+def login(ci):
+    try:
+        serializer = LoginSerializer(data={"email": ci, "password": f"pw-{ci}"})
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["token"]
+    finally:
+        connections.close_all()
+
+
+def run(cis, threads):
+    ActiveSession.objects.all().delete()
+    start = time.perf_counter()
+    if threads == 1:
+        for ci in cis:
+            login(ci)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(login, cis))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        cis = [str(9000000 + i) for i in range(args.users)]
+        for ci in cis:
+            User.objects.create_user(email=f"{ci}@bench.test", password=f"pw-{ci}", ci_number=ci, role="STUDENT")
+
+        with CaptureQueriesContext(connection) as ctx:
+            serializer = LoginSerializer(data={"email": cis[0], "password": f"pw-{cis[0]}"})
+            serializer.is_valid(raise_exception=True)
+        print(f"queries per first login: {len(ctx.captured_queries)}")
+
+        for threads in (1, args.threads):
+            elapsed = run(cis, threads)
+            print(f"{threads:>3} request threads: {len(cis) / elapsed:8.1f} logins/s ({elapsed:.2f}s for {len(cis)})")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
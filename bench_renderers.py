@@ -0,0 +1,126 @@
+"""
+Serialization benchmark for the largest API payloads.
+
+Compares the stock DRF JSONRenderer with api.renderers.FastJSONRenderer (and the
+columnar/msgpack gradesheet formats) on synthetic payloads shaped like the
+gradesheet, student dashboard and enrollment list responses. Reports render time
+and bytes on the wire, raw and gzip-compressed.
+
+Usage: python bench_renderers.py [--students 200] [--columns 30] [--repeat 20]
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.append(os.getcwd())
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django
+django.setup()
+
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer, orjson
+from api.school.renderers import MessagePackRenderer, msgpack
+from api.school.views import _columnar_gradesheet
+
+
+def gradesheet_payload(students, columns):
+    structure = [{
+        "id": 1, "name": "Criterio", "weight": Decimal("100.00"),
+        "sub_criteria": [{
+            "id": c, "name": f"Sub {c}", "percentage": Decimal("3.00"), "visible": True,
+            "editable": True, "has_tasks": False, "has_projects": False, "is_special": False
+        } for c in range(1, columns + 1)],
+        "special_criteria": [],
+    }]
+    rows = [{
+        "enrollment_id": i, "student_id": 1000 + i, "ci": str(9000000 + i),
+        "paterno": "Paterno", "materno": "Materno", "nombre": "Nombre Estudiante",
+        "grades": {c: Decimal("2.75") for c in range(1, columns + 1) if (i + c) % 7},
+    } for i in range(students)]
+    return {"structure": structure, "rows": rows}
+
+
+def dashboard_payload(courses, columns):
+    return {
+        "role": "STUDENT",
+        "enrolled_courses": [{
+            "id": c, "name": "Materia", "code": f"MAT-{c}", "parallel": "A", "period": "2026-I",
+            "teacher": "Docente", "image": f"https://example.com/media/course_images/{c}.jpg",
+            "grade": Decimal("78.50"), "schedule": "Lun 08:00",
+            "criteria_grades": [{
+                "name": f"Criterio {p}", "max_points": Decimal("25.00"), "score": 20.5,
+                "sub_criteria": [{
+                    "name": f"Sub {s}", "max_points": Decimal("5.00"), "score": Decimal("4.25"),
+                    "is_special": False,
+                    "tasks": [{"name": f"Tarea {t}", "weight": 1.0, "score": 0.85} for t in range(6)],
+                } for s in range(columns // 4)],
+            } for p in range(4)],
+        } for c in range(courses)],
+    }
+
+
+def enrollment_list_payload(students):
+    course = {
+        "id": 1, "subject_details": {"id": 1, "name": "Materia", "code": "MAT-1", "archived": False},
+        "teacher_name": "docente@example.com", "parallel": "A", "schedule": "Lun 08:00", "active": True,
+    }
+    return [{
+        "id": i, "student_name": f"s{i}@example.com",
+        "student_details": {
+            "id": i, "email": f"s{i}@example.com", "date": "2026-01-10T12:00:00Z", "first_name": "Nombre",
+            "paternal_surname": "Paterno", "maternal_surname": "Materno", "ci_number": str(9000000 + i),
+            "phone": "70000000", "role": "STUDENT", "active_course": 1,
+        },
+        "course_details": course, "date_enrolled": "2026-01-10", "final_grade": "78.50",
+        "student": i, "course": 1,
+    } for i in range(students)]
+
+
+def measure(renderer, data, repeat):
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = renderer.render(data)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, len(body), len(gzip.compress(body, compresslevel=6))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--columns", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    gradesheet = gradesheet_payload(args.students, args.columns)
+    payloads = [
+        ("gradesheet", gradesheet),
+        ("gradesheet columnar", _columnar_gradesheet(gradesheet["structure"], gradesheet["rows"])),
+        ("dashboard (student)", dashboard_payload(8, args.columns)),
+        ("enrollment list", enrollment_list_payload(args.students)),
+    ]
+    renderers = [("JSONRenderer", JSONRenderer())]
+    if orjson is not None:
+        renderers.append(("FastJSONRenderer", FastJSONRenderer()))
+    else:
+        print("orjson not installed: FastJSONRenderer falls back to JSONRenderer\n")
+    if msgpack is not None:
+        renderers.append(("MessagePackRenderer", MessagePackRenderer()))
+
+    print(f"{'payload':<22}{'renderer':<22}{'ms':>9}{'bytes':>11}{'gzip':>10}")
+    for name, data in payloads:
+        for renderer_name, renderer in renderers:
+            if isinstance(renderer, MessagePackRenderer) and "columnar" not in name:
+                continue
+            ms, raw, gz = measure(renderer, data, args.repeat)
+            print(f"{name:<22}{renderer_name:<22}{ms:>9.2f}{raw:>11}{gz:>10}")
+
+
+if __name__ == "__main__":
+    main()
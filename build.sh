@@ -6,3 +6,4 @@ pip install --upgrade pip
 pip install -r requirements.txt
 
 python manage.py migrate
+python manage.py collectstatic --noinput
@@ -2,6 +2,8 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Everything goes to Django except the gradesheet event stream, a long-lived
+response handled by api.school.streams directly on the event loop.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -13,4 +15,12 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.school.streams import GRADESHEET_STREAM_PATH, gradesheet_stream  # noqa: E402 (needs the app registry)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] == GRADESHEET_STREAM_PATH:
+        return await gradesheet_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -36,6 +36,27 @@ DEBUG = env('DEBUG', default=False)
 
 JWT_TOKEN_LIFETIME_DAYS = env.int('JWT_TOKEN_LIFETIME_DAYS', default=7)
 
+# Stateless mode: a valid signed token (id, role, sid claims) authenticates without an
+# ActiveSession lookup; logout/deactivation go through the revocation list instead
+# (propagated to other workers through CACHES, see CACHE_URL below).
+JWT_STATELESS = env.bool('JWT_STATELESS', default=False)
+JWT_REVOCATION_REFRESH_SECONDS = env.int('JWT_REVOCATION_REFRESH_SECONDS', default=60)
+
+# Threads hashing passwords in parallel when accounts are created in bulk (make_passwords)
+PASSWORD_HASH_WORKERS = env.int('PASSWORD_HASH_WORKERS', default=os.cpu_count() or 2)
+
+# Public project-registration listing is cached per course for this long
+AVAILABLE_PROJECTS_CACHE_SECONDS = env.int('AVAILABLE_PROJECTS_CACHE_SECONDS', default=30)
+
+# Anonymous course registration requests allowed per client IP / per CI in each window.
+# Counted in CACHES: per worker unless CACHE_URL points at a shared backend.
+REGISTRATION_RATE_WINDOW_SECONDS = env.int('REGISTRATION_RATE_WINDOW_SECONDS', default=60)
+REGISTRATION_RATE_PER_IP = env.int('REGISTRATION_RATE_PER_IP', default=20)
+REGISTRATION_RATE_PER_CI = env.int('REGISTRATION_RATE_PER_CI', default=5)
+
+# How gradesheet changes reach the live streams: 'local' (one process) or 'postgres' (NOTIFY, all workers)
+GRADESHEET_EVENTS_BACKEND = env('GRADESHEET_EVENTS_BACKEND', default='local')
+
 
 ALLOWED_HOSTS = [h.strip() for h in env("DJANGO_ALLOWED_HOSTS", default="*").split(" ") if h.strip()]
 #ALLOWED_HOSTS = env.list('DJANGO_ALLOWED_HOSTS', default=['localhost', '127.0.0.1', '[::1]'])
@@ -61,6 +82,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.gzip.GZipMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -116,6 +138,13 @@ DATABASES = {
     }
 }
 
+# Cache shared by the JWT revocation version and the registration rate limits.
+# The default is per process: with several workers a revocation reaches the others
+# only at their next JWT_REVOCATION_REFRESH_SECONDS refresh. Point CACHE_URL at a
+# shared backend (e.g. dbcache://cache_table after `manage.py createcachetable`,
+# or pymemcache://host:11211) when running more than one worker.
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -153,6 +182,8 @@ USE_TZ = True
 # settings.py
 STATIC_URL = "/django_static/" # Antes era /static/
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+# Hashed file names so nginx can cache static files as immutable (plain names until collectstatic has run)
+STATICFILES_STORAGE = "core.storage.HashedStaticFilesStorage"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
@@ -173,7 +204,8 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "api.authentication.backends.ActiveSessionAuthentication",
     ),
-    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+    # orjson-backed when installed, stock JSONRenderer otherwise
+    "DEFAULT_RENDERER_CLASSES": ("api.renderers.FastJSONRenderer",),
 }
 
 # ##################################################################### #
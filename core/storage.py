@@ -0,0 +1,14 @@
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+
+class HashedStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Content-hashed static names (nginx serves them as immutable) once collectstatic
+    has written the manifest. Before that (runserver with DEBUG off, tests) there is
+    no manifest and {% static %} falls back to the plain names instead of raising.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
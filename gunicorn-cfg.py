@@ -2,10 +2,19 @@
 """
 Copyright (c) 2019 - present AppSeed.us
 """
+import os
 
 bind = '0.0.0.0:5005'
-workers = 1
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
 accesslog = '-'
 loglevel = 'debug'
 capture_output = True
 enable_stdio_inheritance = True
+
+# SERVER_PROFILE=asgi serves core.asgi from uvicorn workers: async public reads and the
+# gradesheet event stream. The default profile is the sync WSGI app.
+if os.environ.get('SERVER_PROFILE', 'wsgi') == 'asgi':
+    wsgi_app = 'core.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'core.wsgi:application'